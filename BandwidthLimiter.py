@@ -0,0 +1,156 @@
+import threading
+import time
+from datetime import datetime
+"""
+Caps the combined download rate of all threads with a token bucket. The cap can change
+by time of day, for example to download at full speed overnight and share the link
+during business hours.
+
+Limits are written as "<limit>[,<HH:MM>-<HH:MM>=<limit>...]" where limit is bytes per
+second with an optional K, M or G suffix and 0 is unlimited. The first limit without a
+window applies outside every window, windows ending before they start wrap past midnight.
+    "2M"                    2 MiB/s at all times
+    "0,09:00-18:00=2M"      2 MiB/s from 9 am to 6 pm, unlimited otherwise
+    "500K,22:00-06:00=0"    unlimited overnight, 500 KiB/s otherwise
+
+Usage:
+    limiter = parse("0,09:00-18:00=2M")
+    n = readinto(buffer[:limiter.chunk_limit() or len(buffer)])
+    limiter.consume(n)
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+BURST_TIME = 0.25           # Seconds of transfer the bucket holds, also the most read at once
+MIN_CHUNK = 1024 * 16       # Smallest read size when capped
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_rate(rate:str) -> int:
+    """
+    Converts a rate such as "2M" to bytes per second
+
+    Param:
+        rate: number of bytes with an optional K, M or G suffix
+    Raise: ValueError if rate is malformed or negative
+    Return: bytes per second, 0 for unlimited
+    """
+    rate = rate.strip().upper().removesuffix('/S').removesuffix('B')
+    multiplier = UNITS.get(rate[-1:], 1)
+    if rate[-1:] in UNITS:
+        rate = rate[:-1]
+    value = int(float(rate) * multiplier)
+    if value < 0:
+        raise ValueError("Bandwidth limit cannot be negative: " + rate)
+    return value
+
+def parse_time(clock:str) -> int:
+    """
+    Converts "HH:MM" to minutes since midnight
+
+    Param:
+        clock: time of day
+    Raise: ValueError if clock is malformed
+    Return: minutes since midnight
+    """
+    hours, _, minutes = clock.strip().partition(':')
+    minute = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= minute <= 24 * 60:
+        raise ValueError("Time of day out of range: " + clock)
+    return minute
+
+def parse(spec:str) -> 'BandwidthLimiter':
+    """
+    Creates a limiter from a limit specification, see module description
+
+    Param:
+        spec: limit specification
+    Raise: ValueError if spec is malformed
+    Return: limiter
+    """
+    default = 0
+    windows = []
+    for entry in spec.split(','):
+        if '=' in entry:
+            span, _, rate = entry.partition('=')
+            start, sep, end = span.partition('-')
+            if not sep:
+                raise ValueError("Window must be written as HH:MM-HH:MM: " + span)
+            windows.append((parse_time(start), parse_time(end), parse_rate(rate)))
+        elif entry.strip():
+            default = parse_rate(entry)
+    return BandwidthLimiter(default, windows)
+
+class BandwidthLimiter():
+    """
+    Thread safe token bucket shared by all downloads. Callers take tokens for the bytes
+    they read and sleep off any debt outside the lock, so concurrent readers are spaced out
+    in the order they asked.
+    """
+    __default:int               # Bytes per second outside every window, 0 for unlimited
+    __windows:list[tuple[int, int, int]] # (start minute, end minute, bytes per second) checked in order
+    __tokens:float              # Bytes that can be read without waiting, negative when readers are waiting
+    __last:float                # Time tokens were last refilled
+    __lock:threading.Lock       # Guards tokens and last
+
+    def __init__(self, default:int, windows:list[tuple[int, int, int]] = []) -> None:
+        """
+        Initializes the limiter with a full bucket
+
+        Param:
+            default: bytes per second outside every window, 0 for unlimited
+            windows: (start minute, end minute, bytes per second) time of day windows, the first
+                window containing the time is used
+        """
+        self.__default = default
+        self.__windows = list(windows)
+        self.__lock = threading.Lock()
+        self.__last = time.monotonic()
+        self.__tokens = self.rate() * BURST_TIME
+
+    def rate(self, now:datetime|None = None) -> int:
+        """
+        Returns the limit in effect at a time of day
+
+        Param:
+            now: (Optional) time to check, default is now
+        Return: bytes per second, 0 for unlimited
+        """
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, rate in self.__windows:
+            if start <= minute < end or (end < start and (minute >= start or minute < end)):
+                return rate
+        return self.__default
+
+    def chunk_limit(self) -> int|None:
+        """
+        Returns the most bytes that should be read at once so reads are paced instead of
+        arriving in bursts at the link's full speed
+
+        Return: bytes, None if unlimited
+        """
+        rate = self.rate()
+        return max(MIN_CHUNK, int(rate * BURST_TIME)) if rate else None
+
+    def consume(self, nbytes:int) -> float:
+        """
+        Takes tokens for nbytes, sleeping until the bucket has paid for them
+
+        Param:
+            nbytes: bytes read
+        Return: seconds slept
+        """
+        rate = self.rate()
+        with self.__lock:
+            now = time.monotonic()
+            if not rate:
+                self.__tokens = 0
+                self.__last = now
+                return 0
+            self.__tokens = min(rate * BURST_TIME, self.__tokens + (now - self.__last) * rate) - nbytes
+            self.__last = now
+            wait = -self.__tokens / rate if self.__tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
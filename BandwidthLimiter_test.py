@@ -0,0 +1,81 @@
+import io
+import threading
+import time
+import unittest
+from datetime import datetime
+import BandwidthLimiter
+from StreamWriter import StreamWriter
+
+class BandwidthLimiterTestCase(unittest.TestCase):
+    def test_parse(self) -> None:
+        """
+        Tests limits and windows are parsed
+        """
+        self.assertEqual(BandwidthLimiter.parse_rate("512"), 512)
+        self.assertEqual(BandwidthLimiter.parse_rate("1.5k"), 1536)
+        self.assertEqual(BandwidthLimiter.parse_rate("2MB/s"), 2 * 1024 * 1024)
+        self.assertEqual(BandwidthLimiter.parse_rate("0"), 0)
+        self.assertEqual(BandwidthLimiter.parse_time("09:30"), 9 * 60 + 30)
+        for spec in ("-1", "fast", "09:00=2M", "09:00-25:00=2M"):
+            with self.assertRaises(ValueError):
+                BandwidthLimiter.parse(spec)
+
+    def test_windows(self) -> None:
+        """
+        Tests the limit in effect at different times of day
+        """
+        limiter = BandwidthLimiter.parse("1M,09:00-18:00=2M,22:00-06:00=0")
+        self.assertEqual(limiter.rate(datetime(2023, 9, 10, 8, 59)), 1024 ** 2)
+        self.assertEqual(limiter.rate(datetime(2023, 9, 10, 9, 0)), 2 * 1024 ** 2)
+        self.assertEqual(limiter.rate(datetime(2023, 9, 10, 17, 59)), 2 * 1024 ** 2)
+        self.assertEqual(limiter.rate(datetime(2023, 9, 10, 18, 0)), 1024 ** 2)
+        self.assertEqual(limiter.rate(datetime(2023, 9, 10, 23, 0)), 0)
+        self.assertEqual(limiter.rate(datetime(2023, 9, 10, 3, 0)), 0)
+        self.assertEqual(limiter.rate(datetime(2023, 9, 10, 6, 0)), 1024 ** 2)
+        self.assertIsNone(BandwidthLimiter.parse("0").chunk_limit())
+
+    def test_consume(self) -> None:
+        """
+        Tests threads sharing a limiter are capped together
+        """
+        rate = 1024 * 1024
+        limiter = BandwidthLimiter.BandwidthLimiter(rate)
+        chunk = limiter.chunk_limit()
+
+        def work() -> None:
+            for _ in range(0, 4):
+                limiter.consume(chunk)
+
+        threads = [threading.Thread(target=work) for _ in range(0, 4)]
+        start = time.perf_counter()
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        elapsed = time.perf_counter() - start
+        # The full bucket is read without waiting
+        expected = (16 * chunk - rate * BandwidthLimiter.BURST_TIME) / rate
+        self.assertGreaterEqual(elapsed, expected * 0.95)
+        self.assertLess(elapsed, expected + 0.5)
+
+    def test_writer(self) -> None:
+        """
+        Tests StreamWriter reads in capped chunks and writes the whole body
+        """
+        class Response():
+            headers = {}
+            def __init__(self, body:bytes) -> None:
+                self.raw = io.BytesIO(body)
+
+        body = bytes(range(0, 256)) * 2048
+        limiter = BandwidthLimiter.BandwidthLimiter(1024 * 1024)
+        writes = []
+        fd = io.BytesIO()
+        start = time.perf_counter()
+        written = StreamWriter(1024 * 1024, limiter).write(Response(body), fd, writes.append)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(written, len(body))
+        self.assertEqual(fd.getvalue(), body)
+        self.assertLessEqual(max(writes), limiter.chunk_limit())
+        self.assertGreaterEqual(elapsed, 0.2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import contextlib
+import threading
+import time
+"""
+Adjusts how many transfers run at once from observed throughput, latency and rate limits.
+
+Additive increase, multiplicative decrease (AIMD): each tick the limit grows by one while
+throughput keeps improving, and is cut by DECREASE when the server rate limits or fails
+requests. An increase that does not improve throughput by at least GAIN is undone and the
+limit is held for HOLD_TICKS, as more transfers only split the same bandwidth. Time to first
+byte rising past LATENCY_RATIO times the lowest seen means the server is queueing requests,
+the limit is then lowered by one.
+
+Usage:
+    with controller.slot():
+        transfer()
+    controller.record(bytes, ttfb)
+
+    controller.acquire()
+    transfer()
+    controller.release()
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+TICK = 2.0                  # Seconds between adjustments
+DECREASE = 0.5              # Limit is multiplied by this on rate limits
+GAIN = 0.05                 # Smallest throughput improvement that justifies an increase
+HOLD_TICKS = 5              # Ticks the limit is held after an increase is undone
+LATENCY_RATIO = 3.0         # Time to first byte this many times the lowest seen lowers the limit
+
+class ConcurrencyController():
+    """
+    Thread safe limit on concurrent transfers adjusted with AIMD
+    """
+    __minimum:int               # Lowest limit
+    __maximum:int               # Highest limit
+    __limit:int                 # Transfers allowed at once
+    __active:int                # Transfers running
+    __cond:threading.Condition  # Guards every field, notified when a slot frees or the limit grows
+    __tick:float                # Seconds between adjustments
+    __tick_start:float          # Start of the current tick
+    __bytes:int                 # Bytes transferred this tick
+    __throttled:int             # Rate limits and failures this tick
+    __ttfb:list                 # Times to first byte this tick
+    __min_ttfb:float|None       # Lowest time to first byte seen, None if none were seen
+    __last_throughput:float|None # Throughput of the previous tick, None after a change for rate limits
+    __increased:bool            # True if the limit was increased last tick
+    __hold:int                  # Ticks left before the limit can grow again
+
+    def __init__(self, start:int, minimum:int = 1, maximum:int = 16, tick:float = TICK) -> None:
+        """
+        Initializes the controller
+
+        Param:
+            start: limit to start at, clamped to [minimum, maximum]
+            minimum: lowest limit
+            maximum: highest limit, should be the number of threads transferring
+            tick: seconds between adjustments
+        """
+        self.__minimum = max(1, minimum)
+        self.__maximum = max(self.__minimum, maximum)
+        self.__limit = min(max(start, self.__minimum), self.__maximum)
+        self.__active = 0
+        self.__cond = threading.Condition()
+        self.__tick = tick
+        self.__tick_start = time.monotonic()
+        self.__bytes = 0
+        self.__throttled = 0
+        self.__ttfb = []
+        self.__min_ttfb = None
+        self.__last_throughput = None
+        self.__increased = False
+        self.__hold = 0
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Context manager that waits until fewer than limit transfers are running and
+        holds a slot while it is open
+        """
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        """
+        Waits until fewer than limit transfers are running and takes a slot, for transfers
+        that cannot be wrapped in slot()
+        """
+        with self.__cond:
+            while self.__active >= self.__limit:
+                self.__cond.wait()
+            self.__active += 1
+
+    def release(self) -> None:
+        """
+        Frees a slot taken by acquire()
+        """
+        with self.__cond:
+            self.__active -= 1
+            self.__cond.notify()
+
+    def record(self, nbytes:int, ttfb:float|None = None) -> None:
+        """
+        Records a finished transfer
+
+        Param:
+            nbytes: bytes transferred
+            ttfb: (Optional) seconds until the response started
+        """
+        with self.__cond:
+            self.__bytes += nbytes
+            if ttfb is not None:
+                self.__ttfb.append(ttfb)
+            self.__adjust()
+
+    def throttled(self) -> None:
+        """
+        Records a rate limit (429) or server error, the limit is decreased on the next tick
+        """
+        with self.__cond:
+            self.__throttled += 1
+            self.__adjust()
+
+    def limit(self) -> int:
+        """
+        Returns the current limit
+        """
+        return self.__limit
+
+    def maximum(self) -> int:
+        """
+        Returns the highest limit
+        """
+        return self.__maximum
+
+    def __adjust(self) -> None:
+        """
+        Adjusts the limit if a tick has passed, resets the tick's measurements
+
+        Pre: self.__cond is held
+        """
+        now = time.monotonic()
+        elapsed = now - self.__tick_start
+        if elapsed < self.__tick:
+            return
+        throughput = self.__bytes / elapsed
+        ttfb = sorted(self.__ttfb)[len(self.__ttfb) // 2] if self.__ttfb else None
+        if ttfb is not None and (self.__min_ttfb is None or ttfb < self.__min_ttfb):
+            self.__min_ttfb = ttfb
+        self.__hold = max(0, self.__hold - 1)
+
+        limit = self.__limit
+        if self.__throttled:
+            # Multiplicative decrease, throughput measured at the old limit no longer applies
+            limit = max(self.__minimum, int(limit * DECREASE))
+            self.__last_throughput = None
+            self.__increased = False
+        elif ttfb is not None and self.__min_ttfb and ttfb > self.__min_ttfb * LATENCY_RATIO:
+            limit = max(self.__minimum, limit - 1)
+            self.__increased = False
+        elif self.__increased and self.__last_throughput is not None and throughput < self.__last_throughput * (1 + GAIN):
+            # Last increase did not pay off
+            limit = max(self.__minimum, limit - 1)
+            self.__hold = HOLD_TICKS
+            self.__increased = False
+        elif self.__hold == 0 and limit < self.__maximum and self.__bytes > 0 and self.__active >= limit - 1:
+            # Additive increase, only while the current slots are in use
+            limit += 1
+            self.__increased = True
+        else:
+            self.__increased = False
+
+        if self.__increased or limit >= self.__limit:
+            self.__last_throughput = throughput if self.__bytes > 0 else self.__last_throughput
+        self.__limit = limit
+        self.__cond.notify_all()
+
+        self.__tick_start = now
+        self.__bytes = 0
+        self.__throttled = 0
+        self.__ttfb = []
@@ -0,0 +1,115 @@
+import contextlib
+import threading
+import time
+import unittest
+from ConcurrencyController import ConcurrencyController
+
+TICK = 0.05
+
+class ConcurrencyControllerTestCase(unittest.TestCase):
+    def tick(self, controller:ConcurrencyController, nbytes:int, ttfb:float = 0.01, throttled:bool = False) -> int:
+        """
+        Fills every slot, waits out a tick and records a transfer
+
+        Return: limit after the tick
+        """
+        with contextlib.ExitStack() as stack:
+            for _ in range(0, controller.limit()):
+                stack.enter_context(controller.slot())
+            time.sleep(TICK * 1.2)
+            if throttled:
+                controller.throttled()
+            else:
+                controller.record(nbytes, ttfb)
+        return controller.limit()
+
+    def test_slot(self) -> None:
+        """
+        Tests no more than limit slots are held at once
+        """
+        controller = ConcurrencyController(3, 1, 8)
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def work() -> None:
+            nonlocal active, peak
+            with controller.slot():
+                with lock:
+                    active += 1
+                    peak = max(peak, active)
+                time.sleep(0.02)
+                with lock:
+                    active -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(0, 12)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        self.assertEqual(peak, 3)
+
+    def test_acquire(self) -> None:
+        """
+        Tests acquire() blocks once limit slots are taken until one is released
+        """
+        controller = ConcurrencyController(2, 1, 8)
+        controller.acquire()
+        controller.acquire()
+        acquired = threading.Event()
+
+        def work() -> None:
+            controller.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        controller.release()
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+    def test_increase(self) -> None:
+        """
+        Tests the limit grows to the max while throughput scales with it
+        """
+        controller = ConcurrencyController(1, 1, 4, TICK)
+        for _ in range(0, 6):
+            self.tick(controller, controller.limit() * 1000)
+        self.assertEqual(controller.limit(), 4)
+
+    def test_plateau(self) -> None:
+        """
+        Tests an increase that does not raise throughput is undone and held
+        """
+        controller = ConcurrencyController(2, 1, 8, TICK)
+        limits = [self.tick(controller, 1000) for _ in range(0, 5)]
+        self.assertEqual(limits[:2], [3, 2])
+        self.assertEqual(limits[2:], [2, 2, 2])
+
+    def test_throttled(self) -> None:
+        """
+        Tests rate limits halve the limit down to the min
+        """
+        controller = ConcurrencyController(8, 1, 8, TICK)
+        self.assertEqual(self.tick(controller, 0, throttled=True), 4)
+        self.assertEqual(self.tick(controller, 0, throttled=True), 2)
+        self.assertEqual(self.tick(controller, 0, throttled=True), 1)
+        self.assertEqual(self.tick(controller, 0, throttled=True), 1)
+
+    def test_latency(self) -> None:
+        """
+        Tests rising time to first byte lowers the limit
+        """
+        controller = ConcurrencyController(4, 1, 4, TICK)
+        self.tick(controller, 1000, 0.01)
+        self.assertEqual(self.tick(controller, 1000, 0.1), 3)
+
+    def test_bounds(self) -> None:
+        """
+        Tests the starting limit is clamped
+        """
+        self.assertEqual(ConcurrencyController(0, 1, 4).limit(), 1)
+        self.assertEqual(ConcurrencyController(9, 1, 4).limit(), 4)
+        self.assertEqual(ConcurrencyController(2, 3, 1).maximum(), 3)
+
+if __name__ == '__main__':
+    unittest.main()
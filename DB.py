@@ -54,10 +54,10 @@ class DB():
         Returns: list containing anything the cmd returns
         """
         self.__lock.acquire()
-        content = list[len(cmds)]
+        content = [None] * len(cmds)
         for i, item in enumerate(cmds):
             if(isinstance(item, str)):
-                content = self.__cursor.execute(item)
+                content[i] = self.__cursor.execute(item)
             else:
                 content[i] = self.__cursor.execute(*item)
         self.__lock.release()
@@ -97,16 +97,22 @@ class DB():
         Args:
             cmd (str): sql command
         Returns: list of anything anything the cmd returns
+        Raise: sqlite3.OperationalError if the database is locked, nothing is committed
         """
         self.__lock.acquire()
-        content = list[len(cmds)]
-        for i, item in enumerate(cmds):
-            if(isinstance(item, str)):
-                content = self.__cursor.execute(item)
-            else:
-                content[i] = self.__cursor.execute(*item)
-        self.__connection.commit()
-        self.__lock.release()
+        try:
+            content = [None] * len(cmds)
+            for i, item in enumerate(cmds):
+                if(isinstance(item, str)):
+                    content[i] = self.__cursor.execute(item)
+                else:
+                    content[i] = self.__cursor.execute(*item)
+            self.__connection.commit()
+        except sqlite3.OperationalError:
+            self.__connection.rollback()
+            raise
+        finally:
+            self.__lock.release()
         
         return content
     
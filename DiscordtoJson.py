@@ -4,6 +4,7 @@ Simple JSON scraper for Kemono.party discord content.
 @author: Jeff Chen
 @last modified: 8/25/2022
 """
+import json
 import time
 from cfscrape import CloudflareScraper
 import logging
@@ -12,6 +13,7 @@ from Threadpool import ThreadPool
 from threading import Semaphore
 from threading import Lock
 import cfscrape
+from PageCache import PageCache
 
 
 
@@ -28,6 +30,44 @@ class DiscordToJson():
     Offers functions for scrapping Discord sub channel IDs and scraping the channels themselves.
     """
     __recent:dict = None
+    __cache:PageCache = None    # Cache of API responses, None to always make requests
+    
+    def __init__(self, cache:PageCache|None = None) -> None:
+        """
+        Initializes the scraper
+
+        Param:
+            cache: Cache to read API responses from and store them in, None to not cache them
+        """
+        self.__cache = cache
+    
+    def __get_json(self, url:str, scraper:CloudflareScraper) -> dict|list:
+        """
+        Gets an API response, retrying on connection errors. With a cache, fresh responses are 
+        read from the cache and stale ones are revalidated with a conditional request
+
+        Param:
+            url: API url
+            scraper: Scraper to use while scraping kemono
+        Return: response in JSON format
+        """
+        page = self.__cache.get(url) if self.__cache else None
+        if page and page.fresh:
+            self.__cache.hit(url)
+            return json.loads(page.text)
+        
+        data = None
+        while not data:
+            try:
+                data = scraper.get(url, timeout=5, headers=dict(HEADERS, **page.validators()) if page else HEADERS)
+            except(requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout):
+                logging.info("Connection error, retrying -> url: {s}".format(s=url))
+                time.sleep(1)
+        
+        if self.__cache:
+            return json.loads(self.__cache.update(url, page, data)[0])
+        return data.json()
+    
     def discord_lookup(self, discordID:str, scraper:CloudflareScraper) -> dict:
         """
         Looks up a discord id using Kemono.party's API and returns 
@@ -42,16 +82,7 @@ class DiscordToJson():
         url = DISCORD_LOOKUP_API + discordID
         
         # Grab data
-        data = None
-        while not data:
-            try:
-                data = scraper.get(url, timeout=5, headers=HEADERS)
-            except(requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout):
-                logging.debug("Connection error, retrying")
-                time.sleep(1)
-
-        # Convert data
-        js = data.json()
+        js = self.__get_json(url, scraper)
         logging.debug("Received " + str(js) + " from " + url)
 
         # Return json
@@ -122,21 +153,10 @@ class DiscordToJson():
         NOTE: that cond isn't used because there is a situation where broadcast may be 
         called before calling thread goes to sleep
         """
-        data = None
         # Process current task
         url = DISCORD_CHANNEL_CONTENT_PRE_API + channelID + DISCORD_CHANNEL_CONTENT_SUF_API + str(curr)
         logging.info(f"scanning {url}")
-        while not data:
-            try:
-                data = scraper.get(url, timeout=5, headers=HEADERS)
-            except(requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout):
-                logging.info("Connection error, retrying -> url: {s}".format(s=url))
-                
-        if not data:
-            logging.critical("Invalid data scraped -> url: {S}".format(s=url))
-        
-        # Convert data
-        js = data.json()    
+        js = self.__get_json(url, scraper)
             
         
         # Add data to js_buff
@@ -214,16 +234,8 @@ class DiscordToJson():
             self.__recent = {"channelID" : channelID, "skip" : skip + DISCORD_CHANNEL_CONTENT_SKIP_INCRE}
         
         # Grab data
-        data = None
         url = DISCORD_CHANNEL_CONTENT_PRE_API + channelID + DISCORD_CHANNEL_CONTENT_SUF_API + str(skip)
-        while not data:
-            try:
-                data = scraper.get(url, timeout=5, headers=HEADERS)
-            except(requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout):
-                logging.debug("Connection error, retrying")
-        
-        # Convert data
-        js = data.json()
+        js = self.__get_json(url, scraper)
         logging.debug("Received " + str(js) + " from " + url)
 
         # Return json
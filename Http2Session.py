@@ -0,0 +1,262 @@
+import asyncio
+import threading
+from requests.exceptions import ChunkedEncodingError, ContentDecodingError, ConnectionError, RequestException, Timeout, TooManyRedirects
+
+# Optional, HTTP/1.1 requests sessions are used when it is not installed
+try:
+    import httpx
+except ImportError:
+    httpx = None
+"""
+HTTP/2 transport for file downloads built on httpx. A single client is shared by all
+download threads and multiplexes their requests over a few connections instead of each
+thread holding its own HTTP/1.1 connection. Servers that do not offer HTTP/2 are spoken
+to over HTTP/1.1.
+
+Only the parts of requests.Session used by KMP.__download_file are provided and httpx
+errors are raised as their requests counterparts, so download code handles both
+transports the same way.
+
+Usage:
+    session = Http2Session()
+    r = session.get(url, stream=True, timeout=10)
+    StreamWriter(chunksz).write(r, fd)
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+MAX_THREADS = 32            # Download threads that may share a session, well under the streams a connection carries
+POOL_TIMEOUT = 300          # Seconds a request waits for a free connection, kept apart from the read timeout
+MAX_REDIRECTS = 5           # Same cap as the requests sessions
+
+def available() -> bool:
+    """
+    Returns True if httpx and its HTTP/2 support (h2) are installed
+    """
+    if httpx is None:
+        return False
+    try:
+        import h2
+    except ImportError:
+        return False
+    return True
+
+def _convert(e:Exception, reading:bool = False) -> RequestException:
+    """
+    Converts an httpx exception to the requests exception raised for the same failure
+
+    Param:
+        e: httpx exception
+        reading: True if raised while reading a response body, timeouts are then raised
+            as ConnectionError as requests does
+    Return: requests exception
+    """
+    # A full pool is not the server timing out
+    if isinstance(e, httpx.PoolTimeout):
+        return ConnectionError(e)
+    if isinstance(e, httpx.TimeoutException):
+        return ConnectionError(e) if reading else Timeout(e)
+    if isinstance(e, httpx.DecodingError):
+        return ContentDecodingError(e)
+    if isinstance(e, httpx.TooManyRedirects):
+        return TooManyRedirects(e)
+    if reading and isinstance(e, (httpx.RemoteProtocolError, httpx.StreamError)):
+        return ChunkedEncodingError(e)
+    if isinstance(e, httpx.TransportError):
+        return ConnectionError(e)
+    return RequestException(e)
+
+class RawStream():
+    """
+    Readable body of a streamed response, content encoding is already decoded.
+    Stands in for requests.Response.raw.
+    """
+    decode_content:bool         # Unused, body is always decoded
+    __session:'Http2Session'    # Session whose event loop reads the body
+    __chunks:object             # Async iterator of decoded body chunks
+    __pending:bytes             # Part of the last chunk not read yet
+
+    def __init__(self, session:'Http2Session', response) -> None:
+        """
+        Param:
+            session: session that made the request
+            response: streamed httpx.Response
+        """
+        self.decode_content = True
+        self.__session = session
+        self.__chunks = response.aiter_bytes()
+        self.__pending = b''
+
+    def readinto(self, buffer) -> int:
+        """
+        Reads until buffer is full or the body ends
+
+        Param:
+            buffer: writable buffer
+        Raise: requests.exceptions.RequestException on connection errors
+        Return: number of bytes read, 0 once the body has been read
+        """
+        try:
+            chunks = self.__session._run(self.__read(len(buffer)))
+        except httpx.HTTPError as e:
+            raise _convert(e, True)
+        filled = 0
+        for chunk in chunks:
+            buffer[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+        return filled
+
+    async def __read(self, size:int) -> list[bytes]:
+        """
+        Collects chunks on the event loop until size bytes are read or the body ends,
+        so a read crosses between threads once
+
+        Param:
+            size: max bytes to read
+        Return: chunks read, their total size is at most size
+        """
+        chunks = []
+        while size > 0:
+            if not self.__pending:
+                self.__pending = await anext(self.__chunks, b'')
+                if not self.__pending:
+                    break
+            chunks.append(self.__pending[:size])
+            size -= len(chunks[-1])
+            self.__pending = self.__pending[len(chunks[-1]):]
+        return chunks
+
+class Http2Response():
+    """
+    Response returned by Http2Session, has the attributes of requests.Response used for downloads
+    """
+    status_code:int             # HTTP status code
+    headers:object              # Case insensitive response headers
+    raw:RawStream|None          # Body of a streamed response, None if it was read
+    __session:'Http2Session'    # Session that made the request
+    __response:object           # Underlying httpx.Response
+
+    def __init__(self, session:'Http2Session', response, stream:bool) -> None:
+        """
+        Param:
+            session: session that made the request
+            response: httpx.Response
+            stream: True if response is streamed, its body is read through raw
+        """
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.raw = RawStream(session, response) if stream else None
+        self.__session = session
+        self.__response = response
+
+    def __bool__(self) -> bool:
+        """
+        Returns True if the status code is below 400, as requests.Response does
+        """
+        return self.status_code < 400
+
+    def close(self) -> None:
+        """
+        Closes the response, its stream is freed for other requests
+        """
+        self.__session._run(self.__response.aclose())
+
+class Http2Session():
+    """
+    Thread safe replacement for requests sessions used for downloading files.
+
+    httpcore's synchronous HTTP/2 connections can send a stream's headers after a later
+    stream's when several threads share them, which servers reject. Requests are instead
+    made by an async client on an event loop owned by the session, calling threads block
+    until their request or read completes.
+    """
+    __loop:asyncio.AbstractEventLoop    # Event loop running the client
+    __thread:threading.Thread           # Thread running __loop
+    __client:object                     # Shared httpx.AsyncClient
+
+    def __init__(self, max_connections:int = MAX_THREADS, prior_knowledge:bool = False, headers:dict|None = None) -> None:
+        """
+        Creates the shared client
+
+        Param:
+            max_connections: max connections, should be the number of threads sharing the session. Requests
+                to HTTP/2 servers share a connection, but each one needs its own before HTTP/2 is negotiated
+                and against servers that fall back to HTTP/1.1
+            prior_knowledge: True to speak HTTP/2 to http:// urls without negotiating it first,
+                for servers known to support it. https:// urls negotiate HTTP/2 and fall back to HTTP/1.1
+            headers: headers sent with every request
+        Pre: available() is True
+        """
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.__client = httpx.AsyncClient(http1=not prior_knowledge, http2=True, limits=limits, headers=headers,
+                                          follow_redirects=True, max_redirects=MAX_REDIRECTS)
+
+    def _run(self, coroutine):
+        """
+        Runs a coroutine on the session's event loop and waits for it, used by responses
+
+        Param:
+            coroutine: coroutine to run
+        Return: result of coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop).result()
+
+    def request(self, method:str, url:str, timeout:float|None = None, headers:dict|None = None, stream:bool = False) -> Http2Response:
+        """
+        Makes a request
+
+        Param:
+            method: HTTP method
+            url: url to request
+            timeout: seconds to wait for connecting and for each read, None to wait forever. Waiting for
+                a free connection is capped by POOL_TIMEOUT instead
+            headers: (Optional) extra headers
+            stream: True to read the body through the response's raw, False to read it now
+        Raise: requests.exceptions.RequestException on connection errors
+        Return: response, streamed responses must be read to the end or closed
+        """
+        try:
+            request = self.__client.build_request(method, url, headers=headers, timeout=httpx.Timeout(timeout, pool=POOL_TIMEOUT))
+            response = self._run(self.__client.send(request, stream=stream))
+        except httpx.HTTPError as e:
+            raise _convert(e)
+        return Http2Response(self, response, stream)
+
+    def get(self, url:str, **kwargs) -> Http2Response:
+        """
+        Makes a GET request, see request()
+        """
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url:str, **kwargs) -> Http2Response:
+        """
+        Makes a HEAD request, see request()
+        """
+        return self.request('HEAD', url, **kwargs)
+
+    def http_version(self, url:str, timeout:float|None = None) -> str:
+        """
+        Returns the HTTP version spoken with a server
+
+        Param:
+            url: url on the server
+            timeout: seconds to wait
+        Return: "HTTP/2" or "HTTP/1.1"
+        """
+        try:
+            return self._run(self.__client.head(url, timeout=timeout)).http_version
+        except httpx.HTTPError as e:
+            raise _convert(e)
+
+    def close(self) -> None:
+        """
+        Closes all connections and stops the event loop, cannot be reused
+        """
+        self._run(self.__client.aclose())
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
@@ -0,0 +1,211 @@
+import heapq
+import http.server
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+import requests
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+from Http2Session import Http2Session
+from StreamWriter import StreamWriter
+"""
+Benchmarks downloading many small images over HTTP/1.1 requests sessions, one per thread
+as KMP uses them, against a shared Http2Session. Both servers run locally and delay each
+response by the same latency to stand in for the round trip to the data host. Every
+image is a HEAD followed by a streamed GET, as in KMP.__download_file.
+
+The HTTP/2 server speaks h2c with prior knowledge, https data hosts negotiate HTTP/2 instead.
+
+Usage: python Http2Session_bench.py [images, default 600] [size in KB, default 64] [latency in ms, default 30]
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+class H11Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves size bytes for any GET or HEAD after waiting latency seconds
+    """
+    protocol_version = "HTTP/1.1"
+    body:bytes = b''
+    latency:float = 0
+
+    def do_HEAD(self) -> None:
+        time.sleep(self.latency)
+        self.__send_headers()
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency)
+        self.__send_headers()
+        self.wfile.write(self.body)
+
+    def __send_headers(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+
+    def log_message(self, *args) -> None:
+        pass
+
+class H2Server():
+    """
+    Minimal h2c server, answers every request with body after latency seconds. Responses
+    are scheduled on a timer so delayed streams do not block each other.
+    """
+    def __init__(self, body:bytes, latency:float) -> None:
+        self.__body = body
+        self.__latency = latency
+        self.__sock = socket.socket()
+        self.__sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__sock.bind(("127.0.0.1", 0))
+        self.__sock.listen(64)
+        self.__running = True
+
+    def start(self) -> int:
+        """
+        Starts serving in a daemon thread
+
+        Return: port
+        """
+        threading.Thread(target=self.__accept, daemon=True).start()
+        return self.__sock.getsockname()[1]
+
+    def stop(self) -> None:
+        self.__running = False
+        self.__sock.close()
+
+    def __accept(self) -> None:
+        while self.__running:
+            try:
+                client, _ = self.__sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.__serve, args=(client,), daemon=True).start()
+
+    def __serve(self, client:socket.socket) -> None:
+        """
+        Serves one connection until the client closes it
+        """
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        client.sendall(conn.data_to_send())
+        selector = selectors.DefaultSelector()
+        selector.register(client, selectors.EVENT_READ)
+        timers = []         # (due, stream id, head only)
+        sending = {}        # stream id -> remaining body
+        try:
+            while True:
+                timeout = max(0, timers[0][0] - time.monotonic()) if timers else None
+                if selector.select(timeout):
+                    data = client.recv(65536)
+                    if not data:
+                        return
+                    for event in conn.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            method = dict(event.headers).get(b':method', dict(event.headers).get(':method'))
+                            head = method in (b'HEAD', 'HEAD')
+                            heapq.heappush(timers, (time.monotonic() + self.__latency, event.stream_id, head))
+                        elif isinstance(event, h2.events.StreamReset):
+                            sending.pop(event.stream_id, None)
+
+                # Start responses that are due
+                while timers and timers[0][0] <= time.monotonic():
+                    _, stream_id, head = heapq.heappop(timers)
+                    conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'image/jpeg'), ('content-length', str(len(self.__body)))],
+                                      end_stream=head)
+                    if not head:
+                        sending[stream_id] = memoryview(self.__body)
+
+                # Send as much body as flow control allows
+                for stream_id in list(sending):
+                    remaining = sending[stream_id]
+                    n = min(len(remaining), conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                    while n > 0:
+                        conn.send_data(stream_id, remaining[:n].tobytes())
+                        remaining = remaining[n:]
+                        n = min(len(remaining), conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                    if len(remaining) == 0:
+                        conn.end_stream(stream_id)
+                        del sending[stream_id]
+                    else:
+                        sending[stream_id] = remaining
+                client.sendall(conn.data_to_send())
+        except (OSError, h2.exceptions.ProtocolError):
+            return
+        finally:
+            client.close()
+
+def download(session, url:str, writer:StreamWriter, sink) -> None:
+    """
+    Downloads url the way KMP.__download_file does
+    """
+    r = session.request('HEAD', url, timeout=10)
+    assert r.status_code == 200
+    data = session.get(url, stream=True, timeout=10)
+    written = writer.write(data, sink)
+    assert written == int(r.headers['Content-Length'])
+    data.close()
+
+def run(sessions:list, url:str, images:int) -> float:
+    """
+    Downloads images with one thread per session
+
+    Return: images per second
+    """
+    writer = StreamWriter(1024 * 1024)
+    remaining = list(range(0, images))
+    lock = threading.Lock()
+
+    def work(session) -> None:
+        with open(os.devnull, 'wb') as sink:
+            while True:
+                with lock:
+                    if not remaining:
+                        return
+                    i = remaining.pop()
+                download(session, url + str(i) + ".jpg", writer, sink)
+
+    threads = [threading.Thread(target=work, args=(session,)) for session in sessions]
+    start = time.perf_counter()
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+    return images / (time.perf_counter() - start)
+
+def main() -> None:
+    images = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else 64 * 1024
+    latency = int(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.03
+    body = os.urandom(size)
+
+    H11Handler.body = body
+    H11Handler.latency = latency
+    h11 = http.server.ThreadingHTTPServer(("127.0.0.1", 0), H11Handler)
+    h11.daemon_threads = True
+    threading.Thread(target=h11.serve_forever, daemon=True).start()
+    h2server = H2Server(body, latency)
+    h2port = h2server.start()
+
+    print("{} images of {} KB, {} ms latency".format(images, size // 1024, int(latency * 1000)))
+    for threads in (5, 16, 32):
+        sessions = [requests.Session() for _ in range(0, threads)]
+        rate = run(sessions, "http://127.0.0.1:{}/data/".format(h11.server_address[1]), images)
+        [session.close() for session in sessions]
+        print("HTTP/1.1 {:>3} threads, {:>3} connections {:>8.1f} images/s".format(threads, threads, rate))
+
+        session = Http2Session(prior_knowledge=True)
+        rate = run([session] * threads, "http://127.0.0.1:{}/data/".format(h2port), images)
+        session.close()
+        print("HTTP/2   {:>3} threads, {:>3} connections {:>8.1f} images/s".format(threads, 2, rate))
+
+    h11.shutdown()
+    h2server.stop()
+
+if __name__ == "__main__":
+    main()
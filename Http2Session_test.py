@@ -0,0 +1,113 @@
+import hashlib
+import http.server
+import io
+import os
+import socket
+import threading
+import unittest
+from unittest import mock
+import requests
+import Http2Session
+from StreamWriter import StreamWriter
+
+@unittest.skipUnless(Http2Session.available(), "httpx[http2] is not installed")
+class Http2SessionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        """
+        Starts an h2c and an HTTP/1.1 server serving the same body
+        """
+        from Http2Session_bench import H11Handler, H2Server
+        self.body = os.urandom(200 * 1024)
+        self.h2server = H2Server(self.body, 0.01)
+        self.h2url = "http://127.0.0.1:{}/data/".format(self.h2server.start())
+        H11Handler.body = self.body
+        H11Handler.latency = 0
+        self.h11 = http.server.ThreadingHTTPServer(("127.0.0.1", 0), H11Handler)
+        self.h11.daemon_threads = True
+        threading.Thread(target=self.h11.serve_forever, daemon=True).start()
+        self.h11url = "http://127.0.0.1:{}/data/".format(self.h11.server_address[1])
+
+    def download(self, session:Http2Session.Http2Session, url:str) -> bytes:
+        """
+        Downloads url the way KMP does, returns the body
+        """
+        r = session.request('HEAD', url, timeout=10)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(int(r.headers['Content-Length']), len(self.body))
+        data = session.get(url, stream=True, timeout=10)
+        fd = io.BytesIO()
+        StreamWriter(1024 * 64).write(data, fd)
+        data.close()
+        return fd.getvalue()
+
+    def test_http2(self) -> None:
+        """
+        Tests downloading over HTTP/2
+        """
+        session = Http2Session.Http2Session(prior_knowledge=True)
+        self.assertEqual(session.http_version(self.h2url + "0.jpg", timeout=10), "HTTP/2")
+        self.assertEqual(self.download(session, self.h2url + "0.jpg"), self.body)
+        session.close()
+
+    def test_fallback(self) -> None:
+        """
+        Tests servers without HTTP/2 are spoken to over HTTP/1.1
+        """
+        session = Http2Session.Http2Session()
+        self.assertEqual(session.http_version(self.h11url + "0.jpg", timeout=10), "HTTP/1.1")
+        self.assertEqual(self.download(session, self.h11url + "0.jpg"), self.body)
+        session.close()
+
+    def test_concurrent(self) -> None:
+        """
+        Tests many threads sharing one connection
+        """
+        session = Http2Session.Http2Session(max_connections=1, prior_knowledge=True)
+        expected = hashlib.sha256(self.body).hexdigest()
+        results = []
+
+        def work(i:int) -> None:
+            results.append(hashlib.sha256(self.download(session, self.h2url + str(i) + ".jpg")).hexdigest())
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(0, 32)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        session.close()
+        self.assertEqual(results, [expected] * 32)
+
+    def test_errors(self) -> None:
+        """
+        Tests httpx errors are raised as requests errors
+        """
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        session = Http2Session.Http2Session()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            session.request('HEAD', "http://127.0.0.1:{}/".format(port), timeout=1)
+        session.close()
+
+    def test_pool(self) -> None:
+        """
+        Tests waiting for a free connection has its own timeout and closed responses free theirs
+        """
+        session = Http2Session.Http2Session(max_connections=1)
+        held = session.get(self.h11url + "0.jpg", stream=True, timeout=10)
+        with mock.patch.object(Http2Session, "POOL_TIMEOUT", 0.2):
+            with self.assertRaises(requests.exceptions.ConnectionError) as raised:
+                session.get(self.h11url + "1.jpg", stream=True, timeout=10)
+        self.assertNotIsInstance(raised.exception, requests.exceptions.Timeout)
+        held.close()
+        self.assertEqual(self.download(session, self.h11url + "1.jpg"), self.body)
+        session.close()
+
+    def tearDown(self) -> None:
+        """
+        Stops the servers
+        """
+        self.h2server.stop()
+        self.h11.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,36 +1,49 @@
 from queue import Queue
+import hashlib
+import json
 import shutil
 import sqlite3
 from threading import Lock, Semaphore
 import traceback
 import requests
-from bs4 import BeautifulSoup, ResultSet
 import os
 import re
 import time
 import sys
-import cfscrape
-from tqdm import tqdm
 import logging
 import requests.adapters
 from datetime import datetime, timezone
 #import webbrowser
 from ssl import SSLError
 import threading
+from typing import TYPE_CHECKING
+from contextlib import closing
 
 
 from Threadpool import tname
-from DiscordtoJson import DiscordToJson
 from HashTable import HashTable
 from HashTable import KVPair
 from datetime import timedelta
 from Threadpool import ThreadPool
-import zipextracter
-import alive_progress
 from PersistentCounter import PersistentCounter
 import jutils
 from DB import DB
-
+from StreamWriter import StreamWriter
+from Metrics import Metrics
+from PageCache import PageCache
+from KeywordMatcher import KeywordMatcher
+from SpaceReserver import SpaceReserver
+import PlacementPolicy
+import fnames
+import TextFingerprint
+
+# Heavy dependencies are imported where they are first used so runs with little to do,
+# such as an --UPDATE that finds nothing new, start quickly
+if TYPE_CHECKING:
+    from MetricsServer import MetricsServer
+    from Http2Session import Http2Session
+    from ConcurrencyController import ConcurrencyController
+    from BandwidthLimiter import BandwidthLimiter
 
 """
 Simple kemono.party downloader relying on html parsing and download by url
@@ -40,10 +53,12 @@ Using multithreading
 @last modified 9/10/2023
 """
 request_headers = {}                                                                                            # Headers to be used for python requests, modified later on since is constantly changing
-LOG_PATH = os.path.abspath(".") + "\\logs\\"                                                                    # Directory for logging
+LOG_PATH = os.path.join(os.path.abspath("."), "logs", "")                                                              # Directory for logging
 LOG_NAME = LOG_PATH + "LOG - " + datetime.now(tz = timezone.utc).strftime('%a %b %d %H-%M-%S %Z %Y') +  ".txt"  # Name for log file to use
 LOG_MUTEX = Lock()                                                                                              # Mutex for log file
 download_format_types = ["image", "audio", "video", "plain", "stream", "application", "7z", "audio"]            # Download types for file attachments, can be modified by the user with switches
+MAX_ADAPTIVE_TCOUNT = 16                                                                                        # Most concurrent downloads --adaptive allows over HTTP/1.1
+DATA_HASH_PATTERN = re.compile(r'/data/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})')                                # Kemono data paths are named by the sha256 of their content
 
 class Error(Exception):
     """Base class for other exceptions"""
@@ -69,11 +84,21 @@ class KMP:
     Kemono.party downloader class, contains everything needed to download
     all of Kemono parties resources
     """
-    __folder: str               # Folder to download files to
+    __folder: str               # Folder to download files to, the first of roots
+    __roots:list[str]           # Download roots artists are placed across
+    __placement:PlacementPolicy.PlacementPolicy|None # Chooses the root of each artist, None without a download folder
     __unzip: bool               # Unzipping flag
     __tcount: int               # Thread count
+    __download_tcount:int       # Download thread count, more than tcount over http2 or when concurrency is adaptive
+    __concurrency:'ConcurrencyController|None' # Limits concurrent downloads by observed throughput, None for a fixed tcount
     __chunksz: int              # Size of chunks to download in
+    __writer:StreamWriter       # Writes download streams to files
+    __limiter:'BandwidthLimiter|None' # Caps the combined download rate, None for no cap
+    __space:SpaceReserver       # Reserves disk space for downloads and extractions
+    __preallocate:bool          # True to allocate files before downloading them
     __threads:ThreadPool        # Threadpool with tcount threads
+    __extract_tcount:int        # Extraction thread count
+    __extract_threads:ThreadPool    # Threadpool dedicated to unzipping archives
     __sessions:list             # requests sessions for threads
     __session:requests.Session  # request session for main thread
     __unpacked:bool             # Unpacked download type flag
@@ -85,8 +110,8 @@ class KMP:
     __fcount_mutex:Lock             # Mutex for fcount 
     __failed:int                    # Number of downloaded files
     __failed_mutex:Lock             # Mutex for fcount     
-    __post_name_exclusion:list[str] # Keywords in excluded posts
-    __link_name_exclusion:list[str] # Keywords in excluded posts
+    __post_name_exclusion:KeywordMatcher # Keywords in excluded posts
+    __link_name_exclusion:KeywordMatcher # Keywords in excluded links
     __ext_blacklist:HashTable       # Stores excluded extensions
     __timeout:int                   # Timeout for network issues
     __post_process:list             # Directories that require post processing when they contain text only
@@ -106,9 +131,17 @@ class KMP:
     __urls:list[str]                    # List of downloaded artist urls
     __latest_urls:list[str]             # List of downloaded artist's latest urls
     __override_paths:list[str]           # List of file paths to override old file paths if they exists in db
+    __file_writes:list[tuple]           # Files table writes queued by download threads, written by __update_db()
+    __file_writes_lock:Lock             # Lock for file writes
     __config:tuple                      # Download configuration
     __artist:list[str]                  # Downloaded artist name
     __reupdate:bool                     # True to reupdate, false to not
+    __verify:bool                       # True to verify tracked files, false to not
+    __metrics:Metrics                   # Per stage timings and counters of the run
+    __metrics_path:str|None             # File to append metrics to on close, None to not
+    __metrics_server:'MetricsServer|None' # Serves metrics over HTTP, None if disabled
+    __page_cache:PageCache|None         # Cache of scraped pages used for conditional requests, None if disabled
+    __http2:'Http2Session|None'         # HTTP/2 session shared by download threads, None to download with __sessions
     __date:bool                         # True to append date to files/folder, false to not
     __id:bool                           # True to prepend id to files/folder, false to not
     __rename:bool                      # True to rename tracked artist files (nothing is downloaded), false for regular operation.
@@ -121,23 +154,27 @@ class KMP:
     #__browser_active:bool               # True if browser for captcha has been open, false if not
     #__browser_active_mutex:Lock         # Mutex used for browser_active
      
-    def __init__(self, folder: str, unzip:bool, tcount: int | None, chunksz: int | None, ext_blacklist:list[str]|None = None , timeout:int = 30, http_codes:list[int] = None, post_name_exclusion:list[str]=[], download_server_name_type:bool = False,\
+    def __init__(self, folder: str | list[str], unzip:bool, tcount: int | None, chunksz: int | None, ext_blacklist:list[str]|None = None , timeout:int = 30, http_codes:list[int] = None, post_name_exclusion:list[str]=[], download_server_name_type:bool = False,\
         link_name_exclusion:list[str] = [], wait:float = 0, db_name:str = "KMP.db", track:bool = False, update:bool = False, exclcomments:bool = False, exclcontents:bool = False, minsize:float = 0, predupe:bool = False, prefix:str = "https://kemono.party", 
-        disableprescan:bool = False, date:bool = False, id:bool = False, rename:bool = False, tempextr:bool = True, root:str = os.path.dirname(os.path.realpath(__file__)), connect_timeout:int = 10, **kwargs) -> None:
+        disableprescan:bool = False, date:bool = False, id:bool = False, rename:bool = False, tempextr:bool = True, root:str = os.path.dirname(os.path.realpath(__file__)), connect_timeout:int = 10, 
+        extract_tcount:int | None = None, verify:bool = False, metrics_path:str | None = None, 
+        metrics_port:int | None = None, metrics_host:str = "127.0.0.1", page_cache_size:int = 0, page_cache_ttl:float = 0, http2:bool = False, adaptive:int = 0, bandwidth:str|None = None, 
+        min_free:int = 0, preallocate:bool = False, keyword_patterns:bool = False, **kwargs) -> None:
         """
         Initializes all variables. Does not run the program
 
         Param:
-            folder: Folder to download to, cannot be None
+            folder: Folder to download to, cannot be None. A list of folders places each artist in one of them
+                by free space and load, see PlacementPolicy
             unzip: True to automatically unzip files, false to not
-            tcount: Number of threads to use, max thread count is 12, default is 6
-            chunksz: Download chunk size, default is 1024 * 1024 * 64
+            tcount: Number of threads to use, max thread count is 5, or Http2Session.MAX_THREADS for downloads over http2. Default is 1
+            chunksz: Maximum download chunk size in bytes, chunk size adapts to connection speed up to this value. Default is 1024 * 1024 * 64
             ext_blacklist: List of file extensions to skips, does not contain '.' and no spaces
             timeout: Max retries, default is infinite (-1)
             http_codes: Codes to retry downloads for 
-            post_name_exclusion: keywords in excluded posts, must be all lowercase to be case insensitive
+            post_name_exclusion: keywords in excluded posts, case insensitive. Prefix with "re:" for a regex or "glob:" for a glob pattern if keyword_patterns is True
             download_server_name_type: True to download server file name, false to use a program defined naming scheme instead
-            link_name_exclusion: keyword in excluded link. The link is the plaintext, not the link pointer, must be all lowercase to be case insensitive.
+            link_name_exclusion: keyword in excluded link. The link is the plaintext, not the link pointer, case insensitive. Prefix with "re:" for a regex or "glob:" for a glob pattern if keyword_patterns is True
             wait: time in seconds to wait in between downloads.
             db_name: database name, this object creates or extends upon 2 tables named Parent & Child
             track: true to add entries to database, false otherwise
@@ -151,16 +188,33 @@ class KMP:
             tempextr: True to extract to a temp directory then move to dest directory, false to extract to the dest directory
             root: Root directory for files, default is where KMPDownloader.py is located
             connect_timeout: Timeout in seconds when a general connectivity error has occured.
+            extract_tcount: Number of threads used to unzip archives, default is half of the cpu count
+            verify: Verification mode, tracked files are checked against their sha256 instead of downloading artists. See verify()
+            metrics_path: json lines file to append per stage timings and counters to on close, None to not write them
+            metrics_port: Port to serve metrics on in the Prometheus text format, None to not serve them. See MetricsServer
+            metrics_host: Address to serve metrics on, default only allows local scrapes
+            page_cache_size: Max size in bytes of the page cache stored in root, 0 to disable it. See PageCache
+            page_cache_ttl: Seconds a cached page is used without asking the server if it changed, 0 to always ask
+            http2: True to download files over a shared HTTP/2 session, falls back to HTTP/1.1 if httpx[http2] is not installed. See Http2Session
+            adaptive: Max concurrent downloads, up to MAX_ADAPTIVE_TCOUNT or Http2Session.MAX_THREADS over http2. Concurrency starts at tcount and is adjusted by throughput, latency and rate limits. 
+                0 to always download with tcount threads. See ConcurrencyController
+            bandwidth: Combined download rate cap by time of day such as "0,09:00-18:00=2M", None for no cap. See BandwidthLimiter
+            min_free: Bytes to leave free on the download volume, files that do not fit are logged as failures. See SpaceReserver
+            preallocate: True to allocate each file's full size before downloading it, reduces fragmentation on spinning disks
+            keyword_patterns: True to compile "re:" and "glob:" exclusion keywords as patterns, False to match every keyword as plain text. See KeywordMatcher
             kwargs: not in use for now
+        Raise: re.error if a regex exclusion keyword is invalid
         """
         self.__connection_timeout = connect_timeout
         #self.__wait_browser_cond = threading.Condition()
         #self.__browser_active = Lock()
         self.__root = root
         tname.id = None
+        self.__roots = []
         if folder:
-            self.__folder = folder
-        elif not update and not kwargs["reupdate"]:
+            self.__roots = [folder] if isinstance(folder, str) else list(folder)
+            self.__folder = self.__roots[0]
+        elif not update and not kwargs["reupdate"] and not verify:
             raise UnspecifiedDownloadPathException
         self.__scount = 0
         self.__scount_mutex = Lock()
@@ -175,9 +229,9 @@ class KMP:
         self.__failed = 0
         self.__failed_mutex = Lock()
         self.__post_process = []
-        self.__post_name_exclusion = post_name_exclusion
+        self.__post_name_exclusion = KeywordMatcher(post_name_exclusion, keyword_patterns)
         self.__download_server_name_type = download_server_name_type
-        self.__link_name_exclusion = link_name_exclusion
+        self.__link_name_exclusion = KeywordMatcher(link_name_exclusion, keyword_patterns)
         self.__register_mutex = Lock()
         self.__db = DB(os.path.join(root, db_name))
         self.__update = update
@@ -186,6 +240,8 @@ class KMP:
         self.__urls = []    
         self.__latest_urls = []     
         self.__override_paths = []         
+        self.__file_writes = []
+        self.__file_writes_lock = Lock()
         self.__config = locals() 
         self.__artist = []       
         self.__container_prefix = prefix
@@ -202,20 +258,64 @@ class KMP:
         else:
             self.__http_codes = http_codes
         
+        if http2:
+            import Http2Session
+            if not Http2Session.available():
+                http2 = False
+                logging.warning("httpx[http2] is not installed, files are downloaded over HTTP/1.1")
+        
         if not tcount or tcount <= 0:
             self.__tcount = 1
         else:
             self.__tcount = min(5, tcount)
+        
+        # Downloads over HTTP/2 share the session's connections instead of holding one each,
+        # so more download threads are allowed. Pages are still fetched by at most 5 threads
+        if http2 and tcount and tcount > self.__tcount:
+            download_tcount = min(Http2Session.MAX_THREADS, tcount)
+        else:
+            download_tcount = self.__tcount
+        
+        if adaptive > 0:
+            self.__download_tcount = max(download_tcount, min(adaptive, Http2Session.MAX_THREADS if http2 else MAX_ADAPTIVE_TCOUNT))
+            from ConcurrencyController import ConcurrencyController
+            self.__concurrency = ConcurrencyController(download_tcount, 1, self.__download_tcount)
+        else:
+            self.__download_tcount = download_tcount
+            self.__concurrency = None
+            
+        if not extract_tcount or extract_tcount <= 0:
+            self.__extract_tcount = max(1, (os.cpu_count() or 2) // 2)
+        else:
+            self.__extract_tcount = extract_tcount
+        self.__extract_threads = ThreadPool(self.__extract_tcount)
+        self.__threads = ThreadPool(self.__download_tcount)
+        
+        # Pool allows a connection per download thread so none wait on it before HTTP/2 is negotiated
+        # or when a server only speaks HTTP/1.1
+        if http2:
+            self.__http2 = Http2Session.Http2Session(self.__download_tcount, headers=request_headers)
+        else:
+            self.__http2 = None
             
         if wait < 2:
             self.__wait = 2
         else:
             self.__wait = wait
 
-        if chunksz and chunksz > 0 and chunksz <= 12:
+        if chunksz and chunksz > 0:
             self.__chunksz = chunksz
         else:
             self.__chunksz = 1024 * 1024 * 64
+        if bandwidth:
+            import BandwidthLimiter
+            self.__limiter = BandwidthLimiter.parse(bandwidth)
+        else:
+            self.__limiter = None
+        self.__writer = StreamWriter(self.__chunksz, self.__limiter)
+        self.__space = SpaceReserver(min_free)
+        self.__placement = PlacementPolicy.PlacementPolicy(self.__roots, self.__space) if self.__roots else None
+        self.__preallocate = preallocate
         
         self.__unpacked = 0
         
@@ -226,9 +326,30 @@ class KMP:
         else:
             self.__ext_blacklist = None
         self.__reupdate = kwargs["reupdate"]
+        self.__verify = verify
+        self.__metrics = Metrics()
+        self.__metrics_path = metrics_path
+        # Pools are recreated by each routine so they are looked up on every read
+        self.__metrics.watch("download_queue", lambda: self.__threads.get_qsize())
+        self.__metrics.watch("extract_queue", lambda: self.__extract_threads.get_qsize())
+        if self.__concurrency:
+            self.__metrics.watch("concurrency_limit", self.__concurrency.limit)
+        if self.__limiter:
+            self.__metrics.watch("bandwidth_limit", self.__limiter.rate)
+        if metrics_port is not None:
+            from MetricsServer import MetricsServer
+            self.__metrics_server = MetricsServer(self.__metrics, metrics_port, metrics_host)
+            logging.info("Serving metrics on {}:{}".format(metrics_host, self.__metrics_server.start()))
+        else:
+            self.__metrics_server = None
+        if page_cache_size > 0:
+            self.__page_cache = PageCache(os.path.join(root, "PageCache.db"), page_cache_size, page_cache_ttl)
+            self.__metrics.watch("page_cache_hit_ratio", self.__page_cache.ratio)
+        else:
+            self.__page_cache = None
         self.__rename = rename
         # Create database  #############
-        if track or update or kwargs["reupdate"]:
+        if track or update or kwargs["reupdate"] or verify:
             # Check if database exists
             if os.path.exists(os.path.join(self.__root, db_name)):
                 # If exists, create a backup
@@ -241,6 +362,8 @@ class KMP:
             
             # Create a new table
             self.__db.executeNCommit("CREATE TABLE IF NOT EXISTS Parent2 (url TEXT, artist TEXT, type TEXT, latest TEXT, destination TEXT, config TEXT)")
+            # Files downloaded from Kemono data paths and their sha256, used by verify()
+            self.__db.executeNCommit("CREATE TABLE IF NOT EXISTS Files (path TEXT PRIMARY KEY, url TEXT, sha256 TEXT)")
              
             # Update older databases
             legacy_table:sqlite3.Cursor = self.__db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='Parent'").fetchall()
@@ -268,38 +391,54 @@ class KMP:
         
         # Create session ###########################
         self.__sessions = []
-        for _ in range(0, max(self.__tcount, self.__tcount)):
-            session = cfscrape.create_scraper(requests.Session())
-            session.max_redirects = 5
-            adapter = requests.adapters.HTTPAdapter(pool_connections=self.__tcount, pool_maxsize=self.__tcount, max_retries=0, pool_block=True)
-            session.mount('http://', adapter)
-            self.__sessions.append(session)
-        self.__session = cfscrape.create_scraper(requests.Session())
-        self.__session.max_redirects = 5
-        adapter = requests.adapters.HTTPAdapter(pool_connections=self.__tcount, pool_maxsize=self.__tcount, max_retries=0, pool_block=True)
-        self.__session.mount('http://', adapter)
+        for _ in range(0, self.__download_tcount):
+            self.__sessions.append(self.__create_session())
+        self.__session = self.__create_session()
         
-        # TODO choose better number
-        self.__existing_file_register = HashTable(10000000)
+        # Starts small and doubles as prescan registers files
+        self.__existing_file_register = HashTable(1024)
         self.__existing_file_register_lock = Lock()
         
-        # File prescan
-        if not disableprescan:
+        # File prescan, not needed when verifying as every file is already known
+        if not disableprescan and not verify:
             # If update is selected, read in all update paths
             if update or kwargs["reupdate"]:
                 # Use a set to skip ignore duplicate paths
                 update_path_set = {item[0] for item in self.__db.execute("SELECT destination FROM Parent2").fetchall()}
-                for path in update_path_set:
-                    self.__fregister_preload(path, self.__existing_file_register, self.__existing_file_register_lock)
+                self.__fregister_preload_all(list(update_path_set))
 
-            # If update is not selected, read from download folder
+            # If update is not selected, read from download folders
             else:
-                self.__fregister_preload(folder, self.__existing_file_register, self.__existing_file_register_lock)
+                self.__fregister_preload_all(self.__roots)
             logging.info("Finished scanning directory")
         
         self.__predupe = predupe        
     
         
+    def __fregister_preload_all(self, dirs:list[str]) -> None:
+        """
+        Registers all files within dirs to the existing file register. Each device is scanned by its own
+        thread, so disks are scanned at the same time but dirs sharing a disk are scanned one after another.
+
+        Param:
+            dirs: directories to scan, each ends with os.sep
+        """
+        groups = PlacementPolicy.group_by_device(dirs)
+        for dir in dirs:
+            if not any(dir in group for group in groups):
+                logging.warning("{} does not exists, preload skipped".format(dir))
+
+        def scan(group:list[str]) -> None:
+            for dir in group:
+                self.__fregister_preload(dir, self.__existing_file_register, self.__existing_file_register_lock)
+
+        if len(groups) == 1:
+            scan(groups[0])
+            return
+        threads = [threading.Thread(target=scan, args=(group,)) for group in groups]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+
     def __fregister_preload(self, dir:str, fregister:HashTable, mutex:Lock) -> None:
         """
         Registers all files and directories within a path to a Hashtable with multithreading
@@ -308,7 +447,7 @@ class KMP:
             path (str): Directory path to walk
             fregister (HashTable): If provided, appends to the hashtable
             mutex (Lock): Mutex to be used with fregister
-        Pre: path ends with '/' and uses '/'
+        Pre: path ends with os.sep
         Returns:
             HashTable: Hashtable with all file records if register is None
         """
@@ -323,15 +462,18 @@ class KMP:
         # Pull up current directory information
         contents = os.scandir(dir)
         
-        # Generate thread pool
-        file_pool = ThreadPool(100)
+        # Generate thread pool, sized for the device so spinning disks are not walked by many threads at once
+        import devices
+        walkers = devices.walker_count(dir)
+        logging.debug("Scanning {} ({}) with {} threads".format(dir, devices.storage_type(dir), walkers))
+        file_pool = ThreadPool(walkers)
         file_pool.start_threads()
                     
         # Iterate through all elements
         for file in contents:
             # If is a directory, recursive call into directory and append result
             if file.is_dir():
-                file_pool.enqueue((self.__fregister_preload_helper, (file_pool, file.path + '\\', fregister, mutex,)))
+                file_pool.enqueue((self.__fregister_preload_helper, (file_pool, file.path + os.sep, fregister, mutex,)))
 
             # TODO sort values by radix sort and implement binary search
 
@@ -407,7 +549,7 @@ class KMP:
             dir (str): directory to have the worker threads examine
             fregister (HashTable): Table to register data to
             mutex (Lock): Mutex for fregister
-        Pre: path ends with '/' and uses '/'
+        Pre: path ends with os.sep
         Returns:
             HashTable: Hashtable with all file records if register is None
         """
@@ -420,12 +562,13 @@ class KMP:
             
             # If is a directory, recursive call into directory and append result
             if file.is_dir():
-                pool.enqueue((self.__fregister_preload_helper, (pool, file.path + '\\', fregister, mutex,)))
+                pool.enqueue((self.__fregister_preload_helper, (pool, file.path + os.sep, fregister, mutex,)))
             # If not directory, get file size and remove any ()
+            # DirEntry caches its stat result, the file is only stat'ed once
             elif file.stat().st_size > 0:
                 # Get directory name by itself 
-                dir_partition = os.path.dirname(dir).rpartition("\\")
-                dir_name = dir_partition[2]
+                dir_partition = os.path.split(os.path.dirname(dir))
+                dir_name = dir_partition[1]
                 
                 # Generate basename of dir_name
                 base_dir_names = self.__basename_generator(dir_name)
@@ -433,7 +576,7 @@ class KMP:
                 base_file_names = self.__basename_generator(file.name)
                 
                 # Get file size
-                fsize = os.stat(file.path).st_size
+                fsize = file.stat().st_size
                 
                 # Recreate fullpath
                 dir_paths = [os.path.join(dir_partition[0], n) for n in base_dir_names] # Reconstruct dirpath
@@ -442,33 +585,27 @@ class KMP:
                     for base_file_name in base_file_names:
                         file_paths.append(os.path.join(dir_path, base_file_name))
                 
+                # Text files written by the program (contains __) are registered by fingerprint, the file
+                # is only read if a post's text has the same size. Shared by every basename of the file
+                fingerprint = TextFingerprint.from_file(file.path, fsize) if file.name.endswith("txt") and "__" in file.name else None
+                
                 for fullpath in file_paths:  
                     # Check if is text file and is a file written by the program (contains __)
-                    if(file.name.endswith("txt") and "__" in file.name):
-                        # Add file contents to register
-                        try:
-                            with open(file.path, 'r', encoding="utf-") as fd:
-                                # Text content of file
-                                contents = fd.read()
-                                
-                                mutex.acquire()
-                                # fullpath
-                                data = fregister.hashtable_lookup_value(fullpath)
-                                # If entry does not exists, add it               
-                                if not data:
-                                    fregister.hashtable_add(KVPair(fullpath, [hash(contents), file.path]))
-                                    
-                                # Else append data to currently existing entry if not already included in the entry
-                                elif(file.path not in data):
-                                    data.append(hash(contents))
-                                    data.append(file.path)
-                                    fregister.hashtable_edit_value(fullpath, data)      
-                                mutex.release()
-                        except(UnicodeDecodeError):
-                            logging.warning("UnicodeDecodeError in {}, skipping file".format(file.path))
-                            #os.remove(file.path)
-                        except Exception as e:
-                            logging.error("Handled an unknown exception, skipping file: {}".format(e.__class__.__name__))
+                    if fingerprint:
+                        # Add file fingerprint to register
+                        mutex.acquire()
+                        # fullpath
+                        data = fregister.hashtable_lookup_value(fullpath)
+                        # If entry does not exists, add it               
+                        if not data:
+                            fregister.hashtable_add(KVPair(fullpath, [fingerprint, file.path]))
+                            
+                        # Else append data to currently existing entry if not already included in the entry
+                        elif(file.path not in data):
+                            data.append(fingerprint)
+                            data.append(file.path)
+                            fregister.hashtable_edit_value(fullpath, data)      
+                        mutex.release()
                     else:    
                         # Add size value to register
                         mutex.acquire()
@@ -502,12 +639,48 @@ class KMP:
         """
         [session.close() for session in self.__sessions]
         self.__session.close()
+        if self.__http2:
+            self.__http2.close()
         
         # Update db
         if self.__db:
-            done = False
-            while not done:
-                try:
+            self.__update_db()
+            self.__db.close()
+        
+        if self.__metrics_path:
+            self.__metrics.dump_json(self.__metrics_path)
+        if self.__metrics_server:
+            self.__metrics_server.stop()
+        if self.__page_cache:
+            self.__page_cache.close()
+
+    def __record_file(self, cmd:tuple) -> None:
+        """
+        Thread safe; Queues a write to the Files table. Writes are made by __update_db() from
+        a single thread so download threads never share the database cursor.
+
+        Param:
+            cmd: sql command and its parameters
+        """
+        if self.__db:
+            with self.__file_writes_lock:
+                self.__file_writes.append(cmd)
+
+    def __update_db(self) -> None:
+        """
+        Writes the artists processed since the last call to Parent2 and commits, then writes
+        the queued Files table writes. Processed artists and written files are cleared afterwards.
+        
+        Pre: self.__db is not None
+        """
+        with self.__file_writes_lock:
+            file_writes = self.__file_writes
+            self.__file_writes = []
+        
+        done = False
+        while not done:
+            try:
+                with self.__metrics.timer("db_write"):
                     for i in range(0, len(self.__urls)):
                         # Check if db entry already exists
                         entry = self.__db.execute(("SELECT * FROM Parent2 WHERE url LIKE '%'||?", (self.__urls[i].rpartition(".")[2].partition('/')[2],),))
@@ -521,14 +694,18 @@ class KMP:
                             self.__db.execute(("DELETE FROM Parent2 WHERE url LIKE '%'||?", (self.__urls[i].rpartition(".")[2].partition('/')[2],),))
                         # Insert updated entry
                         self.__db.execute(("INSERT INTO Parent2 VALUES (?, ?, 'Kemono', ?, ?, ?)", (self.__urls[i], self.__artist[i], self.__latest_urls[i], self.__override_paths[i], str(self.__config) if not old_config else old_config),))
-                    done = True
-                except sqlite3.OperationalError:
-                    
-                    logging.warning("Database is locked, waiting 10s before trying again".format(self.__db))
-                    time.sleep(10)
+                    self.__db.commit()
+                    self.__db.executeBatchNCommit(file_writes)
+                done = True
+            except sqlite3.OperationalError:
+                
+                logging.warning("Database is locked, waiting 10s before trying again".format(self.__db))
+                time.sleep(10)
         
-            self.__db.commit()
-            self.__db.close()
+        self.__urls = []
+        self.__latest_urls = []
+        self.__override_paths = []
+        self.__artist = []
 
     def __submit_failure(self, msg:str|None) -> None:
         """
@@ -541,6 +718,7 @@ class KMP:
         self.__failed_mutex.acquire()
         self.__failed += 1
         self.__failed_mutex.release()
+        self.__metrics.count("failed")
     
     def __submit_progress(self) -> None:
         """
@@ -557,6 +735,7 @@ class KMP:
         self.__fcount_mutex.acquire()
         self.__fcount += 1
         self.__fcount_mutex.release()
+        self.__metrics.count("downloaded")
     
     def __submit_skipped(self)->None:
         """
@@ -565,7 +744,31 @@ class KMP:
         self.__scount_mutex.acquire()
         self.__scount += 1
         self.__scount_mutex.release()
+        self.__metrics.count("skipped")
         
+    def __acquire_slot(self) -> bool:
+        """
+        Waits until the concurrency controller allows another transfer, if concurrency is adaptive
+
+        Return: True if a slot was taken, it must be freed with __release_slot()
+        """
+        if self.__concurrency:
+            self.__concurrency.acquire()
+            return True
+        return False
+
+    def __release_slot(self, held:bool) -> bool:
+        """
+        Frees a slot taken by __acquire_slot()
+
+        Param:
+            held: True if a slot is held, nothing is freed if False
+        Return: False, the slot is no longer held
+        """
+        if held:
+            self.__concurrency.release()
+        return False
+
     def __download_file(self, src: str, fname: str, org_fname: str, display_bar:bool = True) -> None:
         """
         Downloads file at src. Skips if 
@@ -573,6 +776,9 @@ class KMP:
             (2) Contains blacklisted extensions
             (3) File's name and size matches a locally downloaded file
         However, if self.__rename is true, file will be renamed according to self's vars if src file matches a local copy
+        
+        Files from Kemono data paths are hashed while downloading and restarted if their sha256 does not match the
+        one in the path. With adaptive concurrency, a slot is held only while the file is requested and transferred.
         Param:
             src: src of image to download
             fname: what to name the file to download, with extensions. Absolute path
@@ -587,13 +793,14 @@ class KMP:
         # Configure tname and session #######################################################################################################
         if not tname.name:
             tname.name = "default thread name" 
-            session = cfscrape.create_scraper(requests.Session())
-            session.max_redirects = 5
-            adapter = requests.adapters.HTTPAdapter(pool_connections=self.__tcount, pool_maxsize=self.__tcount, max_retries=0, pool_block=True)
-            session.mount('http://', adapter)
-            close = True 
-        else:
+            if not self.__http2:
+                session = self.__create_session()
+                close = True 
+        elif not self.__http2:
             session = self.__sessions[tname.id]   
+        # Files are downloaded over the shared HTTP/2 session if there is one
+        if self.__http2:
+            session = self.__http2
         
         logging.debug("Downloading " + fname + " from " + src)
         r = None
@@ -603,7 +810,8 @@ class KMP:
         # Grabbing content length  ###########################################################################################################
         while not r:
             try:
-                r = session.request('HEAD', src, timeout=10)
+                with self.__metrics.timer("head"):
+                    r = session.request('HEAD', src, timeout=10)
                 if r.status_code >= 400:
                     if r.status_code in self.__http_codes and 'kemono' in src:
                         if timeout == self.__timeout:
@@ -614,6 +822,9 @@ class KMP:
                             return
                         else:
                             timeout += 1
+                            self.__metrics.count("rate_limited")
+                            if self.__concurrency:
+                                self.__concurrency.throttled()
                             logging.warning(f"Kemono party is rate limiting this download, download restarted in {self.__connection_timeout} seconds:\nCode: " + str(r.status_code) + "\nSrc: " + src + "\nFname: " + fname)
                             time.sleep(self.__connection_timeout)
                         
@@ -624,9 +835,11 @@ class KMP:
                             self.__submit_progress()
                         return
             except requests.exceptions.Timeout:
+                self.__metrics.count("retries")
                 logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
                 time.sleep(20)
             except(requests.exceptions.RequestException) as e:
+                self.__metrics.count("retries")
                 logging.warning(f"{e.__class__.__name__} has occured for {src} ({notifcation}), thread sleeping for {self.__connection_timeout} seconds.")
                 
                 notifcation+=1
@@ -654,7 +867,7 @@ class KMP:
         
         fullsize = r.headers.get('Content-Length')
 
-        f = fname.split('\\')[len(fname.split('\\')) - 1]   # File name only, used for bar display
+        f = os.path.basename(fname)   # File name only, used for bar display
 
         # If file does not have a length, it is most likely an invalid file
         if fullsize == None:
@@ -665,7 +878,8 @@ class KMP:
             fullsize = int(fullsize)
             
             # Check to see if file exists in the file register
-            self.__existing_file_register_lock.acquire()
+            with self.__metrics.timer("register_lock"):
+                self.__existing_file_register_lock.acquire()
             
             if self.__existing_file_register.hashtable_exist_by_key(org_fname) == -1:
                 # If does not exists, add an entry
@@ -682,6 +896,8 @@ class KMP:
                 done = False
                 downloaded = 0          # Used for updating the bar
                 failed = False
+                expected_hash = self.__expected_sha256(src)
+                mismatches = 0          # Number of hash mismatches, retries are capped by self.__timeout
                 
                 # Make a new file name according to number of matching fname entries
                 download_fname = fname
@@ -692,8 +908,8 @@ class KMP:
                     # Starts at 0 due to backward compatibility with previous dupe naming scheme
                     # predupe case
                     if self.__predupe:
-                        ftokens = fname.rpartition('\\')
-                        download_fname = ftokens[0] + "\\(" + str(i) + ") " + ftokens[2]
+                        ftokens = os.path.split(fname)
+                        download_fname = os.path.join(ftokens[0], "(" + str(i) + ") " + ftokens[1])
                     # postdupe case
                     else:
                         ftokens = fname.rpartition('.')     
@@ -702,17 +918,45 @@ class KMP:
                     
                 self.__existing_file_register_lock.release()
                 
+                # Space is reserved for the whole file so concurrent downloads cannot fill the volume mid-write
+                reserved = self.__space.reserve(download_fname, fullsize)
+                if not reserved:
+                    self.__metrics.count("no_space")
+                    logging.critical("Not enough free space to download file, writing error to log\nSrc: " + src + "\nFname: " + download_fname)
+                    self.__submit_failure("NO SPACE -> SRC: {src}, FNAME: {fname}\n".format(src=src, fname=download_fname))
+                    done = True
+                
+                held = False            # True while a concurrency slot is held, it is freed before any wait
                 while(not done):
                     try:
                         # Get the session
                         data = None
                         while not data:
                             try:
-                                data = session.get(src, stream=True, timeout=10, headers=headers)
+                                if not held:
+                                    held = self.__acquire_slot()
+                                start = time.perf_counter()
+                                with self.__metrics.timer("ttfb"):
+                                    data = session.get(src, stream=True, timeout=10, headers=headers)
+                                ttfb = time.perf_counter() - start
+                                # Error responses are requested again, their connection is freed first
+                                if not data:
+                                    data.close()
+                                    held = self.__release_slot(held)
+                                    if data.status_code == 429 or data.status_code >= 500:
+                                        self.__metrics.count("rate_limited")
+                                        if self.__concurrency:
+                                            self.__concurrency.throttled()
+                                    logging.warning(f"HTTP {data.status_code} has occured for {src}, thread sleeping for {self.__connection_timeout} seconds.")
+                                    time.sleep(self.__connection_timeout)
                             except requests.exceptions.Timeout:
+                                held = self.__release_slot(held)
+                                self.__metrics.count("retries")
                                 logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
                                 time.sleep(20)      
                             except(requests.exceptions.RequestException) as e:
+                                held = self.__release_slot(held)
+                                self.__metrics.count("retries")
                                 logging.warning(f"{e.__class__.__name__} has occured for {src}, thread sleeping for {self.__connection_timeout} seconds.")
                                 
                                 time.sleep(self.__connection_timeout)
@@ -720,7 +964,8 @@ class KMP:
                         # Download the file with visual bars 
                         if display_bar:
                             
-                            with open(download_fname, mode) as fd, tqdm(
+                            from tqdm import tqdm
+                            with closing(data), open(download_fname, mode) as fd, tqdm(
                                     desc=download_fname,
                                     total=fullsize - downloaded,
                                     unit='iB',
@@ -728,32 +973,40 @@ class KMP:
                                     leave=False,
                                     bar_format= tname.name + ": (" + str(self.__threads.get_qsize()) + ")->" + f + '[{bar}{r_bar}]',
                                     unit_divisor=int(1024)) as bar:
-                                for chunk in data.iter_content(chunk_size=self.__chunksz):
-                                    sz = fd.write(chunk)
-                                    fd.flush()
-                                    bar.update(sz)
-                                    downloaded += sz
-                                time.sleep(self.__wait)
+                                hasher = hashlib.sha256() if expected_hash else None
+                                with self.__metrics.track("transfers"), self.__metrics.timer("transfer"):
+                                    written = self.__writer.write(data, fd, bar.update, hasher, fullsize if self.__preallocate else 0)
+                                downloaded += written
+                                self.__metrics.count("bytes", written)
+                                if self.__concurrency:
+                                    self.__concurrency.record(written, ttfb)
                                 bar.clear()
+                            held = self.__release_slot(held)
+                            self.__delay()
                         else:
-                            with open(download_fname, 'wb') as fd:
+                            # Response is closed on every error so its connection is never left checked out
+                            with closing(data), open(download_fname, 'wb') as fd:
                                 
                                 try:
-                                    for chunk in data.iter_content(chunk_size=self.__chunksz):
-                                        if chunk:
-                                            sz = fd.write(chunk)
-                                            fd.flush()
-                                            downloaded += sz
-                                        else:
-                                            logging.error("Chunk not received")
+                                    hasher = hashlib.sha256() if expected_hash else None
+                                    with self.__metrics.track("transfers"), self.__metrics.timer("transfer"):
+                                        written = self.__writer.write(data, fd, hasher=hasher, preallocate=fullsize if self.__preallocate else 0)
+                                    downloaded += written
+                                    self.__metrics.count("bytes", written)
+                                    if self.__concurrency:
+                                        self.__concurrency.record(written, ttfb)
                                 except(SSLError):
                                     logging.error("SSL read error has occured on URL: {}".format(src))
                                     jutils.write_to_file(LOG_NAME, "SSL read error -> SRC: {src}, FNAME: {fname}\n".format(code=str(r.status_code), src=src, fname=download_fname), LOG_MUTEX)
                                     failed = True
                                 except requests.exceptions.Timeout:
+                                    held = self.__release_slot(held)
+                                    self.__metrics.count("retries")
                                     logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
                                     time.sleep(20)
                                 except(requests.exceptions.RequestException) as e:
+                                    held = self.__release_slot(held)
+                                    self.__metrics.count("retries")
                                     logging.warning(f"{e.__class__.__name__} has occured for {src}, thread sleeping for {self.__connection_timeout} seconds.")
                                     
                                     time.sleep(self.__connection_timeout)
@@ -761,41 +1014,76 @@ class KMP:
                                     logging.error("Handled an unknown exception: {}".format(e.__class__.__name__))
                                     jutils.write_to_file(LOG_NAME, "Unknown Exception {exc} -> SRC: {src}, FNAME: {fname}\n".format(exc=e.__class__.__name__, code=str(r.status_code), src=src, fname=download_fname), LOG_MUTEX)
                                     failed = True
+                            held = self.__release_slot(held)
                                 
                         # Checks if unrecoverable error as occured
                         if failed:
                             done = True
                             self.__submit_failure(None)
                         # Checks if the file is correctly downloaded, if so, we are done
-                        elif(os.stat(download_fname).st_size == fullsize):
+                        elif(os.stat(download_fname).st_size == fullsize and (not hasher or hasher.hexdigest() == expected_hash)):
                             done = True
                             logging.debug("Downloaded Size (" + download_fname + ") -> " + str(fullsize))
                             # Increment file download count, file is downloaded at this point
                             self.__submit_downloaded()
                             
-                            # Unzip file if specified
-                            if self.__unzip and zipextracter.supported_zip_type(download_fname):
-                                p = download_fname.rpartition('\\')[0] + "\\" + re.sub(r'[^\w\-_\. ]|[\.]$', '',
-                                                        download_fname.rpartition('\\')[2]).rpartition(" by")[0].strip() + "\\"
-                                self.__dir_lock.acquire()
-                                if not os.path.exists(p):
-                                    os.mkdir(p)
-                                self.__dir_lock.release()
-                                if not zipextracter.extract_zip(download_fname, p, temp=self.__tempextr):
-                                    self.__submit_failure("Extraction Failure -> FILE: {fname}\n".format(fname=download_fname))
+                            # Record the file's hash so it can be verified later on
+                            if expected_hash:
+                                self.__record_file(("INSERT OR REPLACE INTO Files VALUES (?, ?, ?)", (download_fname, src, expected_hash),))
+                            
+                            # The file is written and already taken out of the volume's free space
+                            if reserved:
+                                self.__space.release(download_fname, fullsize)
+                                reserved = False
+                            
+                            # Unzip file if specified, extraction is handed off so this download slot is freed
+                            if self.__unzip and self.__is_zip(download_fname):
+                                # Extracted output is reserved now so downloads made while it is queued leave room for it
+                                import zipextracter
+                                extract_size = zipextracter.uncompressed_size(download_fname)
+                                if not self.__space.reserve(self.__extract_dir(download_fname), extract_size, False):
+                                    self.__metrics.count("no_space")
+                                    logging.critical("Not enough free space to extract archive, writing error to log\nFname: " + download_fname)
+                                    self.__submit_failure("Extraction Failure, NO SPACE -> FILE: {fname}\n".format(fname=download_fname))
+                                elif self.__extract_threads.get_status():
+                                    self.__extract_threads.enqueue((self.__extract_file, (download_fname, extract_size)))
+                                else:
+                                    self.__extract_file(download_fname, extract_size)
+                        elif hasher and os.stat(download_fname).st_size == fullsize:
+                            mismatches += 1
+                            self.__metrics.count("hash_mismatch")
+                            if mismatches > self.__timeout >= 0:
+                                logging.critical("File does not match its sha256 after {} attempts, writing error to log\nSrc: {}\nFname: {}".format(mismatches, src, download_fname))
+                                self.__submit_failure("HASH MISMATCH -> SRC: {src}, FNAME: {fname}\n".format(src=src, fname=download_fname))
+                                # Corrupt file is removed so it is not mistaken for a complete download later on
+                                os.remove(download_fname)
+                                self.__record_file(("DELETE FROM Files WHERE path = ?", (download_fname,)))
+                                done = True
+                            else:
+                                logging.warning("File does not match its sha256, will be restarted!\nSrc: " + src + "\nFname: " + download_fname)
+                                downloaded = 0
+                                time.sleep(self.__connection_timeout)
                         else:
                             logging.warning("File not downloaded correctly, will be restarted!\nSrc: " + src + "\nFname: " + download_fname)
+                            downloaded = 0
                             time.sleep(self.__connection_timeout)
                             #headers = {'User-agent':'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/104.0.0.0 Safari/537.36',
                             #        'Range': 'bytes=' + str(downloaded) + '-' + str(fullsize)}
                             #mode = 'ab'
                     except(requests.exceptions.RequestException) as e:
+                        held = self.__release_slot(held)
+                        self.__metrics.count("retries")
                         logging.warning(f"{e.__class__.__name__} has occured for {src}, thread sleeping for {self.__connection_timeout} seconds.")
                         
                         time.sleep(self.__connection_timeout)
                     except FileNotFoundError:
                         logging.debug("Cannot be downloaded, file likely a link, not a file ->" + download_fname)
                         done = True
+                    finally:
+                        held = self.__release_slot(held)
+                
+                if reserved:
+                    self.__space.release(download_fname, fullsize)
     
             else:
                 self.__submit_skipped()
@@ -814,58 +1102,149 @@ class KMP:
         
         # Sleep before exiting
         logging.debug(f"Thread sleeping for {self.__wait} seconds after completing download")
-        time.sleep(self.__wait)
+        self.__delay()
 
-    def __trim_fname(self, fname: str) -> str:
+    def __delay(self) -> None:
+        """
+        Sleeps for the mandatory wait time, time slept is recorded as the wait stage
+        """
+        with self.__metrics.timer("wait"):
+            time.sleep(self.__wait)
+
+    def __get_page(self, url:str) -> tuple[str, str|None]:
         """
-        Trims fname, returns result. Extensions are kept:
-        For example
+        Gets a page, retrying until it is received. With a page cache, fresh pages are read from
+        the cache without a request, otherwise the request is made conditional on the page having 
+        changed and an unchanged page is read from the cache.
+
+        Param:
+            url: url of the page
+        Return: (page content, results parsed from the page if it came from the cache and had any stored, see PageCache.put_parsed())
+        """
+        cached = self.__page_cache.get(url) if self.__page_cache else None
+        if cached and cached.fresh:
+            self.__page_cache.hit(url)
+            return (cached.text, cached.parsed)
+        
+        headers = dict(request_headers, **cached.validators()) if cached else request_headers
+        reqs = None
+        while not reqs:
+            try:
+                with self.__metrics.timer("page"):
+                    reqs = self.__session.get(url, timeout=10, headers=headers)
+            except requests.exceptions.Timeout:
+                self.__metrics.count("retries")
+                logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
+                time.sleep(20)
+            except(requests.exceptions.RequestException) as e:
+                self.__metrics.count("retries")
+                logging.warning(f"{e.__class__.__name__} has occured for {url}, thread sleeping for {self.__connection_timeout} seconds.")
+                
+                time.sleep(self.__connection_timeout)
         
-        When ext length of ?<filename>.ext token is <= 6:
-        "/data/2f/33/2f33425e67b99de681eb7638ef2c7ca133d7377641cff1c14ba4c4f133b9f4d6.txt?f=File.txt"
-        -> File.txt
+        if self.__page_cache:
+            page = self.__page_cache.update(url, cached, reqs)
+        else:
+            page = (reqs.text, None)
+        reqs.close()
+        return page
+
+    def __expected_sha256(self, src:str) -> str|None:
+        """
+        Returns the sha256 embedded in a Kemono data path
 
-        Or
+        Param:
+            src: url of the file, for example
+                "https://kemono.party/data/2f/33/2f33425e67b99de681eb7638ef2c7ca133d7377641cff1c14ba4c4f133b9f4d6.txt?f=File.txt"
+        Return: sha256 hex digest in lowercase, None if src is not a data path
+        """
+        match = DATA_HASH_PATTERN.search(src)
+        return match.group(1) if match else None
 
-        When ext length of ?<filename>.ext token is > 6:
-        "/data/2f/33/2f33425e67b99de681eb7638ef2c7ca133d7377641cff1c14ba4c4f133b9f4d6.jpg?f=File.jpe%3Ftoken-time%3D1570752000..."
-        ->2f33425e67b99de681eb7638ef2c7ca133d7377641cff1c14ba4c4f133b9f4d6.jpg
+    def __create_session(self) -> requests.Session:
+        """
+        Creates a cloudflare scraper session with a connection pool sized to the thread count
 
-        Or
+        Return: session, caller is responsible for closing it
+        """
+        import cfscrape
+        session = cfscrape.create_scraper(requests.Session())
+        session.max_redirects = 5
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.__tcount, pool_maxsize=self.__tcount, max_retries=0, pool_block=True)
+        session.mount('http://', adapter)
+        return session
 
-        When ' ' exists
-        'Download まとめDL用.zip'
-        -> まとめDL用.zip
+    def __is_zip(self, fname:str) -> bool:
+        """
+        Checks if a file is an archive that can be extracted, see zipextracter.supported_zip_type()
+
+        Param:
+            fname: file name or path
+        Return: True if fname can be extracted
+        """
+        import zipextracter
+        return zipextracter.supported_zip_type(fname)
+
+    def __extract_dir(self, download_fname:str) -> str:
+        """
+        Returns the directory an archive is extracted into, space for the extracted output is reserved for it
+
+        Param:
+            download_fname: Absolute path of the downloaded archive
+        Return: directory named after the archive, ends with os.sep and may not exist yet
+        """
+        return os.path.join(os.path.dirname(download_fname), fnames.sanitize(os.path.basename(download_fname)).rpartition(" by")[0].strip(), "")
+
+    def __extract_file(self, download_fname:str, reserved:int = 0) -> None:
+        """
+        Extracts a downloaded archive into a directory of the same name. Is the task
+        run by the extraction threadpool.
+
+        Param:
+            download_fname: Absolute path of the downloaded archive
+            reserved: bytes reserved for the extracted output in __extract_dir(), taken out of the
+                reservation as members are extracted and released once extraction is done
+        Pre: download_fname is a supported zip type, see zipextracter.supported_zip_type()
+        """
+        # Any exception must be handled here, an exception escaping a pool thread kills it 
+        # before the task is marked done and join_queue() never returns
+        extracted = False
+        try:
+            p = self.__extract_dir(download_fname)
+            with self.__dir_lock:
+                if not os.path.exists(p):
+                    os.mkdir(p)
+            import zipextracter
+            with self.__metrics.timer("extract"):
+                extracted = zipextracter.extract_zip(download_fname, p, temp=self.__tempextr, progress=lambda n: self.__space.written(p, n))
+        except(Exception) as e:
+            logging.error("Handled an unknown exception while extracting {}: {}".format(download_fname, e.__class__.__name__))
+        finally:
+            if reserved:
+                self.__space.release(self.__extract_dir(download_fname), reserved)
+        if not extracted:
+            self.__submit_failure("Extraction Failure -> FILE: {fname}\n".format(fname=download_fname))
+        else:
+            # Archive is deleted once extracted, it can no longer be verified
+            self.__record_file(("DELETE FROM Files WHERE path = ?", (download_fname,)))
+
+    def __trim_fname(self, fname: str) -> str:
+        """
+        Trims fname, returns result. Extensions are kept, see fnames.trim()
 
         Param: 
             fname: file name
-        Pre: fname follows above conventions
         Return: trimmed filename with extension
         """
-        # Case 3, space
-        case3 = fname.partition(' ')[2]
-        if case3 != fname and len(case3) > 0:
-            return re.sub(r'[^\w\-_\. ]|[\.]$', '',
-                                          case3)
+        return fnames.trim(fname)
 
-        case1 = fname.rpartition('=')[2]
-        # Case 2, bad extension provided
-        if len(case1.rpartition('.')[2]) > 6:
-            first = fname.rpartition('?')[0]
-            return re.sub(r'[^\w\-_\. ]|[\.]$', '',
-                                          first.rpartition('/')[2])
-        
-        # Case 1, good extension
-        return re.sub(r'[^\w\-_\. ]|[\.]$', '',
-                                          case1)
-
-    def __queue_download_files(self, imgLinks: ResultSet, dir: str, org_dir: str, base_name:str | None, org_base_name:str | None, task_list:Queue|None, counter:PersistentCounter, postcounter:int|None = None) -> Queue:
+    def __queue_download_files(self, imgLinks: list[dict], dir: str, org_dir: str, base_name:str | None, org_base_name:str | None, task_list:Queue|None, counter:PersistentCounter, postcounter:int|None = None) -> Queue:
         """
         Puts all urls in imgLinks in threadpool download queue. If task_list is not None, then
         all urls will be added to task_list instead of being added to download queue.
 
         Param:
-        imgLinks: all image links within a Kemono container
+        imgLinks: {'href'} or {'src'} of all image links within a Kemono container, see __parse_post()
         dir: where to save the images
         base_name: Prefix to name files, None for just a counter
         task_list: list to store tasks into instead of directly processing them, None to directly process them
@@ -915,16 +1294,17 @@ class KMP:
                 
                 # Select the correct download name based on switch
                 if self.__download_server_name_type:
-                    fname = dir + base_name + self.__trim_fname(src)
-                    org_fname = org_dir + base_name + self.__trim_fname(src)
+                    fname = dir + base_name + fnames.trim(src)
+                    org_fname = org_dir + base_name + fnames.trim(src)
                     
                 else:
+                    ext = fnames.extension(src)
                     if not postcounter:
-                        fname = dir + base_name + str(counter.get()) + '.' + self.__trim_fname(src).rpartition('.')[2]
-                        org_fname = org_dir + org_base_name + str(counter.get()) + '.' + self.__trim_fname(src).rpartition('.')[2]          
+                        fname = dir + base_name + str(counter.get()) + '.' + ext
+                        org_fname = org_dir + org_base_name + str(counter.get()) + '.' + ext
                     else:
-                        fname = dir + base_name + str(counter.get()) + ' (' + str(postcounter) +').' + self.__trim_fname(src).rpartition('.')[2]
-                        org_fname = org_dir + org_base_name + str(counter.get()) + '.' + self.__trim_fname(src).rpartition('.')[2]          
+                        fname = dir + base_name + str(counter.get()) + ' (' + str(postcounter) +').' + ext
+                        org_fname = org_dir + org_base_name + str(counter.get()) + '.' + ext
 
                 if not task_list:
                     self.__threads.enqueue((self.__download_file, (src, fname, org_fname)))
@@ -933,13 +1313,13 @@ class KMP:
                 counter.toggle()
         return task_list
 
-    def __download_file_text(self, textLinks:ResultSet, dir:str, base_dir:str) -> None:
+    def __download_file_text(self, textLinks:list[tuple[str, str]], dir:str, base_dir:str) -> None:
         """
         Scrapes all text and their links in textLink and saves it to 
         in dir
 
         Param:
-            textLink: Set of links and their text in Files segment
+            textLink: (text, href) of each link in Files segment
             dir: Where to save the text and links to. Must be a .txt file
             base_dir: dir without any additions
         """
@@ -954,13 +1334,13 @@ class KMP:
             return
         
         # Record data
-        for txtlink in textLinks:
+        for name, href in textLinks:
             if frontOffset > 0:
                 frontOffset -= 1
             elif(endOffset < listSz - currOffset):
-                text = txtlink.get('href').strip()
+                text = href.strip()
                 if not text.isnumeric():
-                    strBuilder.append(txtlink.text.strip() + '\n')
+                    strBuilder.append(name + '\n')
                     strBuilder.append(text + '\n')
                     strBuilder.append("____________________________________________________________\n")
             currOffset += 1
@@ -1021,7 +1401,8 @@ class KMP:
         """
         writable = False
         if not lock:
-            self.__existing_file_register_lock.acquire()
+            with self.__metrics.timer("register_lock"):
+                self.__existing_file_register_lock.acquire()
         #hashed = hash(post_contents)
         values = self.__existing_file_register.hashtable_lookup_value(org_fname)
         # Check 3 conditions when renaming
@@ -1037,6 +1418,7 @@ class KMP:
                         try:
                             if values[index + 1] != (fname):
                                 os.rename(values[index + 1], fname)
+                                self.__record_file(("UPDATE OR REPLACE Files SET path = ? WHERE path = ?", (fname, values[index + 1])))
                                 logging.debug("Base name already exists: {}, Renaming local file {} to {}".format(org_fname, values[index + 1], fname))
                                 self.__clear_empty(os.path.dirname(values[index + 1]))
                             values[index + 1] = fname
@@ -1054,6 +1436,7 @@ class KMP:
                             elif fname != values[index + 1] and values[index] == value:
                                 logging.debug("Base name already exists: {} in local file {}, Deleting local file {}".format(org_fname, fname, values[index + 1]))
                                 os.remove(values[index + 1])
+                                self.__record_file(("DELETE FROM Files WHERE path = ?", (values[index + 1],)))
                                 self.__clear_empty(os.path.dirname(values[index + 1]))
                                 values = values[0:index] + values[index + 1:]
                                 values_copy = values_copy[0:index] + values_copy[index + 1:]
@@ -1126,65 +1509,36 @@ class KMP:
         # Determine which session to use
         if not tname.id:
             close = True
-            session = cfscrape.create_scraper(requests.Session())
-            session.max_redirects = 5
-            adapter = requests.adapters.HTTPAdapter(pool_connections=self.__tcount, pool_maxsize=self.__tcount, max_retries=0, pool_block=True)
-            session.mount('http://', adapter)
+            session = self.__create_session()
             close = True
         else:
             session = self.__sessions[tname.id]    
         
-        # Get HTML request and parse the HTML for image links and title ############
-        reqs = None
-        while not reqs:
-            try:
-                reqs = self.__session.get(url, timeout=10, headers=request_headers)
-            except requests.exceptions.Timeout:
-                logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
-                time.sleep(20)
-            except(requests.exceptions.RequestException) as e:
-                logging.warning(f"{e.__class__.__name__} has occured for {url}, thread sleeping for {self.__connection_timeout} seconds.")
-                
-                time.sleep(self.__connection_timeout)
-        soup = BeautifulSoup(reqs.text, 'html.parser')
-        while "500 Internal Server Error" in soup.find("title"):
+        # Get the post's links, content and comments ############
+        post = self.__get_post(url)
+        while "500 Internal Server Error" in post["title"]:
             logging.error("500 Server error encountered at " +
                           url + ", retrying...")
             time.sleep(self.__connection_timeout)
-            reqs = None
-            while not reqs:
-                try:
-                    reqs = self.__session.get(url, timeout=10, headers=request_headers)
-                except requests.exceptions.Timeout:
-                    logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
-                    time.sleep(20)
-                except(requests.exceptions.RequestException) as e:
-                    logging.warning(f"{e.__class__.__name__} has occured for {url}, thread sleeping for {self.__connection_timeout} seconds.")
-                    
-                    time.sleep(self.__connection_timeout)
-            soup = BeautifulSoup(reqs.text, 'html.parser')
-        imgLinks = soup.find_all("a", {'class':'fileThumb'})
+            post = self.__get_post(url)
+        imgLinks = post["files"]
         
         # Sleep for a little bit since request was successful
         logging.debug(f"Threading sleeping for {self.__wait} seconds since connection request was successful")
-        time.sleep(self.__wait)
+        self.__delay()
         
 
         # Create a new directory if packed or use artist directory for unpacked
-        work_name =  (re.sub(r'[^\w\-_\. ]|[\.]$', '', soup.find("title").text.strip())
-             ).split("\\")[0]
+        work_name =  fnames.sanitize(post["title"])
         backup = work_name + " - "
         org_work_name = ""
         
         # Check if a post is excluded
-        for keyword in self.__post_name_exclusion:
-            if keyword in work_name.lower():
-                logging.debug("Excluding {post}, kword: {kword}".format(post=work_name, kword=keyword) )
-                
-                # Close session if applicable
-                if close:
-                    session.close()
-                return
+        if self.__exclusion_check(self.__post_name_exclusion, work_name):
+            # Close session if applicable
+            if close:
+                session.close()
+            return
         
         # If not unpacked, need to consider if an existing dir exists
         if self.__unpacked < 2:
@@ -1193,29 +1547,26 @@ class KMP:
             id_str = None
             
             if self.__date:
-                time_tag = soup.find("div", {'class':'post__published'})
-                
-                # If is gumroad, time tag can be none
-                if time_tag:
-                    time_str = time_tag.text.strip().replace(':', '')
-                    
+                # If is gumroad, publish date can be none
+                time_str = post["published"]
             
             if self.__id:
                 id_str = url.rpartition("/")[2]
             
-            titleDir = os.path.join(root, ((id_str + " ") if id_str else "") + work_name + ((" " + time_str) if time_str else "")) + "\\"
-            org_titleDir = os.path.join(root, work_name) + "\\"
+            titleDir = os.path.join(root, ((id_str + " ") if id_str else "") + work_name + ((" " + time_str) if time_str else "")) + os.sep
+            org_titleDir = os.path.join(root, work_name) + os.sep
             work_name= ""
             
             self.__post_process.append((self.__clear_empty, (titleDir,)))
 
             
             # Check if directory has been registered ###################################
-            self.__register_mutex.acquire()
+            with self.__metrics.timer("register_lock"):
+                self.__register_mutex.acquire()
             value = self.__register.hashtable_lookup_value(titleDir.lower())
             if value != None:  # If register, update titleDir and increment value
                 self.__register.hashtable_edit_value(titleDir.lower(), value + 1)
-                titleDir = titleDir[:len(titleDir) - 1] + " (" + str(value) + ")\\"
+                titleDir = titleDir[:len(titleDir) - 1] + " (" + str(value) + ")" + os.sep
             else:   # If not registered, add to register at value 1
                 self.__register.hashtable_add(KVPair[str, int](titleDir.lower(), 1))
                 value = 0
@@ -1226,14 +1577,8 @@ class KMP:
             titleDir = root
             org_titleDir = root
             if self.__date:
-                time_tag = soup.find("div", {'class':'post__published'})
-                
-                # If is gumroad, time tag can be none
-                if time_tag:
-                    time_str = time_tag.text.strip().replace(':', '')
-                else:
-                    time_str = None
-                
+                # If is gumroad, publish date can be none
+                time_str = post["published"]
             else:
                 time_str = None
                 
@@ -1246,7 +1591,8 @@ class KMP:
             work_name = ((id_str + " ") if id_str else "") + work_name + ((" " + time_str) if time_str else "") + " - "
 
             # Add work_name to register
-            self.__register_mutex.acquire()
+            with self.__metrics.timer("register_lock"):
+                self.__register_mutex.acquire()
             value = self.__register.hashtable_lookup_value(work_name.lower())
             if value != None:  # If register, update titleDir and increment value
                 self.__register.hashtable_edit_value(work_name.lower(), value + 1)
@@ -1258,7 +1604,6 @@ class KMP:
         if not os.path.isdir(titleDir):
             os.makedirs(titleDir)
             
-        reqs.close()
 
         # Download all 'files' #####################################################
         # Image type
@@ -1268,45 +1613,16 @@ class KMP:
             self.__queue_download_files(imgLinks, titleDir, org_titleDir, work_name, org_work_name, task_list, counter, value if value > 0 else None)
         
         # Link type
-        self.__download_file_text(soup.find_all('a', {'target':'_blank'}), titleDir + work_name + "file__text.txt", org_titleDir + org_work_name + "file__text.txt")
-
-        # Scrape post content ######################################################
-        content = soup.find("div", class_="post__content")
+        self.__download_file_text(post["text_links"], titleDir + work_name + "file__text.txt", org_titleDir + org_work_name + "file__text.txt")
 
+        # Write post content ######################################################
         # Skip post content is switch is on
         if not self.__exclcontents:
-            if content:
-                text = content.getText(separator='\n', strip=True)
-                if len(text) > 0:
-                    # Text section
-                    post_contents = ""
-                    post_contents += text
-                    links = content.find_all("a")
-                    for link in links:
-                        hr = link.get('href')
-                        if not hr:
-                            logging.warning("Href returns None at url: {u}".format(u=url))
-                        else:
-                            post_contents += ("\n" + hr)
-                    
-                    # Nested content
-                    containers = content.find_all("div")
-                    prev = None     # Used to get the entire div, not the internal nested divs
-                    
-                    if containers:
-                        for container in containers:  
-                            # Ignore empty containers
-                            if len(container.contents) > 0:
-                                                          
-                                # check if the current container is nested within the previous one
-                                if not prev or (prev and container.contents[0] not in prev):
-                                    # if not, write to file
-                                    post_contents += ("\n" + "Embedded Container: {}".format(container.contents[0]))
-                                
-                                # update prev
-                                prev = container.contents[0]
-                    
-                    hashed = hash(post_contents)
+            # Content images are None if the post has no content section
+            if post["content_imgs"] is not None:
+                post_contents = post["content"]
+                if post_contents:
+                    hashed = TextFingerprint.from_text(post_contents)
                     writable = self.__dupe_file_procedure(titleDir + work_name + "post__content.txt", org_titleDir + org_work_name + "post__content.txt", hashed)
 
                     # Write to file
@@ -1330,45 +1646,39 @@ class KMP:
                 
                 # Image Section
                 if self.__unpacked < 2:
-                    task_list = self.__queue_download_files(content.find_all('img'), titleDir, org_titleDir, work_name, org_work_name, task_list, counter)
+                    task_list = self.__queue_download_files(post["content_imgs"], titleDir, org_titleDir, work_name, org_work_name, task_list, counter)
                 else:
-                    task_list = self.__queue_download_files(content.find_all('img'), titleDir, org_titleDir, work_name, org_work_name, task_list, counter, value)
+                    task_list = self.__queue_download_files(post["content_imgs"], titleDir, org_titleDir, work_name, org_work_name, task_list, counter, value)
         # Download post attachments ##############################################
-        attachments = soup.find_all("a", class_="post__attachment-link")
-        if attachments:
-            for attachment in attachments:
-                if not attachment:
-                    logging.fatal("No href on {}".format(url))
-                download = attachment.get('href')
-                # Confirm that mime type of attachment is not html or None
-                if download:
-                    src = download if "http" in download else self.__container_prefix + download
-                    aname =  self.__trim_fname(attachment.text.strip())
+        for download, aname in post["attachments"]:
+            # Confirm that mime type of attachment is not html or None
+            if download:
+                src = download if "http" in download else self.__container_prefix + download
+                aname =  fnames.trim(aname)
+                
+                if self.__unpacked == 2 and value > 0:
+                    aname = aname.rpartition('.')[0] + " (" + str(value) + ")." + aname.rpartition(".")[2]
+                # If src does not contain excluded keywords, download it
+                if not self.__exclusion_check(self.__link_name_exclusion, aname):
+                    fname = os.path.join(titleDir, work_name + aname)
+                    oname = os.path.join(org_titleDir, org_work_name + aname)
                     
-                    if self.__unpacked == 2 and value > 0:
-                        aname = aname.rpartition('.')[0] + " (" + str(value) + ")." + aname.rpartition(".")[2]
-                    # If src does not contain excluded keywords, download it
-                    if not self.__exclusion_check(self.__link_name_exclusion, aname):
-                        fname = os.path.join(titleDir, work_name + aname)
-                        oname = os.path.join(org_titleDir, org_work_name + aname)
-                        
-                        if task_list:
-                            task_list.put((self.__download_file, (src, fname, oname, False)))
-                        else:
-                            self.__threads.enqueue((self.__download_file, (src, fname, oname)))
+                    if task_list:
+                        task_list.put((self.__download_file, (src, fname, oname, False)))
+                    else:
+                        self.__threads.enqueue((self.__download_file, (src, fname, oname)))
         
 
 
         # Download post comments ################################################
         # Skip if omit comment switch is on
         if not self.__exclcomments:
-            comments = soup.find("div", class_="post__comments")
+            text = post["comments"]
 
             # Check for duplicate and writablility
-            if comments:
-                text = comments.getText(separator='\n', strip=True) 
+            if text:
                 if len(text) > 0 and (text and text != "No comments found for this post." and len(text) > 0):
-                    hashed = hash(text)
+                    hashed = TextFingerprint.from_text(text)
                     writable = self.__dupe_file_procedure(titleDir + work_name + "post__comments.txt", org_titleDir + org_work_name + "post__comments.txt", hashed)
 
                     # Write to file
@@ -1399,21 +1709,19 @@ class KMP:
         logging.info("Finished scanning {}".format(url))
         return task_list
     
-    def __exclusion_check(self, tokens:list[str], target:str)->bool:
+    def __exclusion_check(self, matcher:KeywordMatcher, target:str)->bool:
         """
         Checks if target contains an excluded token
 
         Args:
-            tokens (list[str]): _description_
-            target (str): _description_
+            matcher (KeywordMatcher): excluded keywords
+            target (str): string to check
         Returns: True if contians excluded keywords, false if does not
         """
-        target = target.lower()
-        # check if src contains excluded keywords
-        for kword in tokens:
-            if kword in target:
-                logging.debug("Excluding {post}, kword: {kword}".format(post=target, kword=kword))
-                return True
+        kword = matcher.search(target)
+        if kword is not None:
+            logging.debug("Excluding {post}, kword: {kword}".format(post=target, kword=kword))
+            return True
         return False
     
     def __partial_unpack_post_process(self, src:str, dest:str)->None:
@@ -1434,6 +1742,7 @@ class KMP:
         # If not returned, move everything and delete old folder
         for f in os.listdir(src):
             shutil.move(src + f, dest + f)
+            self.__record_file(("UPDATE OR REPLACE Files SET path = ? WHERE path = ?", (dest + f, src + f)))
         shutil.rmtree(src)    
         return
 
@@ -1451,55 +1760,40 @@ class KMP:
         Return: If get_list is true, a list of tasks needed to process the data is returned.
         Post: pool may not have completed all of its tasks 
         """
-        reqs = None
         task_list:Queue = None
         
         if get_list:
             task_list = Queue(0)
              
         # Make a connection
-        while not reqs:
-            try:
-                reqs = self.__session.get(url, timeout=10, headers=request_headers)
-            except requests.exceptions.Timeout:
-                logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
-                time.sleep(20)
-            except(requests.exceptions.RequestException) as e:
-                logging.warning(f"{e.__class__.__name__} has occured for {url}, thread sleeping for {self.__connection_timeout} seconds.")
-                
-                time.sleep(self.__connection_timeout)
-        soup = BeautifulSoup(reqs.text, 'html.parser')
-        reqs.close()
+        artist, contLinks = self.__get_window(url)
         # Create directory
-        artist = soup.find("meta", attrs={'name': 'artist_name'})
-        titleDir = (override_path if override_path else self.__folder) + re.sub(r'[^\w\-_\. ]|[\.]$', '',
-                                          artist.get('content')) + "\\"
+        root = override_path if override_path else self.__placement.choose(fnames.sanitize(artist))
+        titleDir = root + fnames.sanitize(artist) + os.sep
         
         # Check to see if artist dir exists
         if not os.path.isdir(titleDir):
             # If updater is used, skip if dir does nto exists
             if self.__update or self.__reupdate:
-                logging.warning("{} does not exists! Skipping {}".format(titleDir, artist.get('content')))
+                logging.warning("{} does not exists! Skipping {}".format(titleDir, artist))
                 return task_list
             # Otherwise, make the directory
             os.makedirs(titleDir)
         
-        contLinks = soup.find_all("a", href=lambda href: href and "/post/" in href)
         suffix = "?o="
         counter = 0
         
         # Update db if window is continuous
         if continuous and self.__db:
             self.__urls.append(url)
-            self.__latest_urls.append((contLinks[0]['href'] if "http" in contLinks[0]['href'] else self.__container_prefix + contLinks[0]['href']) if len(contLinks) > 0 else None)
-            self.__override_paths.append(override_path if override_path else self.__folder)
-            self.__artist.append(artist.get('content'))
+            self.__latest_urls.append((contLinks[0][0] if "http" in contLinks[0][0] else self.__container_prefix + contLinks[0][0]) if len(contLinks) > 0 else None)
+            self.__override_paths.append(root)
+            self.__artist.append(artist)
            
         # Process each window
         while contLinks:
             # Process all links on page
-            for link in contLinks:
-                content = link['href']
+            for content, title in contLinks:
                 
                 # Generate check url
                 checkurl = content if "http" in content else self.__container_prefix + content
@@ -1510,29 +1804,130 @@ class KMP:
                 elif(checkurl == stop_url):
                     return task_list
                 
+                # Excluded posts are skipped using their listing title so their page is never fetched,
+                # __process_container checks again as the post page's title also contains the artist
+                if title and self.__post_name_exclusion and self.__exclusion_check(self.__post_name_exclusion, fnames.sanitize(title)):
+                    self.__metrics.count("pages_avoided")
+                    continue
+                
                 pool.enqueue((self.__process_container, (content if "http" in content else self.__container_prefix + content, titleDir, task_list,)))
             if continuous:
                 # Move to next window
                 counter += 50       # Adjusted to 50 for the new site
-                reqs = None
-                while not reqs:
-                    try:
-                        reqs = self.__session.get(url + suffix + str(counter), timeout=10, headers=request_headers)
-                    except requests.exceptions.Timeout:
-                        logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
-                        time.sleep(20)
-                    except(requests.exceptions.RequestException) as e:
-                        logging.warning(f"{e.__class__.__name__} has occured for {url + suffix + str(counter)}, thread sleeping for {self.__connection_timeout} seconds.")
-                        
-                        time.sleep(self.__connection_timeout)
-                soup = BeautifulSoup(reqs.text, 'html.parser')
-                reqs.close()
-                contLinks = soup.find_all("a", href=lambda href: href and "/post/" in href)
+                contLinks = self.__get_window(url + suffix + str(counter))[1]
             else:
                 contLinks = None
         return task_list
 
 
+    def __get_post(self, url:str) -> dict:
+        """
+        Gets the parts of a post used by __process_container(). With a page cache, they are
+        reused without parsing if the post has not changed since it was cached.
+
+        Param:
+            url: url of the post
+        Return: post, see __parse_post()
+        """
+        text, parsed = self.__get_page(url)
+        if parsed:
+            return json.loads(parsed)
+        
+        with self.__metrics.timer("parse"):
+            post = self.__parse_post(url, text)
+        if self.__page_cache and "500 Internal Server Error" not in post["title"]:
+            self.__page_cache.put_parsed(url, json.dumps(post))
+        return post
+
+    def __parse_post(self, url:str, text:str) -> dict:
+        """
+        Parses a post page into plain values that can be stored in the page cache
+
+        Param:
+            url: url of the post
+            text: post page
+        Return: dict of
+            title: page title
+            published: publish date without ':', None if the post has none
+            files: {'href'} of each link in the Files section
+            text_links: (text, href) of each link opened in a new tab
+            content: post content text followed by its links and embedded containers, None if it has no text
+            content_imgs: {'src'} of each image in the post content, None if there is no post content
+            attachments: (href, text) of each attachment link
+            comments: comment section text, None if there is no comment section
+        """
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(text, 'html.parser')
+        title = soup.find("title")
+        time_tag = soup.find("div", {'class':'post__published'})
+        post = {"title": title.text.strip() if title else "",
+                "published": time_tag.text.strip().replace(':', '') if time_tag else None,
+                "files": [{"href": link.get('href')} for link in soup.find_all("a", {'class':'fileThumb'})],
+                "text_links": [(link.text.strip(), link.get('href')) for link in soup.find_all('a', {'target':'_blank'})],
+                "content": None,
+                "content_imgs": None,
+                "attachments": [(link.get('href'), link.text.strip()) for link in soup.find_all("a", class_="post__attachment-link")],
+                "comments": None}
+        
+        content = soup.find("div", class_="post__content")
+        if content:
+            text = content.getText(separator='\n', strip=True)
+            if len(text) > 0:
+                # Text section
+                post_contents = text
+                for link in content.find_all("a"):
+                    hr = link.get('href')
+                    if not hr:
+                        logging.warning("Href returns None at url: {u}".format(u=url))
+                    else:
+                        post_contents += ("\n" + hr)
+                
+                # Nested content
+                prev = None     # Used to get the entire div, not the internal nested divs
+                for container in content.find_all("div"):
+                    # Ignore empty containers
+                    if len(container.contents) > 0:
+                        # check if the current container is nested within the previous one
+                        if not prev or (prev and container.contents[0] not in prev):
+                            post_contents += ("\n" + "Embedded Container: {}".format(container.contents[0]))
+                        prev = container.contents[0]
+                post["content"] = post_contents
+            post["content_imgs"] = [{"src": img.get('src')} for img in content.find_all('img')]
+        
+        comments = soup.find("div", class_="post__comments")
+        if comments:
+            post["comments"] = comments.getText(separator='\n', strip=True)
+        return post
+
+    def __get_window(self, url:str) -> tuple[str|None, list[tuple[str, str|None]]]:
+        """
+        Gets the artist name and posts of a window. With a page cache, both are reused
+        without parsing if the window has not changed since it was cached.
+
+        Param:
+            url: url of the window
+        Return: (artist name or None if not found, (href, title or None if not found) of each post in the window)
+        """
+        text, parsed = self.__get_page(url)
+        if parsed:
+            parsed = json.loads(parsed)
+            # Windows cached without post titles are parsed again
+            if isinstance(parsed, dict):
+                return (parsed["artist"], [tuple(post) for post in parsed["posts"]])
+        
+        from bs4 import BeautifulSoup
+        with self.__metrics.timer("parse"):
+            soup = BeautifulSoup(text, 'html.parser')
+            artist = soup.find("meta", attrs={'name': 'artist_name'})
+            artist = artist.get('content') if artist else None
+            posts = []
+            for link in soup.find_all("a", href=lambda href: href and "/post/" in href):
+                header = link.find("header")
+                posts.append((link['href'], header.text.strip() if header else None))
+        if self.__page_cache:
+            self.__page_cache.put_parsed(url, json.dumps({"artist": artist, "posts": posts}))
+        return (artist, posts)
+
     def __download_discord_js(self, jsList:dict, titleDir:str, get_list:bool) -> list[str] | tuple:
         """
         Downloads any file found in js and returns text data
@@ -1547,7 +1942,7 @@ class KMP:
         Return: Buffer containing text data, if get_list is true, return a tuple where text data is
                     [0] and download data is [1]
         """
-        imageDir = titleDir + "images\\"
+        imageDir = os.path.join(titleDir, "images", "")
         counter = 0
         task_list = None
         if get_list:
@@ -1619,14 +2014,14 @@ class KMP:
         TODO UPDATE
         Param:
             serverJS: discord server json token, in format {"id":xxx,"name":xxx}
-            titleDir: Where to store discord content, absolute directory ends with '\\'
+            titleDir: Where to store discord content, absolute directory ends with os.sep
         """
-        dir = titleDir + serverJs.get('name') + '\\'
+        dir = titleDir + serverJs.get('name') + os.sep
         # Make sure a dupe directory does not exists, if so, adjust dir name
         value = self.__register.hashtable_lookup_value(dir.lower())
         if value != None:  # If register, update titleDir and increment value
             self.__register.hashtable_edit_value(dir.lower(), value + 1)
-            dir = dir[0:len(dir) - 1] + " (" + str(value) + ")\\"
+            dir = dir[0:len(dir) - 1] + " (" + str(value) + ")" + os.sep
         else:   # If not registered, add to register at value 1
             self.__register.hashtable_add(KVPair[str, int](dir.lower(), 1))
 
@@ -1640,7 +2035,8 @@ class KMP:
             os.remove(dir + text_file)
         self.__dir_lock.release()
         # Read every json on the server and put it in queue
-        discordScraper = DiscordToJson()
+        from DiscordtoJson import DiscordToJson
+        discordScraper = DiscordToJson(self.__page_cache)
         js = discordScraper.discord_lookup_all(serverJs.get("id"), threads=self.__tcount, sessions=self.__sessions)
         
         data = self.__download_discord_js(js, dir, get_list=get_list)
@@ -1664,7 +2060,8 @@ class KMP:
             url: discord url
             titleDir: directory to store discord content
         """
-        discordScraper = DiscordToJson()
+        from DiscordtoJson import DiscordToJson
+        discordScraper = DiscordToJson(self.__page_cache)
         dir = titleDir
 
         # Makedir
@@ -1724,20 +2121,25 @@ class KMP:
             reqs = None
             while not reqs:
                 try:
-                    reqs = self.__session.get(url, timeout=10, headers=request_headers)
+                    with self.__metrics.timer("page"):
+                        reqs = self.__session.get(url, timeout=10, headers=request_headers)
                 except requests.exceptions.Timeout:
+                    self.__metrics.count("retries")
                     logging.warning("Connection timed out, this may be due to CAPTCHA, please open Kemono and solve the captcha, program will sleep for 20 seconds")
                     time.sleep(20)
                 except(requests.exceptions.RequestException) as e:
+                    self.__metrics.count("retries")
                     logging.warning(f"{e.__class__.__name__} has occured for {url}, thread sleeping for {self.__connection_timeout} seconds.")
                     
                     time.sleep(self.__connection_timeout)
             if(reqs.status_code >= 400):
                 logging.error("Status code " + str(reqs.status_code))
-            soup = BeautifulSoup(reqs.text, 'html.parser')
+            from bs4 import BeautifulSoup
+            with self.__metrics.timer("parse"):
+                soup = BeautifulSoup(reqs.text, 'html.parser')
             artist = soup.find("a", attrs={'class': 'post__user-name'})
-            titleDir = self.__folder + \
-                re.sub(r'[^\w\-_\. ]|[\.]$', '', artist.text.strip()) + "\\"
+            artist_dir = fnames.sanitize(artist.text.strip())
+            titleDir = self.__placement.choose(artist_dir) + artist_dir + os.sep
             if not os.path.isdir(titleDir):
                 os.makedirs(titleDir)
             reqs.close()
@@ -1746,11 +2148,12 @@ class KMP:
 
         # Discord requires a totally different method compared to other services as we are making API calls instead of scraping HTML
         elif 'discord' in url:
-            task_list = self.__process_discord(url, self.__folder + url.rpartition('/')[2] + "\\", get_list=get_list)
+            server = url.rpartition('/')[2]
+            task_list = self.__process_discord(url, self.__placement.choose(server) + server + os.sep, get_list=get_list)
 
             # Add entry to database
             #if self.__db:
-            #    self.__db.execute(("INSERT INTO Parent VALUES (?, 'Kemono', ?)", (url, self.__folder + url.rpartition('/')[2] + "\\")))
+            #    self.__db.execute(("INSERT INTO Parent VALUES (?, 'Kemono', ?)", (url, self.__folder + url.rpartition('/')[2] + os.sep)))
 
         # For multiple window pages
         elif 'user' in url:
@@ -1798,6 +2201,15 @@ class KMP:
         threads.join_queue()
         threads.kill_threads()
 
+    def __clear_extraction_state(self) -> None:
+        """
+        Forgets directory fingerprints memoized by extractions, called once extractions of a run
+        are done so watch mode does not reuse them on its next poll
+        """
+        if self.__unzip:
+            import zipextracter
+            zipextracter.clear_fingerprints()
+
     def monitor_queue(self, q:Queue, resp:str|None=None)->None:
         """
         Block until q is joined, displays resp afterwards 
@@ -1815,6 +2227,7 @@ class KMP:
         Counter is incremented when self.__progress is released
         """
         counter = 0
+        import alive_progress
         with alive_progress.alive_bar(max, title='Files Downloaded:') as bar:
             while(counter < max):
                 # Acquire progress sem
@@ -1845,44 +2258,15 @@ class KMP:
 
 
         # Generate threads #########################
-        self.__threads = self.__create_threads(self.__tcount)
+        self.__threads = self.__create_threads(self.__download_tcount)
+        self.__extract_threads = self.__create_threads(self.__extract_tcount)
 
         # Keeps a list of download tasks Queues, each entry is a Queue!
         queue_list:list = []
         
         
         if self.__update or self.__reupdate:
-            # Get all artists and their destinations from database
-            rows = None
-            while not rows:
-                try:
-                    rows = self.__db.execute("SELECT * FROM Parent2").fetchall()
-                except sqlite3.OperationalError:
-                    logging.warning(traceback.format_exc)
-                    logging.warning("Database is locked, waiting 10s before trying again")
-                    time.sleep(10)
-            
-            
-            
-            # Compile a list of urls, their download path, and latest url while using custom prefix.
-            url = [self.__container_prefix + "/" + row[0][8:].partition("/")[2] for row in rows]
-            latest = [self.__container_prefix + "/" + row[3][8:].partition("/")[2] for row in rows] if not self.__reupdate else [None] * len(url)
-            path = [row[4] for row in rows]
-            
-            assert(len(url) == len(latest))
-            assert(len(url) == len(path))
-            
-            # Add all new urls to the queue list
-            scrape_pool = ThreadPool(self.__tcount)
-            scrape_pool.start_threads()
-            for i in range(0, len(url)):
-                logging.info("Fetching {url}".format(url=url[i]))
-                queue_list.append(self.__process_window(url[i], True, True, scrape_pool, latest[i], path[i]))
-                
-            
-            scrape_pool.join_queue()
-            scrape_pool.kill_threads()
-            
+            url, queue_list = self.__scan_tracked(self.__tracked_rows())
         else:
             # Get url to download ######################
             # List type url
@@ -1900,11 +2284,72 @@ class KMP:
 
                     if(url == 'quit'):
                         self.__kill_threads(self.__threads)
+                        self.__kill_threads(self.__extract_threads)
                         return
                 logging.info("Fetching, {url}".format(url=url))
                 queue_list.append(self.__call_and_interpret_url(url, get_list=True))
         
+        self.__download_queues(url, queue_list, benchmark)
+
+    def __tracked_rows(self) -> list[tuple]:
+        """
+        Reads all tracked artists from the database, waits if the database is locked
+
+        Return: rows of Parent2
+        Pre: self.__db is not None
+        """
+        rows = None
+        while rows is None:
+            try:
+                rows = self.__db.execute("SELECT * FROM Parent2").fetchall()
+            except sqlite3.OperationalError:
+                logging.warning(traceback.format_exc)
+                logging.warning("Database is locked, waiting 10s before trying again")
+                time.sleep(10)
+        return rows
+
+    def __scan_tracked(self, rows:list[tuple]) -> tuple[list[str], list[Queue]]:
+        """
+        Scans tracked artists for posts newer than their latest recorded post, or all posts
+        if reupdating
+
+        Param:
+            rows: rows of Parent2 to scan
+        Return: (artist urls using the current prefix, download task queue of each artist)
+        """
+        # Compile a list of urls, their download path, and latest url while using custom prefix.
+        url = [self.__container_prefix + "/" + row[0][8:].partition("/")[2] for row in rows]
+        latest = [self.__container_prefix + "/" + row[3][8:].partition("/")[2] for row in rows] if not self.__reupdate else [None] * len(url)
+        path = [row[4] for row in rows]
+        
+        assert(len(url) == len(latest))
+        assert(len(url) == len(path))
+        
+        # Add all new urls to the queue list
+        queue_list = []
+        scrape_pool = ThreadPool(self.__tcount)
+        scrape_pool.start_threads()
+        self.__metrics.watch("scrape_queue", scrape_pool.get_qsize)
+        for i in range(0, len(url)):
+            logging.info("Fetching {url}".format(url=url[i]))
+            queue_list.append(self.__process_window(url[i], True, True, scrape_pool, latest[i], path[i]))
+            
         
+        scrape_pool.join_queue()
+        scrape_pool.kill_threads()
+        return (url, queue_list)
+
+    def __download_queues(self, url:str|list[str], queue_list:list[Queue], benchmark:bool = False) -> None:
+        """
+        Downloads every task queue then runs post processing. Kills self.__threads and
+        self.__extract_threads once done.
+
+        Param:
+            url: url of each queue, a single url if there is only one queue
+            queue_list: download task queues
+            benchmark: True to stop after reporting the number of files to download
+        Pre: self.__threads and self.__extract_threads are running
+        """
         # Process the task_list
         sz = 0
         for task_list in queue_list:
@@ -1913,6 +2358,7 @@ class KMP:
         
         # If benchmarking is selecting, test ends here
         if benchmark:
+            self.__kill_threads(self.__extract_threads)
             logging.info("Benchmark has been completed!")
             return
         
@@ -1936,6 +2382,10 @@ class KMP:
         self.__threads.join_queue()
         task_threads.join_queue()
         
+        # Wait for any pending extractions
+        self.__kill_threads(self.__extract_threads)
+        self.__clear_extraction_state()
+        
         # Start post processing
         for f in self.__post_process:
             self.__threads.enqueue(f)
@@ -1948,7 +2398,134 @@ class KMP:
         logging.info("Files skipped: " + str(self.__scount))
         if self.__failed > 0:
             logging.info("Failed: {failed}, stored in {log}".format(failed=self.__failed, log=LOG_NAME))
+        logging.info(self.__metrics.summary())
+        if self.__page_cache:
+            logging.info(self.__page_cache.summary())
+    
     
+    def watch(self, interval:float, min_interval:float | None = None, max_interval:float | None = None, unpacked:int | None = None) -> None:
+        """
+        Daemon mode, runs until interrupted. Each tracked artist is polled on its own interval
+        and only its new posts are downloaded. Sessions, the existing file register and the
+        database stay open between polls and the database is updated after each poll.
+
+        An artist's interval is halved when new posts were found and doubled when there were
+        none, so frequently posting artists are polled often and inactive artists rarely.
+        Artists tracked by other processes while running are picked up on the next poll.
+
+        Param:
+            interval: starting poll interval in seconds for every artist
+            min_interval: shortest poll interval in seconds, default is a quarter of interval
+            max_interval: longest poll interval in seconds, default is 8 times interval
+            unpacked: Levels 0 -> no unpacking, 1 -> partial unpacking, 2 -> unpack all
+        Pre: KMP was initialized with update=True, interval > 0
+        """
+        self.__unpacked = unpacked if unpacked else 0
+        min_interval = min_interval if min_interval else interval / 4
+        max_interval = max_interval if max_interval else interval * 8
+        schedule = {}           # artist path -> [interval, next poll time]
+        
+        # Tracked urls are rewritten with the current prefix once polled, artists are keyed by 
+        # their path so their schedule survives it
+        artist_key = lambda row: row[0][8:].partition("/")[2]
+
+        try:
+            while True:
+                # Poll artists that are due
+                now = time.monotonic()
+                rows = self.__tracked_rows()
+                # Forget artists no longer tracked
+                keys = {artist_key(row) for row in rows}
+                schedule = {key:state for key, state in schedule.items() if key in keys}
+                due = []
+                for row in rows:
+                    state = schedule.setdefault(artist_key(row), [interval, now])
+                    if state[1] <= now:
+                        due.append(row)
+                
+                if len(due) > 0:
+                    logging.info("Polling {} of {} tracked artists".format(len(due), len(rows)))
+                    # Directory names are only deduplicated within a single poll, same as a fresh update
+                    self.__register = HashTable(10)
+                    self.__threads = self.__create_threads(self.__download_tcount)
+                    self.__extract_threads = self.__create_threads(self.__extract_tcount)
+                    url, queue_list = self.__scan_tracked(due)
+                    self.__download_queues(url, queue_list)
+                    
+                    # Adapt each artist's interval to whether they had new posts
+                    latest = dict(zip(self.__urls, self.__latest_urls))
+                    for row, artist_url in zip(due, url):
+                        state = schedule[artist_key(row)]
+                        old_latest = self.__container_prefix + "/" + row[3][8:].partition("/")[2] if row[3] else None
+                        if latest.get(artist_url) and latest.get(artist_url) != old_latest:
+                            state[0] = max(min_interval, state[0] / 2)
+                        else:
+                            state[0] = min(max_interval, state[0] * 2)
+                        state[1] = time.monotonic() + state[0]
+                        logging.debug("Next poll of {} in {}s".format(artist_url, state[0]))
+                    self.__update_db()
+                
+                # Sleep until the next artist is due
+                next_poll = min([state[1] for state in schedule.values()], default=time.monotonic() + interval)
+                wait = max(0, next_poll - time.monotonic())
+                if wait > 0:
+                    logging.info("Next poll in {}".format(timedelta(seconds=round(wait))))
+                    time.sleep(wait)
+        except KeyboardInterrupt:
+            logging.info("Watch mode stopped")
+
+    def verify(self, processes:int | None = None) -> None:
+        """
+        Verifies every recorded file within the tracked artists' destinations against the sha256
+        in its Kemono data path. Hashing is done in a process pool. Corrupt files are deleted 
+        and, along with missing files, are redownloaded. All corrupt and missing files are 
+        written to LOG_NAME.
+
+        Param:
+            processes: Number of hashing processes, default is the cpu count
+        Pre: KMP was initialized with verify=True
+        """
+        # Get tracked destinations and recorded files
+        rows = None
+        while rows is None:
+            try:
+                destinations = {row[0] for row in self.__db.execute("SELECT destination FROM Parent2").fetchall() if row[0]}
+                rows = self.__db.execute("SELECT path, url, sha256 FROM Files").fetchall()
+            except sqlite3.OperationalError:
+                logging.warning("Database is locked, waiting 10s before trying again")
+                time.sleep(10)
+        
+        rows = [row for row in rows if any(row[0].startswith(d) for d in destinations)]
+        urls = {row[0]:row[1] for row in rows}
+        logging.info("Verifying {} files".format(len(rows)))
+        
+        from Verifier import Verifier
+        corrupt, missing = Verifier(processes).verify([(row[0], row[2]) for row in rows])
+        for path in corrupt:
+            logging.warning("Corrupt file -> " + path)
+            jutils.write_to_file(LOG_NAME, "CORRUPT -> SRC: {src}, FNAME: {fname}\n".format(src=urls[path], fname=path), LOG_MUTEX)
+            os.remove(path)
+        for path in missing:
+            logging.warning("Missing file -> " + path)
+            jutils.write_to_file(LOG_NAME, "MISSING -> SRC: {src}, FNAME: {fname}\n".format(src=urls[path], fname=path), LOG_MUTEX)
+        logging.info("Corrupt: {}, Missing: {}".format(len(corrupt), len(missing)))
+        
+        # Redownload corrupt and missing files
+        redownload = corrupt + missing
+        if len(redownload) > 0:
+            self.__threads = self.__create_threads(self.__download_tcount)
+            for path in redownload:
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                self.__threads.enqueue((self.__download_file, (urls[path], path, path, False)))
+            self.__prog_bar(len(redownload))
+            self.__kill_threads(self.__threads)
+            logging.info("Files downloaded: " + str(self.__fcount))
+            if self.__failed > 0:
+                logging.info("Failed: {failed}, stored in {log}".format(failed=self.__failed, log=LOG_NAME))
+            logging.info(self.__metrics.summary())
+            if self.__page_cache:
+                logging.info(self.__page_cache.summary())
     
     def routine(self, url: str | list[str] | None, unpacked:int | None) -> None:
         """
@@ -1969,7 +2546,8 @@ class KMP:
             self.__unpacked = unpacked
 
         # Generate threads #########################
-        self.__threads = self.__create_threads(self.__tcount)
+        self.__threads = self.__create_threads(self.__download_tcount)
+        self.__extract_threads = self.__create_threads(self.__extract_tcount)
         
         if self.__update or self.__reupdate:
             # Get all artists and their destinations from database
@@ -1990,6 +2568,7 @@ class KMP:
             # Add all new urls to the queue list
             scrape_pool = ThreadPool(self.__tcount)
             scrape_pool.start_threads()
+            self.__metrics.watch("scrape_queue", scrape_pool.get_qsize)
             for i in range(0, len(url)):
                 logging.info("Fetching {url}".format(url=url[i]))                
                 self.__process_window(url[i], True, False, scrape_pool, latest[i], path[i])
@@ -2013,12 +2592,17 @@ class KMP:
 
                     if(url == 'quit'):
                         self.__kill_threads(self.__threads)
+                        self.__kill_threads(self.__extract_threads)
                         return
 
                 self.__call_and_interpret_url(url)
             
         # Wait for queue
         self.__threads.join_queue()
+        
+        # Wait for any pending extractions
+        self.__kill_threads(self.__extract_threads)
+        self.__clear_extraction_state()
 
         # Start post processing
         for f in self.__post_process:
@@ -2030,6 +2614,9 @@ class KMP:
         logging.info("Files downloaded: " + str(self.__fcount))
         if self.__failed > 0:
             logging.info("Failed: {failed}, stored in {log}".format(failed=self.__failed, log=LOG_NAME))
+        logging.info(self.__metrics.summary())
+        if self.__page_cache:
+            logging.info(self.__page_cache.summary())
 
 
 def help() -> None:
@@ -2039,15 +2626,22 @@ def help() -> None:
     logging.info("List of all switches, please take note of what switches are required:")
     logging.info("DOWNLOAD CONFIG - How files are downloaded\n\
         -f --bulkfile <textfile.txt> : Bulk download from text file containing links\n\
-        -d --downloadpath <path> : REQUIRED - Set download path for single instance, must use '\\' or '/'\n\
-        -c --chunksz <#> : Adjust download chunk size in bytes (Default is 64M)\n\
-        -t --threadct <#> : Change download thread count (default is 1, max is 5)\n\
+        -d --downloadpath <path> : REQUIRED - Set download path for single instance, may use '\\' or '/' on Windows. Repeat to spread artists over several disks, each new artist goes to the path with the most free space for the downloads already placed on it\n\
+        -c --chunksz <#> : Maximum download chunk size in bytes, chunk size adapts to connection speed up to this value (Default is 64M)\n\
+        -t --threadct <#> : Change download thread count (default is 1, max is 5, max is 32 for downloads with --http2)\n\
         -w --wait <#> : Delay between downloads in seconds (default is 2.0s and cannot be set lower)\n\
         -b --track : Track artists which can updated later, not supported for discord\n\
         -a --predupe : Prepend () instead of postpending in duplicate file case\n\
         -g --updatedb <db_name.db>: Set db name to use for the update db (default is KMP.db)\n\
         -i --formats \"image, audio, 7z, ...\": Set download file formats, corresponds to content-type header in HTTP response\n\
         -j --prefix <url prefix>: Set prefix of kemono url. DOES NOT END IN \"\\\". Does not affect databases. default is \"https://kemono.party\".\n\
+        --pagecache <MB> : Cache up to <MB> of artist, post and Discord pages in PageCache.db, unchanged pages are not downloaded again on later runs\n\
+        --cachettl <minutes> : Use cached pages for <minutes> without checking if they changed, useful when rerunning with different filters. Requires --pagecache\n\
+        --adaptive <#> : Adjust the number of concurrent downloads between 1 and <#> (max is 16, or 32 with --http2) by measured throughput, latency and rate limiting, starting at -t\n\
+        --bandwidth <limit>[,<HH:MM>-<HH:MM>=<limit>...] : Cap the combined download rate in bytes per second (K, M and G suffixes, 0 is no cap). Windows set a different cap during a time of day, for example \"0,09:00-18:00=2M\" caps business hours only\n\
+        --minfree <MB> : Leave <MB> free on the download volume. Space is reserved for each file and archive's extracted output before it is written, files that do not fit are logged as failures\n\
+        --preallocate : Allocate each file's full size before downloading it, reduces fragmentation on spinning disks\n\
+        --http2 : Download files over HTTP/2, multiplexing many small files over a few connections. Requires httpx[http2], servers without HTTP/2 are downloaded from over HTTP/1.1. Allows -t up to 32 for downloads as threads no longer need a connection each\n\
         -k --disableprescan: Disables prescan used to catelog existing files. Disabling reduces dupe file check accuracy in exchange for lower memory usage and lowered run time.\n\
         -w --date: Disable appending date to file and/or folder names.\n\
         --id: Disable prepending id to file and/or folder names.\n")
@@ -2055,8 +2649,9 @@ def help() -> None:
     
     logging.info("EXCLUSION - Exclusion of specific downloads\n\
         -x --excludefile \"txt, zip, ..., png\" : Exclude files with listed extensions, NO '.'s\n\
-        -p --excludepost \"keyword1, keyword2,...\" : Keyword in excluded posts, not case sensitive\n\
-        -l --excludelink \"keyword1, keyword2,...\" : Keyword in excluded link, not case sensitive. Is for link plaintext, not its target\n\
+        -p --excludepost \"keyword1, keyword2,...\" : Keyword in excluded posts, not case sensitive. With --patterns, prefix a keyword with re: for a regex or glob: for a glob matching the whole title\n\
+        -l --excludelink \"keyword1, keyword2,...\" : Keyword in excluded link, not case sensitive. Is for link plaintext, not its target. Supports re: and glob: like -p\n\
+        --patterns : Treat re: and glob: keywords in -p and -l as regexes and globs instead of plain text\n\
         -o --omitcomment : Do not download any post comments\n\
         -m --omitcontent : Do not download any textual post contents\n\
         -n --minsize <min_size>: Minimum file size in bytes\n")
@@ -2066,17 +2661,22 @@ def help() -> None:
         -u --unpacked : Enable unpacked file organization, all works will not have their own folder, overrides partial unpack\n\
         -e --hashname : Download server name instead of program defined naming scheme, may lead to issues if Kemono does not store links correctly. Not supported for Discord\n\
         -v --unzip : Enables unzipping of files automatically, requires 7z and setup to be done correctly\n\
+        --extractthreads <#> : Number of threads used for unzipping, runs alongside downloads (default is half the cpu count)\n\
         -q --logging <#> : Set logging level. 1 == info (default), 2 == debug, 3 == debug but print output to debug_log.txt. Program will initially begin in level 1.\n\
             Note that logging output is redirected to debug_log.txt for level 3 and opening the file while the program is running will crash the program.\n")
     
     logging.info("UTILITIES - Things that can be done besides downloading\n\
         --UPDATE : Update all tracked artist works. If an entry points to a nonexistant directory, the artist will be skipped.\n\
         --REUPDATE : Redownload all tracked artist works\n\
-        --RENAME : Rename existing files instead of skipping them with current switch config. Only works with --id and --rename as of now.\n")
+        --WATCH <minutes> : Keep running and update tracked artists, each artist is polled on its own interval starting at <minutes>. Artists that post often are polled more often.\n\
+        --RENAME : Rename existing files instead of skipping them with current switch config. Only works with --id and --rename as of now.\n\
+        --VERIFY : Check all tracked files downloaded from Kemono against their sha256, corrupt and missing files are redownloaded\n")
     
     logging.info("TROUBLESHOOTING - Solutions to possible issues\n\
         -z --httpcode \"500, 502,...\" : HTTP codes to retry downloads on, default is 429 and 403\n\
         -r --maxretries <#> : Maximum number of HTTP code retries, default is 10 (negative for infinite which is highly unrecommended)\n\
+        --metrics <file.json> : Append per stage timings (HEAD, time to first byte, transfer, waits, parsing, ...) of the run to a json lines file\n\
+        --metricsport <[host:]port> : Serve live metrics for Prometheus at http://host:port/metrics, host defaults to 127.0.0.1 (use 0.0.0.0 for remote scrapes)\n\
         -h --help : Help\n\
         --DEPRECATED : Enable deprecated download mode\n\
         --BENCHMARK : Benchmark experiemental mode's scraping speed, does not download anything\n")
@@ -2086,12 +2686,13 @@ def main() -> None:
     Program runner
     """
     # Clear scr
-    os.system('cls')
+    os.system('cls' if os.name == 'nt' else 'clear')
     
     # Preliminaries
     start_time = time.monotonic()
     logging.basicConfig(level=logging.INFO, format='%(levelname)s (%(asctime)s): %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
     folder = False
+    folders = []
     urls = False
     unzip = False
     tcount = -1
@@ -2120,6 +2721,20 @@ def main() -> None:
     date = True
     id = True
     rename = False
+    extract_tcount = None
+    verify = False
+    metrics_path = None
+    watch = None
+    page_cache_size = 0
+    page_cache_ttl = 0
+    http2 = False
+    adaptive = 0
+    bandwidth = None
+    min_free = 0
+    preallocate = False
+    keyword_patterns = False
+    metrics_port = None
+    metrics_host = "127.0.0.1"
     if len(sys.argv) > 1:
         pointer = 1
         while(len(sys.argv) > pointer):
@@ -2164,6 +2779,18 @@ def main() -> None:
                     update = True
                     pointer += 1
                     logging.info("UPDATE -> " + str(update))
+                elif sys.argv[pointer] == '--WATCH' and len(sys.argv) >= pointer:
+                    watch = float(sys.argv[pointer + 1]) * 60
+                    if watch <= 0:
+                        logging.critical("WATCH interval must be greater than 0, terminating program!!!")
+                        return
+                    update = True
+                    pointer += 2
+                    logging.info("WATCH -> every {} minutes".format(watch / 60))
+                elif sys.argv[pointer] == '--VERIFY':
+                    verify = True
+                    pointer += 1
+                    logging.info("VERIFY -> " + str(verify))
                 elif sys.argv[pointer] == '--RENAME':
                     rename = True
                     pointer += 1
@@ -2201,19 +2828,74 @@ def main() -> None:
                     folder = os.path.abspath(sys.argv[pointer + 1])
 
                     if folder[len(folder) - 1] == '\"':
-                        folder = folder[:len(folder) - 1] + '\\'
-                    elif not folder[len(folder) - 1] == '\\':
-                        folder += '\\'
+                        folder = folder[:len(folder) - 1] + os.sep
+                    elif not folder[len(folder) - 1] == os.sep:
+                        folder += os.sep
 
                     logging.info("FOLDER -> " + folder)
                     if not os.path.exists(folder):
                         logging.critical("FOLDER Path does not exist, terminating program!!!")
                         return
+                    folders.append(folder)
+                    folder = folders if len(folders) > 1 else folder
                     pointer += 2
                 elif (sys.argv[pointer] == '-t' or sys.argv[pointer] == '--threadct') and len(sys.argv) >= pointer:
                     tcount = int(sys.argv[pointer + 1])
                     pointer += 2
                     logging.info("DOWNLOAD_THREAD_COUNT -> " + str(tcount))
+                elif sys.argv[pointer] == '--extractthreads' and len(sys.argv) >= pointer:
+                    extract_tcount = int(sys.argv[pointer + 1])
+                    pointer += 2
+                    logging.info("EXTRACT_THREAD_COUNT -> " + str(extract_tcount))
+                elif sys.argv[pointer] == '--metrics' and len(sys.argv) >= pointer:
+                    metrics_path = sys.argv[pointer + 1]
+                    pointer += 2
+                    logging.info("METRICS -> " + metrics_path)
+                elif sys.argv[pointer] == '--metricsport' and len(sys.argv) >= pointer:
+                    address = sys.argv[pointer + 1].rpartition(':')
+                    metrics_host = address[0] if address[0] else metrics_host
+                    metrics_port = int(address[2])
+                    pointer += 2
+                    logging.info("METRICS_ADDRESS -> {}:{}".format(metrics_host, metrics_port))
+                elif sys.argv[pointer] == '--pagecache' and len(sys.argv) >= pointer:
+                    page_cache_size = int(float(sys.argv[pointer + 1]) * 1024 * 1024)
+                    pointer += 2
+                    logging.info("PAGE_CACHE_SIZE -> " + str(page_cache_size))
+                elif sys.argv[pointer] == '--adaptive' and len(sys.argv) >= pointer:
+                    adaptive = int(sys.argv[pointer + 1])
+                    pointer += 2
+                    logging.info("ADAPTIVE_MAX_THREAD_COUNT -> " + str(adaptive))
+                elif sys.argv[pointer] == '--bandwidth' and len(sys.argv) >= pointer:
+                    bandwidth = sys.argv[pointer + 1]
+                    import BandwidthLimiter
+                    try:
+                        BandwidthLimiter.parse(bandwidth)
+                    except ValueError as e:
+                        logging.error(f"{bandwidth} is not a valid bandwidth limit: {e}")
+                        logging.info("Usage: --bandwidth <limit>[,<HH:MM>-<HH:MM>=<limit>...], for example \"0,09:00-18:00=2M\"")
+                        exit(0)
+                    pointer += 2
+                    logging.info("BANDWIDTH -> " + bandwidth)
+                elif sys.argv[pointer] == '--minfree' and len(sys.argv) >= pointer:
+                    min_free = int(float(sys.argv[pointer + 1]) * 1024 * 1024)
+                    pointer += 2
+                    logging.info("MIN_FREE -> " + str(min_free))
+                elif sys.argv[pointer] == '--preallocate':
+                    preallocate = True
+                    pointer += 1
+                    logging.info("PREALLOCATE -> TRUE")
+                elif sys.argv[pointer] == '--patterns':
+                    keyword_patterns = True
+                    pointer += 1
+                    logging.info("KEYWORD_PATTERNS -> TRUE")
+                elif sys.argv[pointer] == '--http2':
+                    http2 = True
+                    pointer += 1
+                    logging.info("HTTP2 -> TRUE")
+                elif sys.argv[pointer] == '--cachettl' and len(sys.argv) >= pointer:
+                    page_cache_ttl = float(sys.argv[pointer + 1]) * 60
+                    pointer += 2
+                    logging.info("PAGE_CACHE_TTL -> " + str(page_cache_ttl))
                 elif (sys.argv[pointer] == '-q' or sys.argv[pointer] == '--logging') and len(sys.argv) >= pointer:
                     log_level =  int(sys.argv[pointer + 1])
                     match log_level:
@@ -2253,13 +2935,13 @@ def main() -> None:
                 elif (sys.argv[pointer] == '-l' or sys.argv[pointer] == '--excludelink') and len(sys.argv) >= pointer:
                     
                     for ext in sys.argv[pointer + 1].split(','):
-                        link_excluded.append(ext.strip().lower())
+                        link_excluded.append(ext.strip())
                     pointer += 2
                     logging.info("LINK_EXCLUDED -> " + str(link_excluded))
                 elif (sys.argv[pointer] == '-p' or sys.argv[pointer] == '--excludepost') and len(sys.argv) >= pointer:
                     
                     for ext in sys.argv[pointer + 1].split(','):
-                        post_excluded.append(ext.strip().lower())
+                        post_excluded.append(ext.strip())
                     pointer += 2
                     logging.info("POST_EXCLUDED -> " + str(post_excluded))
                 
@@ -2289,12 +2971,20 @@ def main() -> None:
                 logging.error(f"Missing argument for {sys.argv[pointer]}")
                 exit(0)
 
+    # Report a bad regex keyword before anything is downloaded
+    for keyword in post_excluded + link_excluded:
+        try:
+            KeywordMatcher([keyword], keyword_patterns)
+        except re.error as e:
+            logging.error(f"{keyword} is not a valid regex: {e}")
+            exit(0)
+
     # Prelim dirs
     if not os.path.exists(LOG_PATH):
         os.makedirs(LOG_PATH)
 
     # Run the downloader
-    if folder or update or reupdate:
+    if folder or update or reupdate or verify:
         print("\n____________________________________________________________________________________________________")
         logging.warning("YOU MAY NEED TO VISIT KEMONO.PARTY OR KEMONO.SU AND SOLVE THE CAPTCHA BEFORE RUNNING THE PROGRAM.")
         logging.warning("IF YOUR DOWNLOAD APPEARS STUCK, UPDATE THE USER-AGENT IN user_agent.txt")
@@ -2309,9 +2999,14 @@ def main() -> None:
         
         downloader = KMP(folder, unzip, tcount, chunksz, ext_blacklist=excluded, timeout=retries, http_codes=http_codes, post_name_exclusion=post_excluded,\
             download_server_name_type=server_name, link_name_exclusion=link_excluded, wait=wait, db_name=db_name, track=track, update=update, exclcomments=exclcomments,\
-                exclcontents=exclcontents, minsize=minsize, predupe=predupe, reupdate=reupdate, prefix=prefix, disableprescan=disableprescan, date=date, id=id, rename=rename)
-
-        if not deprecated or benchmark:
+                exclcontents=exclcontents, minsize=minsize, predupe=predupe, reupdate=reupdate, prefix=prefix, disableprescan=disableprescan, date=date, id=id, rename=rename, extract_tcount=extract_tcount, verify=verify, metrics_path=metrics_path,\
+                    metrics_port=metrics_port, metrics_host=metrics_host, page_cache_size=page_cache_size, page_cache_ttl=page_cache_ttl, http2=http2, adaptive=adaptive, bandwidth=bandwidth, min_free=min_free, preallocate=preallocate, keyword_patterns=keyword_patterns)
+
+        if verify:
+            downloader.verify()
+        elif watch is not None:
+            downloader.watch(watch, unpacked=2 if unpacked else 1 if partial_unpack else 0)
+        elif not deprecated or benchmark:
             if unpacked:
                 downloader.alt_routine(urls, 2, benchmark)
             elif partial_unpack:
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from KemonoStandIn import KemonoStandIn
+"""
+Reproducible benchmarks for KMPDownloader against a local Kemono stand-in server
+(see KemonoStandIn.py). Each scenario runs KMP in its own process so peak RSS is
+per scenario and reports pages/s, files/s, MB/s, peak RSS and, for the prescan
+scenario, prescan time. The startup scenario reports import time from python -X importtime,
+the slowest imports and the time to construct KMP.
+
+Usage: python KMPDownloader_bench.py [scenario ...] [--posts #] [--files #] [--size bytes]
+        [--latency s] [--bandwidth bytes/s] [--ratelimit p] [--threads #] [--wait]
+Scenarios: alt_routine, routine, discord, ratelimited, prescan, startup (default is all)
+--wait keeps KMP's mandatory delays, by default they are removed so the tool itself is measured
+
+@author Jeff Chen
+@version 10/19/2026
+"""
+
+SCENARIOS = ["alt_routine", "routine", "discord", "ratelimited", "prescan", "startup"]
+STARTUP_RUNS = 5        # Startup is measured this many times and the fastest run is reported
+
+def parse_args(argv:list[str]) -> tuple[list[str], dict]:
+    """
+    Parses command line arguments
+
+    Return: (scenarios, options)
+    """
+    scenarios = []
+    options = {"posts": 100, "files": 4, "size": 1024 * 256, "latency": 0.0, "bandwidth": 0, "ratelimit": 0.1, "threads": 5, "wait": False}
+    pointer = 0
+    while pointer < len(argv):
+        arg = argv[pointer]
+        if arg == "--wait":
+            options["wait"] = True
+            pointer += 1
+        elif arg.startswith("--"):
+            key = arg[2:]
+            options[key] = type(options[key])(argv[pointer + 1])
+            pointer += 2
+        else:
+            scenarios.append(arg)
+            pointer += 1
+    return (scenarios if scenarios else SCENARIOS, options)
+
+def child(scenario:str, prefix:str, url:str, options:dict) -> None:
+    """
+    Runs a single scenario in this process and prints its results as json
+
+    Param:
+        scenario: scenario name
+        prefix: url prefix of the stand-in server
+        url: url to download
+        options: benchmark options
+    """
+    import DiscordtoJson
+    from KMPDownloader import KMP
+    from Threadpool import tname
+    logging.basicConfig(level=logging.WARNING)
+    tname.name = None
+
+    # Discord API endpoints are constants, point them to the stand-in
+    DiscordtoJson.DISCORD_LOOKUP_API = prefix + "/api/v1/discord/channel/lookup/"
+    DiscordtoJson.DISCORD_CHANNEL_CONTENT_PRE_API = prefix + "/api/v1/discord/channel/"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        folder = os.path.join(workdir, "downloads") + os.sep
+        os.makedirs(folder)
+        if scenario == "prescan":
+            populate(folder, options["posts"], options["files"])
+
+        start = time.perf_counter()
+        downloader = KMP(folder, False, options["threads"], None, prefix=prefix, root=workdir, reupdate=False, connect_timeout=1,
+                         disableprescan=scenario != "prescan")
+        prescan = time.perf_counter() - start
+        if not options["wait"]:
+            # Remove the mandatory delays, they would dominate the measurement
+            downloader._KMP__wait = 0
+
+        start = time.perf_counter()
+        if scenario == "routine":
+            downloader.routine(url, 0)
+        elif scenario != "prescan":
+            downloader.alt_routine(url, 0)
+        elapsed = time.perf_counter() - start
+        downloader.close()
+
+    print(json.dumps({"elapsed": elapsed, "prescan": prescan, "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+def populate(folder:str, posts:int, files:int) -> None:
+    """
+    Fills folder with an artist directory like one KMP would have created
+
+    Param:
+        folder: download folder
+        posts: number of post directories
+        files: number of files per post
+    """
+    for post in range(0, posts):
+        post_dir = os.path.join(folder, "Artist 0", "{p} Post {p} 2023-09-10 120000".format(p=post))
+        os.makedirs(post_dir)
+        for i in range(0, files):
+            with open(os.path.join(post_dir, "{}.jpg".format(i)), "wb") as fd:
+                fd.write(b"\0" * 1024 * (i + 1))
+        with open(os.path.join(post_dir, "post__content.txt"), "w") as fd:
+            fd.write("Content of post " + str(post))
+
+def startup() -> None:
+    """
+    Measures importing KMPDownloader and constructing KMP in fresh processes, prints a summary line
+    """
+    best = None
+    for _ in range(0, STARTUP_RUNS):
+        code = ("import time, tempfile, os; start = time.perf_counter(); from KMPDownloader import KMP; imported = time.perf_counter() - start; "
+                "w = tempfile.mkdtemp(); start = time.perf_counter(); "
+                "KMP(os.path.join(w, ''), False, 6, None, root=w, reupdate=False, disableprescan=True).close(); "
+                "print(imported, time.perf_counter() - start)")
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            print("startup: failed\n{}".format(result.stderr))
+            return
+        imported, constructed = [float(value) for value in result.stdout.split()]
+        if not best or imported + constructed < best[0] + best[1]:
+            # Modules imported directly by KMPDownloader, nested imports are included in their cumulative time
+            top = []
+            children = []
+            for line in result.stderr.splitlines()[1:]:
+                _, cumulative, name = line.split('|')
+                if not name[1:].startswith(" "):
+                    if name.strip() == "KMPDownloader":
+                        top = sorted(children, reverse=True)[:5]
+                    children = []
+                elif not name[3:].startswith(" "):
+                    children.append((int(cumulative), name.strip()))
+            best = (imported, constructed, top)
+
+    print("{s:<12} import {i:6.3f}s  KMP() {c:6.3f}s  slowest imports: {t}".format(s="startup", i=best[0], c=best[1],
+        t=", ".join("{} {:.1f}ms".format(name, us / 1000) for us, name in best[2])))
+
+def run(scenario:str, options:dict) -> None:
+    """
+    Starts a stand-in server, runs scenario in a child process and prints a summary line
+    """
+    server = KemonoStandIn(posts=options["posts"], files_per_post=options["files"], file_size=options["size"], latency=options["latency"],
+                           bandwidth=options["bandwidth"], rate_limit=options["ratelimit"] if scenario == "ratelimited" else 0)
+    prefix = server.start()
+    url = server.discord_url(prefix) if scenario == "discord" else server.artist_url(prefix, 0)
+
+    result = subprocess.run([sys.executable, __file__, "--child", scenario, prefix, url, json.dumps(options)], capture_output=True, text=True)
+    server.stop()
+    if result.returncode != 0:
+        print("{}: failed\n{}".format(scenario, result.stderr))
+        return
+
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    stats = server.stats()
+    elapsed = max(measured["elapsed"], 1e-9)
+    print("{s:<12} {t:8.2f}s  pages/s {p:8.1f}  files/s {f:8.1f}  MB/s {mb:8.1f}  429s {r:5d}  peak RSS {rss:7.1f} MB  prescan {pre:6.3f}s".format(
+        s=scenario, t=measured["elapsed"], p=(stats["pages"] + stats["api"]) / elapsed, f=stats["files"] / elapsed,
+        mb=stats["bytes"] / elapsed / (1024 ** 2), r=stats["429"], rss=measured["rss"], pre=measured["prescan"]))
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], sys.argv[4], json.loads(sys.argv[5]))
+        return
+
+    scenarios, options = parse_args(sys.argv[1:])
+    for scenario in scenarios:
+        if scenario == "startup":
+            startup()
+        else:
+            run(scenario, options)
+
+if __name__ == "__main__":
+    main()
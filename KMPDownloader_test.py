@@ -1,5 +1,7 @@
 from re import T
 import shutil
+import subprocess
+import sys
 from tkinter import N
 import unittest
 from KMPDownloader import KMP
@@ -31,7 +33,7 @@ class KMPTestCase(unittest.TestCase):
         """
         Create temporary testing directory
         """
-        cls.tempdir = os.path.abspath('./') + '\\temp\\'
+        cls.tempdir = os.path.join(os.path.abspath('./'), 'temp', '')
 
         if os.path.exists(cls.tempdir):
             logging.critical("Please remove before testing ->" + cls.tempdir)
@@ -56,6 +58,37 @@ class KMPTestCase(unittest.TestCase):
                           "https://kemono.party/gumroad/user/9222612694494/post/AizNy")
 
         self.KMP.close()
+
+    def test_register_resize(self) -> None:
+        """
+        Tests the existing file register starts small and grows as prescan fills it
+        """
+        dir = os.path.join(self.tempdir, "register", "")
+        os.makedirs(dir)
+        try:
+            for i in range(0, 1500):
+                with open(dir + str(i) + ".txt", "w") as fd:
+                    fd.write(str(i))
+            self.KMP = KMP(self.tempdir, False, tcount=None, chunksz=None, ext_blacklist=None, root=self.tempdir, reupdate=False)
+            register = self.KMP._KMP__existing_file_register
+            self.assertGreater(register.hashtable_getSize(), 1024)
+            self.assertGreaterEqual(register.hashtable_getOccupied(), 1500)
+            self.assertNotEqual(register.hashtable_exist_by_key(dir + "1499.txt"), -1)
+            self.KMP.close()
+        finally:
+            shutil.rmtree(self.tempdir, ignore_errors=True)
+
+    def test_import_time(self) -> None:
+        """
+        Tests heavy dependencies are not imported with KMPDownloader, they are imported on first use
+        """
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import KMPDownloader"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        imported = {line.rpartition('|')[2].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+        for module in ("bs4", "cfscrape", "tqdm", "alive_progress", "zipextracter", "patoolib", "DiscordtoJson", "MetricsServer", "Verifier"):
+            self.assertNotIn(module, imported)
+
     def test_trim_fname(self) -> None:
         """
         Tests __trim_fname
@@ -654,7 +687,7 @@ do minor editing to translate RMMZ based game.\nhttps://store.steampowered.com/a
         # With files
         self.KMP.routine(unpacked=1, url="https://kemono.party/fanbox/user/49494721/post/3765544")
 
-        self.assertEqual(self.getDirSz(self.tempdir + "soso\久岐忍 by soso from Pixiv Fanbox  Kemono"), 1899290)
+        self.assertEqual(self.getDirSz(os.path.join(self.tempdir, "soso", "久岐忍 by soso from Pixiv Fanbox  Kemono")), 1899290)
 
         # No files
         self.KMP.routine(unpacked=1, url="https://kemono.party/fanbox/user/49494721/post/2082281")
@@ -682,12 +715,12 @@ do minor editing to translate RMMZ based game.\nhttps://store.steampowered.com/a
         # No exclusions
         self.KMP = KMP(self.tempdir, unzip=False, tcount=3, chunksz=None, post_name_exclusion=[])
         self.KMP.routine("https://kemono.party/fanbox/user/3316400/post/532363", unpacked=None)
-        self.assertEqual(self.getNumFiles(os.path.join(self.tempdir, "MだSたろう\\BRSその２-高画質版2枚 by MだSたろう from Pixiv Fanbox  Kemono")), 4)
+        self.assertEqual(self.getNumFiles(os.path.join(self.tempdir, "MだSたろう", "BRSその２-高画質版2枚 by MだSたろう from Pixiv Fanbox  Kemono")), 4)
         self.KMP.close()
         
         self.KMP = KMP(self.tempdir, unzip=False, tcount=3, chunksz=None, post_name_exclusion=["Nothing"])
         self.KMP.routine("https://kemono.party/fanbox/user/3316400/post/490300", unpacked=None)
-        self.assertEqual(self.getNumFiles(os.path.join(self.tempdir, "MだSたろう\\限定褐色 by MだSたろう from Pixiv Fanbox  Kemono")), 4)        
+        self.assertEqual(self.getNumFiles(os.path.join(self.tempdir, "MだSたろう", "限定褐色 by MだSたろう from Pixiv Fanbox  Kemono")), 4)        
         self.KMP.close()
         
         # Exclusions
@@ -704,24 +737,24 @@ do minor editing to translate RMMZ based game.\nhttps://store.steampowered.com/a
         # No exclusions
         self.KMP = KMP(self.tempdir, unzip=False, tcount=3, chunksz=None, link_name_exclusion=[])
         self.KMP.routine("https://kemono.party/gumroad/user/2986488497406/post/bMhu", unpacked=None)
-        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "burningtides\Phuture Noize - A New Day Remake  FLP  Presets by burningtides from Gumroad  Kemono\Phuture-Noize---A-New-Day-Remake-.zip")))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "burningtides", "Phuture Noize - A New Day Remake  FLP  Presets by burningtides from Gumroad  Kemono", "Phuture-Noize---A-New-Day-Remake-.zip")))
         self.KMP.close()
         
         # Some exclusions
         self.KMP = KMP(self.tempdir, unzip=False, tcount=3, chunksz=None, link_name_exclusion=["19","18"])
         self.KMP.routine("https://kemono.party/gumroad/user/5646205703539/post/xIMAi", unpacked=None)
-        self.assertFalse(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller\SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono\speedsculpt_2_80_v_0_1_19.zip")))
-        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller\SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono\speedsculpt_2_80_v_0_1_17.zip")))
-        self.assertFalse(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller\SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono\speedsculpt_2_80_v_0_1_18.zip")))
-        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller\SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono\speedsculpt_2_83_v_0_1_20.zip")))
-        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller\SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono\speedsculpt_2_9_v_0_1_22.zip")))
-        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller\SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono\speedsculpt_2_79_v_0_1_9.zip")))
+        self.assertFalse(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller", "SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono", "speedsculpt_2_80_v_0_1_19.zip")))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller", "SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono", "speedsculpt_2_80_v_0_1_17.zip")))
+        self.assertFalse(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller", "SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono", "speedsculpt_2_80_v_0_1_18.zip")))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller", "SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono", "speedsculpt_2_83_v_0_1_20.zip")))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller", "SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono", "speedsculpt_2_9_v_0_1_22.zip")))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "Pitiwazou - Cédric Lepiller", "SPEEDSCULPT by Pitiwazou - Cédric Lepiller from Gumroad  Kemono", "speedsculpt_2_79_v_0_1_9.zip")))
         self.KMP.close()
         
         # All excluded
         self.KMP = KMP(self.tempdir, unzip=False, tcount=3, chunksz=None, link_name_exclusion=["sfm"])
         self.KMP.routine("https://kemono.party/gumroad/user/6791944931428/post/nYFnj", unpacked=None)
-        self.assertFalse(os.path.exists(os.path.join(self.tempdir, "Bluejuicyjuice\\18 Nidoqueen SFM model by Bluejuicyjuice from Gumroad  Kemono\\NidoSFM.7z")))
+        self.assertFalse(os.path.exists(os.path.join(self.tempdir, "Bluejuicyjuice", "18 Nidoqueen SFM model by Bluejuicyjuice from Gumroad  Kemono", "NidoSFM.7z")))
         self.KMP.close()     
         
     def test_server_name(self):
@@ -731,8 +764,8 @@ do minor editing to translate RMMZ based game.\nhttps://store.steampowered.com/a
         # Mp4 and images
         self.KMP = KMP(self.tempdir, unzip=False, tcount=3, chunksz=None, download_server_name_type=True)
         self.KMP.routine("https://kemono.party/fanbox/user/49494721/post/4072005", unpacked=None)
-        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "soso\胡桃Live2Dアニメ by soso from Pixiv Fanbox  Kemono\\d1c15668-08e1-4bea-a1bc-a55d25e59bc3.jpg")))
-        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "soso\胡桃Live2Dアニメ by soso from Pixiv Fanbox  Kemono\\胡桃_Live2D.mp4")))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "soso", "胡桃Live2Dアニメ by soso from Pixiv Fanbox  Kemono", "d1c15668-08e1-4bea-a1bc-a55d25e59bc3.jpg")))
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "soso", "胡桃Live2Dアニメ by soso from Pixiv Fanbox  Kemono", "胡桃_Live2D.mp4")))
         self.KMP.close()     
     
     def test_password_zip(self):
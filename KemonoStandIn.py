@@ -0,0 +1,299 @@
+import hashlib
+import http.server
+import json
+import random
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+"""
+Local HTTP server that imitates the parts of Kemono used by KMPDownloader. Serves
+synthetic artist listings, post pages, Discord API JSON and data files with
+configurable latency, bandwidth and 429 injection. Pages and API responses have an ETag
+and conditional requests are answered with 304. Used by KMPDownloader_bench.py.
+
+All paths are served under PREFIX_PATH so urls contain "kemono", which KMPDownloader
+relies on to decide if a rate limited download should be retried.
+
+@author Jeff Chen
+@version 10/19/2026
+"""
+
+PREFIX_PATH = "/kemono"         # Path every url is served under
+LISTING_PAGE_SZ = 50            # Posts per listing page, same as Kemono
+DISCORD_PAGE_SZ = 150           # Messages per Discord API page, same as Kemono
+UNIQUE_BODIES = 8               # Number of distinct file bodies, files reuse them to save memory
+SERVICE = "patreon"             # Service of every synthetic artist
+
+class KemonoStandIn():
+    """
+    Synthetic Kemono server. Artists are numbered 0 to artists - 1, each has posts posts
+    and each post has files_per_post files split between fileThumb images, post content
+    images and attachments. Discord server 0 has one channel with discord_messages messages.
+    """
+    __artists:int               # Number of artists
+    __posts:int                 # Posts per artist
+    __files_per_post:int        # Files per post
+    __latency:float             # Seconds to wait before answering any request
+    __bandwidth:int             # Bytes per second per connection for data files, 0 for unlimited
+    __rate_limit:float          # Probability of answering a data file HEAD request with 429
+    __discord_messages:int      # Number of messages in the Discord channel
+    __bodies:list[bytes]        # Data file bodies
+    __hashes:list[str]          # sha256 of each body
+    __random:random.Random      # Random used for 429 injection
+    __stats:dict                # Request counters
+    __stats_lock:threading.Lock # Lock for stats
+    __server:http.server.ThreadingHTTPServer
+
+    def __init__(self, artists:int = 1, posts:int = 100, files_per_post:int = 4, file_size:int = 1024 * 256, latency:float = 0,
+                 bandwidth:int = 0, rate_limit:float = 0, discord_messages:int = 300, seed:int = 0) -> None:
+        """
+        Initializes the server, does not start it
+
+        Param:
+            artists: number of artists
+            posts: number of posts per artist
+            files_per_post: number of files per post
+            file_size: size of each data file in bytes
+            latency: seconds to wait before answering any request
+            bandwidth: bytes per second per connection for data files, 0 for unlimited
+            rate_limit: probability between 0 and 1 of answering a data file HEAD request with 429
+            discord_messages: number of messages in the Discord channel
+            seed: seed for file content and 429 injection
+        """
+        self.__artists = artists
+        self.__posts = posts
+        self.__files_per_post = files_per_post
+        self.__latency = latency
+        self.__bandwidth = bandwidth
+        self.__rate_limit = rate_limit
+        self.__discord_messages = discord_messages
+        generator = random.Random(seed)
+        self.__bodies = [generator.randbytes(file_size + i) for i in range(0, UNIQUE_BODIES)]
+        self.__hashes = [hashlib.sha256(body).hexdigest() for body in self.__bodies]
+        self.__random = random.Random(seed)
+        self.__stats = {"pages": 0, "api": 0, "files": 0, "bytes": 0, "429": 0, "304": 0}
+        self.__stats_lock = threading.Lock()
+        self.__server = None
+
+    def start(self) -> str:
+        """
+        Starts the server on a free port in a daemon thread
+
+        Return: url prefix to use with KMP, for example http://127.0.0.1:5000/kemono
+        """
+        standin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            def do_GET(self) -> None:
+                standin._handle(self, True)
+            def do_HEAD(self) -> None:
+                standin._handle(self, False)
+            def log_message(self, *args) -> None:
+                pass
+
+        self.__server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return "http://127.0.0.1:{}{}".format(self.__server.server_address[1], PREFIX_PATH)
+
+    def stop(self) -> None:
+        """
+        Stops the server
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def stats(self) -> dict:
+        """
+        Returns request counters
+
+        Return: dict with pages (html pages served), api (json responses served), files (data files served),
+            bytes (data file bytes served), 429 (rate limited responses) and 304 (pages and API responses
+            that were not modified)
+        """
+        self.__stats_lock.acquire()
+        stats = dict(self.__stats)
+        self.__stats_lock.release()
+        return stats
+
+    def artist_url(self, prefix:str, artist:int) -> str:
+        """
+        Returns the url of an artist
+
+        Param:
+            prefix: url prefix returned by start()
+            artist: artist number
+        """
+        return "{}/{}/user/{}".format(prefix, SERVICE, artist)
+
+    def discord_url(self, prefix:str) -> str:
+        """
+        Returns the url of the Discord server
+
+        Param:
+            prefix: url prefix returned by start()
+        """
+        return prefix + "/discord/server/0"
+
+    def __count(self, key:str, amount:int = 1) -> None:
+        """
+        Increments a request counter
+        """
+        self.__stats_lock.acquire()
+        self.__stats[key] += amount
+        self.__stats_lock.release()
+
+    def _handle(self, handler:http.server.BaseHTTPRequestHandler, body:bool) -> None:
+        """
+        Routes a request
+
+        Param:
+            handler: request handler
+            body: True to send the body, false for HEAD requests
+        """
+        if self.__latency > 0:
+            time.sleep(self.__latency)
+        url = urlparse(handler.path)
+        path = url.path[len(PREFIX_PATH):] if url.path.startswith(PREFIX_PATH) else url.path
+        tokens = path.strip("/").split("/")
+        offset = int(parse_qs(url.query).get("o", ["0"])[0])
+
+        if tokens[0] == "data" and len(tokens) == 4:
+            self.__send_data(handler, tokens[3], body)
+        elif tokens[0] == "api" and "lookup" in tokens:
+            self.__send_page(handler, "api", "application/json", json.dumps([{"id": "0", "name": "general"}]).encode(), body)
+        elif tokens[0] == "api":
+            self.__send_page(handler, "api", "application/json", json.dumps(self.__discord_page(offset)).encode(), body)
+        elif len(tokens) == 5 and tokens[1] == "user" and tokens[3] == "post":
+            self.__send_page(handler, "pages", "text/html", self.__post_page(int(tokens[2]), int(tokens[4])).encode(), body)
+        elif len(tokens) == 3 and tokens[1] == "user":
+            self.__send_page(handler, "pages", "text/html", self.__listing_page(int(tokens[2]), offset).encode(), body)
+        else:
+            self.__send(handler, "text/html", b"<html><head><title>404 Not Found</title></head></html>", body, 404)
+
+    def __send(self, handler:http.server.BaseHTTPRequestHandler, content_type:str, data:bytes, body:bool, code:int = 200) -> None:
+        """
+        Sends a complete response
+        """
+        handler.send_response(code)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        if body:
+            handler.wfile.write(data)
+
+    def __send_page(self, handler:http.server.BaseHTTPRequestHandler, kind:str, content_type:str, data:bytes, body:bool) -> None:
+        """
+        Sends a page or API response with an ETag, answers with 304 if the client has it already
+
+        Param:
+            kind: stats counter to increment, pages or api
+        """
+        etag = '"' + hashlib.sha256(data).hexdigest()[:16] + '"'
+        if handler.headers.get("If-None-Match") == etag:
+            self.__count("304")
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        self.__count(kind)
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.send_header("ETag", etag)
+        handler.end_headers()
+        if body:
+            handler.wfile.write(data)
+
+    def __send_data(self, handler:http.server.BaseHTTPRequestHandler, name:str, body:bool) -> None:
+        """
+        Sends a data file, throttled to the configured bandwidth
+
+        Param:
+            name: file name in the data path, <sha256>.<ext>
+        """
+        sha, _, ext = name.partition(".")
+        if sha not in self.__hashes:
+            self.__send(handler, "text/html", b"", body, 404)
+            return
+
+        if not body and self.__rate_limit > 0 and self.__random.random() < self.__rate_limit:
+            self.__count("429")
+            self.__send(handler, "text/html", b"", body, 429)
+            return
+
+        data = self.__bodies[self.__hashes.index(sha)]
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/zip" if ext == "zip" else "image/" + ext)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        if not body:
+            return
+
+        self.__count("files")
+        view = memoryview(data)
+        step = self.__bandwidth // 10 if self.__bandwidth > 0 else len(data)
+        for i in range(0, len(data), max(1, step)):
+            start = time.perf_counter()
+            handler.wfile.write(view[i:i + step])
+            self.__count("bytes", len(view[i:i + step]))
+            # Throttle to bandwidth, each step is a tenth of a second worth of data
+            if self.__bandwidth > 0:
+                time.sleep(max(0, 0.1 - (time.perf_counter() - start)))
+
+    def __data_path(self, artist:int, post:int, i:int, ext:str) -> str:
+        """
+        Returns the data path of a file in a post
+        """
+        sha = self.__hashes[(artist + post + i) % UNIQUE_BODIES]
+        return "/data/{}/{}/{}.{}".format(sha[0:2], sha[2:4], sha, ext)
+
+    def __listing_page(self, artist:int, offset:int) -> str:
+        """
+        Returns an artist listing page, posts are listed newest first
+        """
+        cards = []
+        for post in range(self.__posts - 1 - offset, max(-1, self.__posts - 1 - offset - LISTING_PAGE_SZ), -1):
+            cards.append('<article class="post-card"><a href="/{s}/user/{a}/post/{p}"><header class="post-card__header">Post {p}</header></a></article>'
+                         .format(s=SERVICE, a=artist, p=post))
+        return ('<html><head><title>Artist {a} | Kemono</title><meta name="artist_name" content="Artist {a}"></head><body>{cards}</body></html>'
+                .format(a=artist, cards="".join(cards)))
+
+    def __post_page(self, artist:int, post:int) -> str:
+        """
+        Returns a post page with fileThumb images, post content images, attachments and comments
+        """
+        thumbs = []
+        images = []
+        attachments = []
+        for i in range(0, self.__files_per_post):
+            match i % 3:
+                case 0:
+                    thumbs.append('<a class="fileThumb" href="{d}?f={i}.jpg"><img src="{d}"></a>'.format(d=self.__data_path(artist, post, i, "jpg"), i=i))
+                case 1:
+                    images.append('<img src="{d}">'.format(d=self.__data_path(artist, post, i, "png")))
+                case 2:
+                    attachments.append('<a class="post__attachment-link" href="{d}?f=file{i}.zip">Download file{i}.zip</a>'
+                                       .format(d=self.__data_path(artist, post, i, "zip"), i=i))
+        return ('<html><head><title>Post {p} | Artist {a} | Kemono</title></head><body>'
+                '<a class="post__user-name" href="/{s}/user/{a}">Artist {a}</a>'
+                '<div class="post__published">2023-09-10 12:00:00</div>'
+                '<div class="post__files">{thumbs}</div>'
+                '<div class="post__content"><p>Content of post {p}</p>{images}</div>'
+                '<ul>{attachments}</ul>'
+                '<div class="post__comments"><p>Comment on post {p}</p></div>'
+                '</body></html>').format(s=SERVICE, a=artist, p=post, thumbs="".join(thumbs), images="".join(images), attachments="".join(attachments))
+
+    def __discord_page(self, offset:int) -> list:
+        """
+        Returns a page of Discord channel messages
+        """
+        messages = []
+        for i in range(offset, min(self.__discord_messages, offset + DISCORD_PAGE_SZ)):
+            sha = self.__hashes[i % UNIQUE_BODIES]
+            messages.append({"author": {"username": "user" + str(i % 5)}, "published": "Sun, 10 Sep 2023 12:00:00 GMT",
+                             "content": "message " + str(i), "embeds": [],
+                             "attachments": [{"path": "/data/{}/{}/{}.png".format(sha[0:2], sha[2:4], sha)}] if i % 2 == 0 else []})
+        return messages
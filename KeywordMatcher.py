@@ -0,0 +1,109 @@
+import fnmatch
+import re
+"""
+Matches strings against a list of exclusion keywords using compiled regexes instead of
+testing every keyword in turn
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+REGEX_PREFIX = "re:"        # Keywords starting with this are regular expressions if patterns are enabled
+GLOB_PREFIX = "glob:"       # Keywords starting with this are glob patterns matched against the whole string if patterns are enabled
+
+def _trie_pattern(words:list[str]) -> str:
+    """
+    Builds a regex matching any of words. Words are merged into a trie so the regex
+    engine checks shared prefixes once instead of trying every word at every position.
+
+    Param:
+        words: words to match
+    Return: regex pattern, matches the empty string if a word is empty
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def build(node:dict) -> str:
+        # A word ends here, any longer word sharing this prefix is already matched
+        if '' in node:
+            return ''
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+
+    return build(trie)
+
+class KeywordMatcher():
+    """
+    Case insensitive matcher for a list of keywords. Plain keywords are compiled once into a 
+    single regex searched on the lowered string, which is much faster than IGNORECASE.
+    A string matches if it contains any plain keyword, matches any regex keyword
+    (prefixed with "re:") anywhere or matches any glob keyword (prefixed with "glob:")
+    as a whole. Prefixes are only recognized if patterns are enabled, otherwise every 
+    keyword is plain so titles like "re:zero" keep their meaning.
+    """
+    __keywords:list[str]            # Keywords as given
+    __plain:re.Pattern|None         # Compiled plain keywords, None if there are none
+    __regexes:list[re.Pattern]      # Compiled regex keywords, each on its own so backreferences and flags keep working
+    __pattern:re.Pattern|None       # Compiled glob keywords, None if there are none
+
+    def __init__(self, keywords:list[str]|None, patterns:bool = False) -> None:
+        """
+        Compiles keywords
+
+        Param:
+            keywords: plain keywords, "re:<regex>" or "glob:<pattern>"
+            patterns: True to compile "re:" and "glob:" keywords as patterns, False to treat
+                every keyword as plain
+        Raise: re.error if a regex keyword is invalid
+        """
+        self.__keywords = list(keywords) if keywords else []
+        plain = []
+        globs = []
+        self.__regexes = []
+        for keyword in self.__keywords:
+            if patterns and keyword.startswith(REGEX_PREFIX):
+                self.__regexes.append(re.compile(keyword[len(REGEX_PREFIX):], re.IGNORECASE))
+            elif patterns and keyword.startswith(GLOB_PREFIX):
+                globs.append('^' + fnmatch.translate(keyword[len(GLOB_PREFIX):]))
+            else:
+                plain.append(keyword.lower())
+        self.__plain = re.compile(_trie_pattern(plain)) if len(plain) > 0 else None
+        self.__pattern = re.compile('|'.join(globs), re.IGNORECASE) if len(globs) > 0 else None
+
+    def search(self, target:str) -> str|None:
+        """
+        Checks if target matches any keyword
+
+        Param:
+            target: string to check
+        Return: matched part of target, lowered for plain keywords. None if target does not match
+        """
+        if self.__plain:
+            match = self.__plain.search(target.lower())
+            if match:
+                return match.group(0)
+        for regex in self.__regexes:
+            match = regex.search(target)
+            if match:
+                return match.group(0)
+        if self.__pattern:
+            match = self.__pattern.search(target)
+            if match:
+                return match.group(0)
+        return None
+
+    def keywords(self) -> list[str]:
+        """
+        Returns the keywords as given
+        """
+        return list(self.__keywords)
+
+    def __bool__(self) -> bool:
+        """
+        Returns True if there are any keywords
+        """
+        return self.__plain is not None or len(self.__regexes) > 0 or self.__pattern is not None
@@ -0,0 +1,68 @@
+import random
+import string
+import sys
+import time
+
+from KeywordMatcher import KeywordMatcher
+"""
+Benchmarks exclusion checks on realistic post titles. Compares the old loop testing every
+keyword against the lowered title with KeywordMatcher for growing keyword lists.
+
+Usage: python KeywordMatcher_bench.py [number of titles, default 100000]
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+WORDS = ["commission", "request", "sketch", "wip", "preview", "patreon", "reward", "poll", "chapter", "part",
+    "comic", "animation", "pinup", "nsfw", "sfw", "bonus", "pack", "psd", "high res", "alt", "version",
+    "update", "announcement", "stream", "vod", "timelapse", "process", "lineart", "color", "pending"]
+
+def make_keyword(generator:random.Random) -> str:
+    """
+    Returns a random keyword, mostly made up words so few titles are excluded
+    """
+    if generator.random() < 0.1:
+        return generator.choice(WORDS) + " " + str(generator.randint(1, 99))
+    return "".join(generator.choices(string.ascii_lowercase, k=generator.randint(4, 12)))
+
+def make_title(generator:random.Random) -> str:
+    """
+    Returns a random post title
+    """
+    words = [generator.choice(WORDS).capitalize() if generator.random() < 0.5 else generator.choice(WORDS) for _ in range(0, generator.randint(2, 8))]
+    return " ".join(words) + " " + str(generator.randint(1, 300))
+
+def old_check(tokens:list[str], target:str) -> bool:
+    """
+    Exclusion check used before KeywordMatcher
+    """
+    target = target.lower()
+    for kword in tokens:
+        if kword in target:
+            return True
+    return False
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    generator = random.Random(0)
+    titles = [make_title(generator) for _ in range(0, count)]
+
+    print("{:>9} {:>12} {:>12} {:>9} {:>9}".format("keywords", "loop (s)", "matcher (s)", "speedup", "excluded"))
+    for size in (10, 100, 500, 2000):
+        keywords = [make_keyword(generator) for _ in range(0, size)]
+
+        start = time.perf_counter()
+        expected = [old_check(keywords, title) for title in titles]
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        results = [matcher.search(title) is not None for title in titles]
+        compiled = time.perf_counter() - start
+
+        assert results == expected
+        print("{:>9} {:>12.3f} {:>12.3f} {:>8.1f}x {:>9}".format(size, loop, compiled, loop / compiled, sum(results)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import random
+import re
+import string
+import unittest
+from KeywordMatcher import KeywordMatcher
+
+class KeywordMatcherTestCase(unittest.TestCase):
+    def test_plain(self) -> None:
+        """
+        Tests plain keywords, including keywords sharing prefixes and special characters
+        """
+        matcher = KeywordMatcher(["wip", "wip sketch", "work", "c++", "[preview]"])
+        self.assertEqual(matcher.search("New WIP sketch"), "wip")
+        self.assertEqual(matcher.search("homework 3"), "work")
+        self.assertEqual(matcher.search("learning c++"), "c++")
+        self.assertEqual(matcher.search("[Preview] chapter 2"), "[preview]")
+        self.assertIsNone(matcher.search("wi p"))
+        self.assertIsNone(matcher.search("preview"))
+        self.assertTrue(matcher)
+
+    def test_patterns(self) -> None:
+        """
+        Tests regex and glob keywords
+        """
+        matcher = KeywordMatcher([r"re:part \d+", "glob:*.psd", "glob:draft*"], True)
+        self.assertEqual(matcher.search("Comic part 12"), "part 12")
+        self.assertIsNone(matcher.search("Comic part two"))
+        self.assertIsNotNone(matcher.search("layers.PSD"))
+        self.assertIsNone(matcher.search("layers.psd.zip"))
+        self.assertIsNotNone(matcher.search("Draft 1"))
+        self.assertIsNone(matcher.search("first draft"))
+        with self.assertRaises(re.error):
+            KeywordMatcher(["re:("], True)
+
+    def test_regex_independent(self) -> None:
+        """
+        Tests regex keywords keep their own backreferences and global flags
+        """
+        matcher = KeywordMatcher([r"re:(a)(b)\2", r"re:(\w)\1", r"re:(?x) part \s \d+"], True)
+        self.assertEqual(matcher.search("Balloon"), "ll")
+        self.assertEqual(matcher.search("Comic part 3"), "part 3")
+        self.assertEqual(matcher.search("xabb"), "abb")
+        self.assertIsNone(matcher.search("abc part"))
+
+    def test_patterns_disabled(self) -> None:
+        """
+        Tests prefixed keywords are plain unless patterns are enabled
+        """
+        matcher = KeywordMatcher(["re:zero", "glob:*", "re:("])
+        self.assertEqual(matcher.search("Re:Zero fan art"), "re:zero")
+        self.assertEqual(matcher.search("re:( chapter"), "re:(")
+        self.assertIsNone(matcher.search("zero"))
+        self.assertIsNone(matcher.search("anything"))
+
+    def test_empty(self) -> None:
+        """
+        Tests no keywords matches nothing and an empty keyword matches everything
+        """
+        for keywords in (None, []):
+            matcher = KeywordMatcher(keywords)
+            self.assertFalse(matcher)
+            self.assertIsNone(matcher.search("anything"))
+        self.assertEqual(KeywordMatcher([""]).search("anything"), "")
+
+    def test_equivalence(self) -> None:
+        """
+        Tests plain keywords match the same strings as a substring check on random input
+        """
+        generator = random.Random(0)
+        alphabet = "abc .+*"
+        for _ in range(0, 200):
+            keywords = ["".join(generator.choices(alphabet, k=generator.randint(1, 4))) for _ in range(0, generator.randint(1, 8))]
+            matcher = KeywordMatcher(keywords)
+            for _ in range(0, 20):
+                target = "".join(generator.choices(alphabet + string.ascii_uppercase[:3], k=generator.randint(0, 12)))
+                expected = any(keyword in target.lower() for keyword in keywords)
+                self.assertEqual(matcher.search(target) is not None, expected, (keywords, target))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import contextlib
+import json
+import threading
+import time
+from typing import Callable
+from datetime import datetime, timezone
+"""
+Thread safe timers, counters and histograms used to see where a run's time goes
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+# Upper bounds in seconds of histogram buckets, the last bucket catches everything else
+BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf")]
+
+class Histogram():
+    """
+    Fixed bucket histogram of durations
+    """
+    __counts:list[int]      # Observations per bucket
+    __sum:float             # Sum of observations
+    __max:float             # Largest observation
+
+    def __init__(self) -> None:
+        """
+        Creates an empty histogram
+        """
+        self.__counts = [0] * len(BUCKETS)
+        self.__sum = 0
+        self.__max = 0
+
+    def observe(self, value:float) -> None:
+        """
+        Adds an observation
+
+        Param:
+            value: duration in seconds
+        """
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.__counts[i] += 1
+                break
+        self.__sum += value
+        self.__max = max(self.__max, value)
+
+    def count(self) -> int:
+        """
+        Returns number of observations
+        """
+        return sum(self.__counts)
+
+    def quantile(self, q:float) -> float:
+        """
+        Estimates a quantile as the upper bound of the bucket containing it
+
+        Param:
+            q: quantile between 0 and 1
+        Return: estimated quantile, capped by the largest observation
+        """
+        target = q * self.count()
+        seen = 0
+        for i, bound in enumerate(BUCKETS):
+            seen += self.__counts[i]
+            if seen >= target and seen > 0:
+                return min(bound, self.__max)
+        return 0
+
+    def to_dict(self) -> dict:
+        """
+        Returns the histogram as a json serializable dict
+        """
+        count = self.count()
+        return {"count": count, "sum": self.__sum, "mean": self.__sum / count if count else 0, "max": self.__max,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95),
+                "buckets": [[str(bound), c] for bound, c in zip(BUCKETS, self.__counts)]}
+
+class Metrics():
+    """
+    Collects per stage timings and counters for a run. Stages are timed using timer()
+    as a context manager:
+
+        with metrics.timer("head"):
+            r = session.request('HEAD', src)
+    """
+    __histograms:dict[str, Histogram]   # Stage name -> histogram of durations
+    __counters:dict[str, int]           # Counter name -> value
+    __gauges:dict[str, int]             # Gauge name -> value, gauges can go up and down
+    __watched:dict[str, Callable[[], float]]    # Gauge name -> function returning its current value
+    __lock:threading.Lock               # Lock for histograms and counters
+    __start:float                       # Creation time, used for run duration
+
+    def __init__(self) -> None:
+        """
+        Creates an empty set of metrics
+        """
+        self.__histograms = {}
+        self.__counters = {}
+        self.__gauges = {}
+        self.__watched = {}
+        self.__lock = threading.Lock()
+        self.__start = time.monotonic()
+
+    @contextlib.contextmanager
+    def timer(self, name:str):
+        """
+        Times the enclosed block and records it under name, exceptions are timed as well
+
+        Param:
+            name: stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def track(self, name:str):
+        """
+        Increments gauge name for the duration of the enclosed block, used for in flight counts
+
+        Param:
+            name: gauge name
+        """
+        self.adjust(name, 1)
+        try:
+            yield
+        finally:
+            self.adjust(name, -1)
+
+    def observe(self, name:str, value:float) -> None:
+        """
+        Records a duration
+
+        Param:
+            name: stage name
+            value: duration in seconds
+        """
+        self.__lock.acquire()
+        histogram = self.__histograms.get(name)
+        if not histogram:
+            histogram = Histogram()
+            self.__histograms[name] = histogram
+        histogram.observe(value)
+        self.__lock.release()
+
+    def count(self, name:str, amount:int = 1) -> None:
+        """
+        Increments a counter
+
+        Param:
+            name: counter name
+            amount: amount to increment by
+        """
+        self.__lock.acquire()
+        self.__counters[name] = self.__counters.get(name, 0) + amount
+        self.__lock.release()
+
+    def adjust(self, name:str, amount:int) -> None:
+        """
+        Adds amount to a gauge
+
+        Param:
+            name: gauge name
+            amount: amount to add, can be negative
+        """
+        self.__lock.acquire()
+        self.__gauges[name] = self.__gauges.get(name, 0) + amount
+        self.__lock.release()
+
+    def watch(self, name:str, func:Callable[[], float]) -> None:
+        """
+        Registers a gauge whose value is read from func whenever a snapshot is taken,
+        replaces any gauge already registered under name
+
+        Param:
+            name: gauge name
+            func: function returning the gauge's current value
+        """
+        self.__lock.acquire()
+        self.__watched[name] = func
+        self.__lock.release()
+
+    def snapshot(self) -> dict:
+        """
+        Returns all metrics as a json serializable dict
+        """
+        self.__lock.acquire()
+        snapshot = {"time": datetime.now(tz = timezone.utc).isoformat(), "duration": time.monotonic() - self.__start,
+                    "stages": {name: histogram.to_dict() for name, histogram in self.__histograms.items()},
+                    "counters": dict(self.__counters), "gauges": dict(self.__gauges)}
+        watched = list(self.__watched.items())
+        self.__lock.release()
+
+        # Read outside of the lock, watched functions may take locks of their own
+        for name, func in watched:
+            snapshot["gauges"][name] = func()
+        return snapshot
+
+    def summary(self) -> str:
+        """
+        Returns a human readable summary of each stage and counter
+        """
+        snapshot = self.snapshot()
+        lines = ["Stage timings (count, total, mean, p50, p95, max in seconds):"]
+        for name, stage in sorted(snapshot["stages"].items()):
+            lines.append("    {:<14} {:>7} {:>10.2f} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.3f}".format(
+                name, stage["count"], stage["sum"], stage["mean"], stage["p50"], stage["p95"], stage["max"]))
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append("    {:<14} {:>7}".format(name, value))
+        return "\n".join(lines)
+
+    def dump_json(self, path:str) -> None:
+        """
+        Appends a snapshot to path as a single json line so runs can be compared over time
+
+        Param:
+            path: file to append to, created if it does not exists
+        """
+        with open(path, 'a', encoding='utf-8') as fd:
+            fd.write(json.dumps(self.snapshot()) + "\n")
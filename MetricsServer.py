@@ -0,0 +1,125 @@
+import http.server
+import re
+import threading
+from Metrics import Metrics
+"""
+Serves Metrics in the Prometheus text exposition format so long running downloads,
+such as a server continuously running --UPDATE, can be scraped and alerted on.
+Only uses the standard library.
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+NAMESPACE = "kmp"                       # Prefix of every exposed metric
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _name(name:str) -> str:
+    """
+    Converts a metric name into a valid Prometheus metric name
+
+    Param:
+        name: metric name
+    Return: name prefixed with NAMESPACE and containing only valid characters
+    """
+    return NAMESPACE + "_" + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+def _le(bound:str) -> str:
+    """
+    Converts a bucket bound into the le label value Prometheus expects
+    """
+    return "+Inf" if bound == "inf" else bound
+
+def format_metrics(snapshot:dict) -> str:
+    """
+    Formats a Metrics snapshot in the Prometheus text exposition format
+
+    Param:
+        snapshot: return value of Metrics.snapshot()
+    Return: exposition text
+    """
+    lines = []
+    stage = _name("stage_seconds")
+    lines.append("# HELP {} Time spent in each stage".format(stage))
+    lines.append("# TYPE {} histogram".format(stage))
+    for name, histogram in sorted(snapshot["stages"].items()):
+        cumulative = 0
+        for bound, count in histogram["buckets"]:
+            cumulative += count
+            lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(stage, name, _le(bound), cumulative))
+        lines.append('{}_sum{{stage="{}"}} {}'.format(stage, name, histogram["sum"]))
+        lines.append('{}_count{{stage="{}"}} {}'.format(stage, name, histogram["count"]))
+
+    for name, value in sorted(snapshot["counters"].items()):
+        counter = _name(name) + "_total"
+        lines.append("# TYPE {} counter".format(counter))
+        lines.append("{} {}".format(counter, value))
+
+    for name, value in sorted(snapshot["gauges"].items()):
+        gauge = _name(name)
+        lines.append("# TYPE {} gauge".format(gauge))
+        lines.append("{} {}".format(gauge, value))
+
+    uptime = _name("uptime_seconds")
+    lines.append("# TYPE {} gauge".format(uptime))
+    lines.append("{} {}".format(uptime, snapshot["duration"]))
+    return "\n".join(lines) + "\n"
+
+class MetricsServer():
+    """
+    HTTP server exposing a Metrics object at /metrics, runs in a daemon thread
+    """
+    __metrics:Metrics                               # Metrics to expose
+    __host:str                                      # Address to bind to
+    __port:int                                      # Port to bind to, 0 for any free port
+    __server:http.server.ThreadingHTTPServer        # Underlying server, None if not started
+
+    def __init__(self, metrics:Metrics, port:int, host:str = "127.0.0.1") -> None:
+        """
+        Initializes the server, does not start it
+
+        Param:
+            metrics: metrics to expose
+            port: port to listen on, 0 for any free port
+            host: address to listen on, use 0.0.0.0 to allow scraping from other machines
+        """
+        self.__metrics = metrics
+        self.__host = host
+        self.__port = port
+        self.__server = None
+
+    def start(self) -> int:
+        """
+        Starts serving in a daemon thread
+
+        Return: port being listened on
+        """
+        metrics = self.__metrics
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.partition("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                data = format_metrics(metrics.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            def log_message(self, *args) -> None:
+                pass
+
+        self.__server = http.server.ThreadingHTTPServer((self.__host, self.__port), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self.__server.server_address[1]
+
+    def stop(self) -> None:
+        """
+        Stops the server if it was started
+        """
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
@@ -0,0 +1,48 @@
+import unittest
+import urllib.request
+import urllib.error
+from Metrics import Metrics
+from MetricsServer import MetricsServer, format_metrics
+
+class MetricsServerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        """
+        Creates metrics with a stage, a counter and both kinds of gauges
+        """
+        self.metrics = Metrics()
+        self.metrics.observe("head", 0.002)
+        self.metrics.observe("head", 100)
+        self.metrics.count("bytes", 1024)
+        self.metrics.adjust("transfers", 2)
+        self.metrics.watch("download-queue", lambda: 7)
+
+    def test_format(self) -> None:
+        """
+        Tests exposition text, buckets are cumulative and names are sanitized
+        """
+        text = format_metrics(self.metrics.snapshot())
+        self.assertIn('kmp_stage_seconds_bucket{stage="head",le="0.001"} 0\n', text)
+        self.assertIn('kmp_stage_seconds_bucket{stage="head",le="0.005"} 1\n', text)
+        self.assertIn('kmp_stage_seconds_bucket{stage="head",le="+Inf"} 2\n', text)
+        self.assertIn('kmp_stage_seconds_count{stage="head"} 2\n', text)
+        self.assertIn('kmp_bytes_total 1024\n', text)
+        self.assertIn('kmp_transfers 2\n', text)
+        self.assertIn('kmp_download_queue 7\n', text)
+
+    def test_serve(self) -> None:
+        """
+        Tests scraping the server
+        """
+        server = MetricsServer(self.metrics, 0)
+        port = server.start()
+        try:
+            with urllib.request.urlopen("http://127.0.0.1:{}/metrics".format(port)) as response:
+                self.assertIn("text/plain", response.headers["Content-Type"])
+                self.assertIn(b"kmp_bytes_total 1024", response.read())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen("http://127.0.0.1:{}/other".format(port))
+        finally:
+            server.stop()
+
+if __name__ == '__main__':
+    unittest.main()
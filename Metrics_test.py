@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import unittest
+from Metrics import Metrics, Histogram
+
+class MetricsTestCase(unittest.TestCase):
+    def test_histogram(self) -> None:
+        """
+        Tests histogram counts and quantile estimates
+        """
+        histogram = Histogram()
+        self.assertEqual(histogram.quantile(0.5), 0)
+        for _ in range(0, 90):
+            histogram.observe(0.002)
+        for _ in range(0, 10):
+            histogram.observe(3)
+        self.assertEqual(histogram.count(), 100)
+        self.assertEqual(histogram.quantile(0.5), 0.005)
+        self.assertEqual(histogram.quantile(0.95), 3)      # Capped by the largest observation
+        self.assertAlmostEqual(histogram.to_dict()["sum"], 30.18)
+
+    def test_timer(self) -> None:
+        """
+        Tests timing a block, including one that raises
+        """
+        metrics = Metrics()
+        with metrics.timer("stage"):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.timer("stage"):
+                raise ValueError()
+        self.assertEqual(metrics.snapshot()["stages"]["stage"]["count"], 2)
+        self.assertIn("stage", metrics.summary())
+
+    def test_dump_json(self) -> None:
+        """
+        Tests appending snapshots as json lines
+        """
+        metrics = Metrics()
+        metrics.count("bytes", 10)
+        metrics.count("bytes", 5)
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "metrics.json")
+            metrics.dump_json(path)
+            metrics.dump_json(path)
+            with open(path) as fd:
+                lines = fd.readlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])["counters"]["bytes"], 15)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+import threading
+import time
+import zlib
+from DB import DB
+"""
+On disk cache of scraped pages and their validators (ETag and Last-Modified) used to make
+conditional requests. Pages are stored compressed in a sqlite database and the least
+recently used pages are evicted once the cache grows past its size cap. Pages validated
+within the cache's time to live are fresh and can be used without making a request.
+
+Usage:
+    page = cache.get(url)
+    if page and page.fresh:
+        cache.hit(url)
+        text = page.text
+    else:
+        response = session.get(url, headers=page.validators() if page else {})
+        text = cache.update(url, page, response)[0]
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+class CachedPage():
+    """
+    A page stored in the cache
+    """
+    text:str                # Page content
+    etag:str|None           # ETag header of the cached response
+    modified:str|None       # Last-Modified header of the cached response
+    parsed:str|None         # Results parsed from text by the caller, None if not stored
+    fresh:bool              # True if the page was validated within the cache's time to live
+
+    def __init__(self, text:str, etag:str|None, modified:str|None, parsed:str|None, fresh:bool) -> None:
+        self.text = text
+        self.etag = etag
+        self.modified = modified
+        self.parsed = parsed
+        self.fresh = fresh
+
+    def validators(self) -> dict:
+        """
+        Returns headers that make a request conditional on the page having changed
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.modified:
+            headers['If-Modified-Since'] = self.modified
+        return headers
+
+class PageCache():
+    """
+    Thread safe size bounded LRU cache of pages keyed by url
+    """
+    __db:DB                 # Database storing the pages
+    __max_size:int          # Max total size of stored pages in bytes
+    __ttl:float             # Seconds a page stays fresh after it is validated
+    __size:int              # Current total size of stored pages in bytes
+    __hits:int              # Number of pages served from the cache
+    __misses:int            # Number of pages that had to be downloaded
+    __lock:threading.Lock   # Lock for the database, size and counters. Cursors are shared so results must be fetched under it
+
+    def __init__(self, path:str, max_size:int, ttl:float = 0) -> None:
+        """
+        Opens or creates a page cache
+
+        Param:
+            path: database file
+            max_size: max total size of stored pages in bytes, compressed size is used
+            ttl: seconds a page stays fresh after it is downloaded or revalidated, 0 to always revalidate
+        """
+        self.__db = DB(path)
+        self.__db.executeNCommit("CREATE TABLE IF NOT EXISTS Pages (url TEXT PRIMARY KEY, etag TEXT, modified TEXT, body BLOB, parsed TEXT, size INTEGER, accessed REAL, validated REAL)")
+        # Update older caches
+        columns = [row[1] for row in self.__db.execute("PRAGMA table_info(Pages)").fetchall()]
+        if "validated" not in columns:
+            self.__db.executeNCommit("ALTER TABLE Pages ADD COLUMN validated REAL DEFAULT 0")
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__size = self.__db.execute("SELECT COALESCE(SUM(size), 0) FROM Pages").fetchone()[0]
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+        self.__evict()
+
+    def get(self, url:str) -> CachedPage|None:
+        """
+        Returns a cached page
+
+        Param:
+            url: url of the page
+        Return: cached page, None if url is not cached
+        """
+        self.__lock.acquire()
+        row = self.__db.execute(("SELECT body, etag, modified, parsed, validated FROM Pages WHERE url = ?", (url,),)).fetchone()
+        self.__lock.release()
+        if not row:
+            return None
+        return CachedPage(zlib.decompress(row[0]).decode('utf-8'), row[1], row[2], row[3], time.time() - (row[4] or 0) < self.__ttl)
+
+    def put(self, url:str, text:str, etag:str|None, modified:str|None) -> None:
+        """
+        Stores a page, replacing any cached version and its parsed results. Pages without
+        validators are only stored if they can stay fresh, otherwise they could never be used.
+
+        Param:
+            url: url of the page
+            text: page content
+            etag: ETag header of the response
+            modified: Last-Modified header of the response
+        """
+        if not etag and not modified and self.__ttl <= 0:
+            return
+        body = zlib.compress(text.encode('utf-8'))
+        now = time.time()
+        self.__lock.acquire()
+        old = self.__db.execute(("SELECT size FROM Pages WHERE url = ?", (url,),)).fetchone()
+        self.__db.executeNCommit(("INSERT OR REPLACE INTO Pages VALUES (?, ?, ?, ?, NULL, ?, ?, ?)", (url, etag, modified, body, len(body), now, now),))
+        self.__size += len(body) - (old[0] if old else 0)
+        self.__lock.release()
+        self.__evict()
+
+    def put_parsed(self, url:str, parsed:str) -> None:
+        """
+        Stores results parsed from a cached page so a later hit can skip parsing
+
+        Param:
+            url: url of the page, does nothing if it is not cached
+            parsed: parsed results, serialized by the caller
+        """
+        self.__lock.acquire()
+        self.__db.executeNCommit(("UPDATE Pages SET parsed = ? WHERE url = ?", (parsed, url),))
+        self.__lock.release()
+
+    def update(self, url:str, page:CachedPage|None, response) -> tuple[str, str|None]:
+        """
+        Handles the response to a request made with page's validators. A 304 is served from the
+        cache, otherwise the response is stored if it was successful.
+
+        Param:
+            url: url of the page
+            page: cached page returned by get(), None if url was not cached
+            response: requests.Response to the request, its content is read
+        Return: (page content, results parsed from the cached page if the response was a 304 and any were stored)
+        """
+        if page and response.status_code == 304:
+            self.hit(url, True)
+            return (page.text, page.parsed)
+        
+        self.miss()
+        text = response.text
+        if response.status_code == 200:
+            self.put(url, text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return (text, None)
+
+    def hit(self, url:str, revalidated:bool = False) -> None:
+        """
+        Records that a cached page was used, it becomes the most recently used page
+
+        Param:
+            url: url of the page
+            revalidated: True if the server confirmed the page is unchanged, it becomes fresh again
+        """
+        self.__lock.acquire()
+        if revalidated:
+            now = time.time()
+            self.__db.executeNCommit(("UPDATE Pages SET accessed = ?, validated = ? WHERE url = ?", (now, now, url),))
+        else:
+            self.__db.executeNCommit(("UPDATE Pages SET accessed = ? WHERE url = ?", (time.time(), url),))
+        self.__hits += 1
+        self.__lock.release()
+
+    def miss(self) -> None:
+        """
+        Records that a page had to be downloaded
+        """
+        self.__lock.acquire()
+        self.__misses += 1
+        self.__lock.release()
+
+    def ratio(self) -> float:
+        """
+        Returns the hit ratio between 0 and 1, 0 if nothing was requested
+        """
+        total = self.__hits + self.__misses
+        return self.__hits / total if total else 0
+
+    def summary(self) -> str:
+        """
+        Returns a human readable hit ratio summary
+        """
+        return "Page cache: {} hits, {} misses ({:.1%} hit ratio), {:.2f} MB stored".format(
+            self.__hits, self.__misses, self.ratio(), self.__size / (1024 ** 2))
+
+    def close(self) -> None:
+        """
+        Closes the cache, cannot be reopened
+        """
+        self.__db.close()
+
+    def __evict(self) -> None:
+        """
+        Removes least recently used pages until the cache is within its size cap
+        """
+        self.__lock.acquire()
+        while self.__size > self.__max_size:
+            rows = self.__db.execute("SELECT url, size FROM Pages ORDER BY accessed LIMIT 64").fetchall()
+            if len(rows) == 0:
+                self.__size = 0
+                break
+            for url, size in rows:
+                if self.__size <= self.__max_size:
+                    break
+                self.__db.execute(("DELETE FROM Pages WHERE url = ?", (url,),))
+                self.__size -= size
+        self.__db.commit()
+        self.__lock.release()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import time
+import unittest
+from PageCache import PageCache
+
+class PageCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        """
+        Creates a temp directory for the cache database
+        """
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "PageCache.db")
+
+    def test_put_get(self) -> None:
+        """
+        Tests storing pages, validators and parsed results
+        """
+        cache = PageCache(self.path, 1024 * 1024)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "<html>a</html>", '"etag"', None)
+        cache.put("b", "<html>b</html>", None, None)     # No validators, not stored
+        page = cache.get("a")
+        self.assertEqual(page.text, "<html>a</html>")
+        self.assertEqual(page.validators(), {'If-None-Match': '"etag"'})
+        self.assertIsNone(page.parsed)
+        self.assertIsNone(cache.get("b"))
+
+        cache.put_parsed("a", "[1, 2]")
+        self.assertEqual(cache.get("a").parsed, "[1, 2]")
+        # Replacing a page drops its parsed results
+        cache.put("a", "<html>a2</html>", None, "Sun, 10 Sep 2023 12:00:00 GMT")
+        self.assertIsNone(cache.get("a").parsed)
+        self.assertEqual(cache.get("a").validators(), {'If-Modified-Since': "Sun, 10 Sep 2023 12:00:00 GMT"})
+        cache.close()
+
+        # Persists between runs
+        cache = PageCache(self.path, 1024 * 1024)
+        self.assertEqual(cache.get("a").text, "<html>a2</html>")
+        cache.close()
+
+    def test_eviction(self) -> None:
+        """
+        Tests least recently used pages are evicted first
+        """
+        page = os.urandom(2048).hex()      # Compresses to a little over 2048 bytes
+        cache = PageCache(self.path, 5000)
+        cache.put("a", page, '"a"', None)
+        time.sleep(0.01)
+        cache.put("b", page, '"b"', None)
+        time.sleep(0.01)
+        cache.hit("a")
+        time.sleep(0.01)
+        cache.put("c", page, '"c"', None)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        cache.close()
+
+        # A smaller cap evicts on open
+        cache = PageCache(self.path, 3000)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        cache.close()
+
+    def test_ttl(self) -> None:
+        """
+        Tests freshness, pages without validators are only stored with a ttl
+        """
+        cache = PageCache(self.path, 1024 * 1024, 0.2)
+        cache.put("a", "a", None, None)
+        self.assertTrue(cache.get("a").fresh)
+        time.sleep(0.25)
+        self.assertFalse(cache.get("a").fresh)
+        cache.hit("a")
+        self.assertFalse(cache.get("a").fresh)
+        cache.hit("a", True)
+        self.assertTrue(cache.get("a").fresh)
+        cache.close()
+
+        cache = PageCache(self.path, 1024 * 1024)
+        self.assertFalse(cache.get("a").fresh)
+        cache.put("b", "b", None, None)
+        self.assertIsNone(cache.get("b"))
+        cache.close()
+
+    def test_update(self) -> None:
+        """
+        Tests handling responses to conditional requests
+        """
+        class Response():
+            def __init__(self, status_code:int, text:str, headers:dict) -> None:
+                self.status_code = status_code
+                self.text = text
+                self.headers = headers
+
+        cache = PageCache(self.path, 1024 * 1024)
+        self.assertEqual(cache.update("a", None, Response(200, "a", {'ETag': '"a"'})), ("a", None))
+        self.assertEqual(cache.update("b", None, Response(500, "error", {'ETag': '"b"'})), ("error", None))
+        self.assertIsNone(cache.get("b"))
+        cache.put_parsed("a", "parsed")
+        self.assertEqual(cache.update("a", cache.get("a"), Response(304, "", {})), ("a", "parsed"))
+        self.assertEqual(cache.ratio(), 1 / 3)
+        cache.close()
+
+    def test_ratio(self) -> None:
+        """
+        Tests hit ratio
+        """
+        cache = PageCache(self.path, 1024)
+        self.assertEqual(cache.ratio(), 0)
+        cache.hit("a")
+        cache.miss()
+        cache.miss()
+        cache.miss()
+        self.assertEqual(cache.ratio(), 0.25)
+        cache.close()
+
+    def tearDown(self) -> None:
+        """
+        Removes temp directory
+        """
+        self.tempdir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import threading
+from SpaceReserver import SpaceReserver
+"""
+Chooses which of several download roots an artist is placed in. An artist whose folder
+already exists in a root stays there. New artists go to the root with the most free space
+per unit of work already placed on its volume, where work is the artists placed on it this
+run and the downloads in progress on it, so a run spreads over every disk and fills them
+evenly instead of sending all writes to the emptiest one.
+
+Usage:
+    policy = PlacementPolicy(["/mnt/a/", "/mnt/b/"], reserver)
+    root = policy.choose(artist)
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+LOAD_UNIT = 1024 * 1024 * 64    # Bytes of downloads in progress that count as one placed artist
+
+def group_by_device(paths:list[str]) -> list[list[str]]:
+    """
+    Groups paths by the device they are on, missing paths are left out
+
+    Param:
+        paths: paths to group
+    Return: lists of paths sharing a device, in the order each device was first seen
+    """
+    groups = {}
+    for path in paths:
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            continue
+        groups.setdefault(device, []).append(path)
+    return list(groups.values())
+
+class PlacementPolicy():
+    """
+    Thread safe placement of artists across download roots
+    """
+    __roots:list[str]               # Download roots, each ends with os.sep
+    __reserver:SpaceReserver        # Free space and downloads in progress per volume
+    __placed:dict[str, str]         # Name -> root chosen this run
+    __load:dict[int, int]           # Device id -> artists placed on it this run
+    __lock:threading.Lock           # Guards placed and load
+
+    def __init__(self, roots:list[str], reserver:SpaceReserver) -> None:
+        """
+        Initializes the policy
+
+        Param:
+            roots: download roots, each ends with os.sep
+            reserver: reserver used by downloads to the roots
+        Pre: roots is not empty and each root exists
+        """
+        self.__roots = list(roots)
+        self.__reserver = reserver
+        self.__placed = {}
+        self.__load = {}
+        self.__lock = threading.Lock()
+
+    def roots(self) -> list[str]:
+        """
+        Returns the download roots
+        """
+        return list(self.__roots)
+
+    def choose(self, name:str) -> str:
+        """
+        Returns the root to place name in, name gets the same root for the rest of the run
+
+        Param:
+            name: sanitized folder name of an artist or server
+        Return: download root, ends with os.sep
+        """
+        with self.__lock:
+            root = self.__placed.get(name)
+            if root:
+                return root
+            root = next((r for r in self.__roots if os.path.isdir(os.path.join(r, name))), None)
+            if not root:
+                root = max(self.__roots, key=self.__score) if len(self.__roots) > 1 else self.__roots[0]
+            device = os.stat(root).st_dev
+            self.__load[device] = self.__load.get(device, 0) + 1
+            self.__placed[name] = root
+            return root
+
+    def __score(self, root:str) -> float:
+        """
+        Returns a root's free space shared by the work already placed on its volume
+
+        Param:
+            root: download root
+        Pre: self.__lock is held
+        Return: score, higher is better
+        """
+        load = self.__load.get(os.stat(root).st_dev, 0) + self.__reserver.pending(root) / LOAD_UNIT
+        return self.__reserver.available(root) / (1 + load)
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import PlacementPolicy
+from PlacementPolicy import PlacementPolicy as Policy
+from SpaceReserver import SpaceReserver
+
+class FixedReserver(SpaceReserver):
+    """
+    Reports fixed free space and downloads in progress per root
+    """
+    def __init__(self, available:dict, pending:dict) -> None:
+        super().__init__()
+        self.free = available
+        self.writing = pending
+
+    def available(self, path:str) -> int:
+        return self.free[path]
+
+    def pending(self, path:str) -> int:
+        return self.writing.get(path, 0)
+
+class PlacementPolicyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.a = tempfile.TemporaryDirectory()
+        # A second device is needed for placements to be spread
+        self.b = tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        self.roots = [os.path.join(self.a.name, ''), os.path.join(self.b.name, '')]
+
+    def test_existing(self) -> None:
+        """
+        Tests artists stay in the root their folder is already in
+        """
+        os.mkdir(os.path.join(self.roots[1], "Artist"))
+        policy = Policy(self.roots, FixedReserver({self.roots[0]: 1000, self.roots[1]: 1}, {}))
+        self.assertEqual(policy.choose("Artist"), self.roots[1])
+        self.assertEqual(policy.choose("Other"), self.roots[0])
+        self.assertEqual(policy.choose("Other"), self.roots[0])
+
+    def test_spread(self) -> None:
+        """
+        Tests new artists are spread by free space and load
+        """
+        if os.stat(self.roots[0]).st_dev == os.stat(self.roots[1]).st_dev:
+            self.skipTest("roots are on the same device")
+        reserver = FixedReserver({self.roots[0]: 300, self.roots[1]: 100}, {})
+        policy = Policy(self.roots, reserver)
+        placed = [policy.choose("Artist " + str(i)) for i in range(0, 8)]
+        self.assertEqual(placed.count(self.roots[0]), 6)
+        self.assertEqual(placed.count(self.roots[1]), 2)
+
+        # Downloads in progress count as load
+        reserver.writing[self.roots[0]] = PlacementPolicy.LOAD_UNIT * 100
+        self.assertEqual(Policy(self.roots, reserver).choose("Busy"), self.roots[1])
+
+    def test_single(self) -> None:
+        """
+        Tests a single root is always chosen
+        """
+        policy = Policy(self.roots[:1], SpaceReserver())
+        self.assertEqual(policy.choose("Artist"), self.roots[0])
+
+    def test_group_by_device(self) -> None:
+        """
+        Tests paths are grouped by device and missing paths are dropped
+        """
+        nested = os.path.join(self.roots[0], "nested", "")
+        os.mkdir(nested)
+        groups = PlacementPolicy.group_by_device(self.roots + [nested, os.path.join(self.roots[0], "missing")])
+        self.assertIn(nested, next(group for group in groups if self.roots[0] in group))
+        self.assertEqual(sum(len(group) for group in groups), 3)
+
+    def tearDown(self) -> None:
+        self.a.cleanup()
+        self.b.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
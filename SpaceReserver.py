@@ -0,0 +1,225 @@
+import contextlib
+import logging
+import os
+import shutil
+import threading
+import time
+"""
+Admission control for disk space. Downloads and extractions reserve the bytes they are
+about to write against the free space of the volume they write to, so concurrent writers
+cannot together fill a volume and fail mid-write. Bytes already on disk for a reservation
+are taken out of it, they are counted by the volume's free space instead. For a file, these
+are the bytes allocated to it, including preallocated ones. Writers that write elsewhere
+report them through written(). A reservation that does not fit waits
+while other reservations on the volume are pending, as failed downloads give their space
+back, and is refused once nothing else is pending or DEFER_TIMEOUT passes.
+
+Usage:
+    if reserver.reserve(path, size):
+        write(path)
+        reserver.release(path, size)
+
+    if reserver.reserve(dir, size):
+        for member in archive:
+            extract(member, dir)
+            reserver.written(dir, member.size)
+        reserver.release(dir, size)
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+DEFER_TIMEOUT = 300         # Seconds a reservation waits for space before it is refused
+
+def preallocate(fd, nbytes:int) -> bool:
+    """
+    Allocates nbytes for a file before it is written, reducing fragmentation on spinning
+    disks. The file's size becomes nbytes, callers must truncate it to the bytes written.
+
+    Param:
+        fd: file opened for writing
+        nbytes: bytes to allocate
+    Return: True if the file was allocated, False if the platform or file system does not support it
+    """
+    if not hasattr(os, "posix_fallocate") or nbytes <= 0:
+        return False
+    try:
+        os.posix_fallocate(fd.fileno(), 0, nbytes)
+    except OSError as e:
+        logging.debug("Preallocation failed: {}".format(e))
+        return False
+    return True
+
+def allocated(path:str) -> int:
+    """
+    Returns the bytes on disk for a file
+
+    Param:
+        path: file path, does not need to exist
+    Return: bytes allocated to the file, its size where allocation is not reported. 0 if
+        path is not a file
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 0
+    if not os.path.isfile(path):
+        return 0
+    blocks = getattr(stat, "st_blocks", None)
+    return blocks * 512 if blocks is not None else stat.st_size
+
+def existing_dir(path:str) -> str:
+    """
+    Returns path if it is an existing directory, otherwise its closest parent that exists
+
+    Param:
+        path: file or directory path, does not need to exist
+    Return: existing directory
+    """
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        return path
+    path = os.path.dirname(path)
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+class SpaceReserver():
+    """
+    Thread safe disk space reservations, kept per volume
+    """
+    __min_free:int                  # Bytes that are always left free on a volume
+    __timeout:float                 # Seconds a reservation waits for space
+    __reserved:dict[str, list[int]] # Path -> [device id, bytes reserved for it not yet reported by written()]
+    __cond:threading.Condition      # Guards reserved, notified when space is released
+
+    def __init__(self, min_free:int = 0, timeout:float = DEFER_TIMEOUT) -> None:
+        """
+        Initializes the reserver
+
+        Param:
+            min_free: bytes to leave free on every volume
+            timeout: seconds a reservation waits for space before it is refused
+        """
+        self.__min_free = min_free
+        self.__timeout = timeout
+        self.__reserved = {}
+        self.__cond = threading.Condition()
+
+    def available(self, path:str) -> int:
+        """
+        Returns the bytes that can still be reserved on path's volume
+
+        Param:
+            path: file or directory path, does not need to exist
+        Return: free bytes less reservations and min free, may be negative
+        """
+        directory = existing_dir(path)
+        with self.__cond:
+            return self.__available(directory, os.stat(directory).st_dev)
+
+    def pending(self, path:str) -> int:
+        """
+        Returns the bytes reserved on path's volume, the size of the writes in progress on it
+
+        Param:
+            path: file or directory path, does not need to exist
+        Return: bytes reserved
+        """
+        device = os.stat(existing_dir(path)).st_dev
+        with self.__cond:
+            return self.__pending(device)
+
+    def reserve(self, path:str, nbytes:int, wait:bool = True) -> bool:
+        """
+        Reserves nbytes on path's volume
+
+        Param:
+            path: file or directory that will be written, does not need to exist. Bytes allocated
+                to a file at path are taken out of the reservation
+            nbytes: bytes to reserve
+            wait: True to wait for space while other reservations are pending on the volume
+        Return: True if reserved and must be released with release(), False if there is not enough space
+        """
+        directory = existing_dir(path)
+        device = os.stat(directory).st_dev
+        deadline = time.monotonic() + self.__timeout
+        with self.__cond:
+            while self.__available(directory, device) < nbytes:
+                remaining = deadline - time.monotonic()
+                if not wait or not self.__pending(device) or remaining <= 0:
+                    return False
+                self.__cond.wait(remaining)
+            self.__reserved.setdefault(os.path.abspath(path), [device, 0])[1] += nbytes
+        return True
+
+    def written(self, path:str, nbytes:int) -> None:
+        """
+        Takes bytes written for a reservation out of it, for writers that do not write to path itself
+
+        Param:
+            path: path reserved for
+            nbytes: bytes written
+        """
+        with self.__cond:
+            reservation = self.__reserved.get(os.path.abspath(path))
+            if reservation:
+                reservation[1] = max(0, reservation[1] - nbytes)
+
+    def release(self, path:str, nbytes:int) -> None:
+        """
+        Releases a reservation made by reserve()
+
+        Param:
+            path: path reserved for
+            nbytes: bytes reserved, including any reported by written()
+        Pre: the reservation was made and is not released
+        """
+        path = os.path.abspath(path)
+        with self.__cond:
+            reservation = self.__reserved[path]
+            reservation[1] = max(0, reservation[1] - nbytes)
+            if reservation[1] == 0:
+                del self.__reserved[path]
+            self.__cond.notify_all()
+
+    @contextlib.contextmanager
+    def reservation(self, path:str, nbytes:int, wait:bool = True):
+        """
+        Context manager that reserves nbytes while open, see reserve()
+
+        Return: True if reserved, False if there was not enough space and nothing was reserved
+        """
+        reserved = self.reserve(path, nbytes, wait)
+        try:
+            yield reserved
+        finally:
+            if reserved:
+                self.release(path, nbytes)
+
+    def __available(self, directory:str, device:int) -> int:
+        """
+        Returns the bytes that can still be reserved on a volume
+
+        Param:
+            directory: existing directory on the volume
+            device: volume's device id
+        Pre: self.__cond is held
+        Return: free bytes less the unwritten part of reservations and min free
+        """
+        unwritten = sum(max(0, nbytes - allocated(path)) for path, (on, nbytes) in self.__reserved.items() if on == device)
+        return shutil.disk_usage(directory).free - unwritten - self.__min_free
+
+    def __pending(self, device:int) -> int:
+        """
+        Returns the bytes reserved on a volume
+
+        Param:
+            device: volume's device id
+        Pre: self.__cond is held
+        Return: bytes reserved
+        """
+        return sum(nbytes for on, nbytes in self.__reserved.values() if on == device)
@@ -0,0 +1,152 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+import SpaceReserver
+from SpaceReserver import SpaceReserver as Reserver
+from StreamWriter import StreamWriter
+
+class SpaceReserverTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "missing", "file.jpg")
+        self.free = shutil.disk_usage(self.dir.name).free
+
+    def test_reserve(self) -> None:
+        """
+        Tests reservations are counted against free space
+        """
+        # Leaves 1 MB that can be reserved
+        reserver = Reserver(self.free - 1024 * 1024)
+        self.assertLessEqual(reserver.available(self.path), 1024 * 1024)
+        self.assertTrue(reserver.reserve(self.path, 512 * 1024))
+        self.assertFalse(reserver.reserve(self.path, 1024 * 1024, False))
+        reserver.release(self.path, 512 * 1024)
+        with reserver.reservation(self.path, 512 * 1024) as reserved:
+            self.assertTrue(reserved)
+        self.assertGreater(reserver.available(self.path), 512 * 1024)
+
+    def test_refused(self) -> None:
+        """
+        Tests a reservation that can never fit is refused without waiting
+        """
+        reserver = Reserver(self.free)
+        start = time.perf_counter()
+        self.assertFalse(reserver.reserve(self.path, 1024 * 1024))
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_deferred(self) -> None:
+        """
+        Tests a reservation waits for pending reservations to be released
+        """
+        reserver = Reserver(self.free - 1024 * 1024)
+        self.assertTrue(reserver.reserve(self.path, 1000 * 1024))
+        timer = threading.Timer(0.2, reserver.release, (self.path, 1000 * 1024))
+        timer.start()
+        start = time.perf_counter()
+        self.assertTrue(reserver.reserve(self.path, 1000 * 1024))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+        timer.join()
+
+    def test_timeout(self) -> None:
+        """
+        Tests a deferred reservation is refused after the timeout
+        """
+        reserver = Reserver(self.free - 1024 * 1024, 0.2)
+        self.assertTrue(reserver.reserve(self.path, 1000 * 1024))
+        self.assertFalse(reserver.reserve(self.path, 1000 * 1024))
+
+    def test_partly_written(self) -> None:
+        """
+        Tests bytes written or preallocated for a reservation are not counted twice
+        """
+        MB = 1024 * 1024
+        # Leaves 4 MB that can be reserved
+        reserver = Reserver(self.free - 4 * MB)
+        fname = os.path.join(self.dir.name, "file.bin")
+        self.assertTrue(reserver.reserve(fname, 3 * MB))
+        with open(fname, 'wb') as fd:
+            fd.write(b'a' * 2 * MB)
+            fd.flush()
+            os.fsync(fd.fileno())
+        # 2 MB are taken from free space and 1 MB is still reserved
+        self.assertGreater(reserver.available(self.path), MB // 2)
+        self.assertTrue(reserver.reserve(self.path, MB // 2, False))
+        reserver.release(self.path, MB // 2)
+        reserver.release(fname, 3 * MB)
+        os.remove(fname)
+
+        self.assertTrue(reserver.reserve(fname, 3 * MB))
+        with open(fname, 'wb') as fd:
+            if SpaceReserver.preallocate(fd, 3 * MB):
+                self.assertTrue(reserver.reserve(self.path, MB // 2, False))
+                reserver.release(self.path, MB // 2)
+        reserver.release(fname, 3 * MB)
+        os.remove(fname)
+
+        # Writes made elsewhere, such as extraction to a temporary directory, are reported
+        output = os.path.join(self.dir.name, "extracted", "")
+        self.assertTrue(reserver.reserve(output, 3 * MB))
+        self.assertFalse(reserver.reserve(self.path, 2 * MB, False))
+        reserver.written(output, 2 * MB)
+        self.assertTrue(reserver.reserve(self.path, 2 * MB, False))
+        self.assertEqual(reserver.pending(self.path), 3 * MB)
+        reserver.release(self.path, 2 * MB)
+        reserver.release(output, 3 * MB)
+        self.assertEqual(reserver.pending(self.path), 0)
+
+    def test_preallocate(self) -> None:
+        """
+        Tests preallocated files are truncated to the bytes written, including failed writes
+        """
+        class Response():
+            headers = {}
+            def __init__(self, body:bytes) -> None:
+                self.raw = io.BytesIO(body)
+
+        class Failing(io.BytesIO):
+            def readinto(self, buffer) -> int:
+                if self.tell() >= 1024:
+                    raise OSError("connection lost")
+                return super().readinto(buffer[:1024])
+
+        fname = os.path.join(self.dir.name, "file.bin")
+        with open(fname, 'wb') as fd:
+            self.assertEqual(StreamWriter(1024 * 64).write(Response(b'a' * 5000), fd, preallocate=8192), 5000)
+        self.assertEqual(os.path.getsize(fname), 5000)
+
+        response = Response(b'')
+        response.raw = Failing(b'b' * 5000)
+        with open(fname, 'wb') as fd:
+            with self.assertRaises(OSError):
+                StreamWriter(1024 * 64).write(response, fd, preallocate=5000)
+        self.assertEqual(os.path.getsize(fname), 1024)
+
+        with open(fname, 'wb') as fd:
+            if SpaceReserver.preallocate(fd, 4096):
+                self.assertEqual(os.fstat(fd.fileno()).st_size, 4096)
+
+    def test_uncompressed_size(self) -> None:
+        """
+        Tests the extracted size of an archive is read from its index
+        """
+        import zipextracter
+        fname = os.path.join(self.dir.name, "archive.zip")
+        with zipfile.ZipFile(fname, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("a.txt", b'a' * 10000)
+            archive.writestr("b/c.txt", b'c' * 2345)
+        self.assertEqual(zipextracter.uncompressed_size(fname), 12345)
+        broken = os.path.join(self.dir.name, "broken.zip")
+        with open(broken, 'wb') as fd:
+            fd.write(b'not a zip')
+        self.assertEqual(zipextracter.uncompressed_size(broken), 9)
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import contextlib
+import threading
+import time
+from typing import TYPE_CHECKING
+import requests
+import urllib3
+from requests.exceptions import ChunkedEncodingError, ContentDecodingError, ConnectionError
+from requests.exceptions import SSLError as RequestsSSLError
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError, SSLError
+import SpaceReserver
+if TYPE_CHECKING:
+    from BandwidthLimiter import BandwidthLimiter
+"""
+Streams HTTP response bodies to files through a reusable buffer
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+MIN_CHUNKSZ = 1024 * 64     # Smallest chunk size used when adapting
+TARGET_READ_TIME = 0.25     # Seconds a single read should take, chunk size is adjusted towards this
+DIRECT_READS = urllib3.__version__.startswith("1.")  # True to read from http.client directly, see write()
+
+class StreamWriter():
+    """
+    Writes a streamed response to a file by reading directly into a preallocated buffer
+    instead of allocating a new bytes object for every chunk. Each thread owns its buffer
+    so one StreamWriter can be shared by all download threads.
+
+    Chunk size starts small and doubles while reads complete quickly, halving when they
+    become slow, so fast links use large chunks and slow links keep progress bars responsive.
+    The chunk size reached is remembered by the thread for its next download.
+
+    With a bandwidth limiter, reads are capped to the limiter's chunk limit and each read
+    waits for its share of the bandwidth before the next one.
+    """
+    __max_chunksz:int           # Largest chunk size and largest buffer allocated
+    __local:threading.local     # Thread local buffer and chunk size
+    __limiter:'BandwidthLimiter|None' # Caps the combined rate of every write, None for no cap
+
+    def __init__(self, max_chunksz:int, limiter:'BandwidthLimiter|None' = None) -> None:
+        """
+        Initializes the writer
+
+        Param:
+            max_chunksz: largest chunk size in bytes to read at once
+            limiter: (Optional) bandwidth limiter shared by every write
+        """
+        self.__max_chunksz = max(MIN_CHUNKSZ, max_chunksz)
+        self.__local = threading.local()
+        self.__limiter = limiter
+
+    def write(self, response:requests.Response, fd, callback = None, hasher = None, preallocate:int = 0) -> int:
+        """
+        Writes the body of response to fd. Content encoding is decoded in the same way as
+        requests' iter_content() and urllib3 exceptions are raised as their requests counterparts.
+        A body that is not content encoded and ends before its Content-Length is raised as
+        ChunkedEncodingError.
+
+        With urllib3 1.x, a body that is not content encoded is read straight from the underlying 
+        http.client response into the buffer as urllib3's own readinto() allocates a temporary
+        bytes object as large as the buffer on every read. The response's public readinto() is
+        used otherwise.
+
+        Param:
+            response: response requested with stream=True, requests.Response or Http2Session.Http2Response
+            fd: file opened in binary write mode
+            callback: (Optional) called with the number of bytes written after each chunk
+            hasher: (Optional) hashlib object updated with each chunk, file does not need to be reread to hash it
+            preallocate: (Optional) bytes to allocate for fd before writing, fd is truncated to the bytes written
+                afterwards even if writing fails. See SpaceReserver.preallocate()
+        Return: number of bytes written
+        """
+        raw = response.raw
+        raw.decode_content = True
+        encoded = response.headers.get("content-encoding")
+        fp = getattr(raw, "_fp", None)
+        direct = DIRECT_READS and not encoded and hasattr(fp, "readinto") and hasattr(raw, "_error_catcher")
+        readinto = fp.readinto if direct else raw.readinto
+        chunksz = getattr(self.__local, "chunksz", MIN_CHUNKSZ)
+        preallocated = SpaceReserver.preallocate(fd, preallocate) if preallocate else False
+        # Content-Length counts encoded bytes, it can only be checked against unencoded bodies
+        length = response.headers.get("content-length") if not encoded else None
+
+        try:
+            # Error catcher converts socket and http.client errors to urllib3 errors as raw.readinto() would
+            with raw._error_catcher() if direct else contextlib.nullcontext():
+                total = self.__write_loop(readinto, fd, callback, hasher, chunksz)
+            # Direct reads bypass urllib3's length checks
+            if length and length.isdigit() and total < int(length):
+                raise ChunkedEncodingError("Response ended prematurely, {} of {} bytes read".format(total, length))
+        except ProtocolError as e:
+            raise ChunkedEncodingError(e)
+        except DecodeError as e:
+            raise ContentDecodingError(e)
+        except ReadTimeoutError as e:
+            raise ConnectionError(e)
+        except SSLError as e:
+            raise RequestsSSLError(e)
+        finally:
+            # Allocated space past the written bytes must not be mistaken for a complete download
+            if preallocated:
+                fd.truncate()
+        return total
+
+    def __write_loop(self, readinto, fd, callback, hasher, chunksz:int) -> int:
+        """
+        Reads into the thread's buffer and writes to fd until readinto returns 0
+
+        Param:
+            readinto: readinto function of the stream to read from
+            fd: file opened in binary write mode
+            callback: (Optional) called with the number of bytes written after each chunk
+            hasher: (Optional) hashlib object updated with each chunk
+            chunksz: chunk size to start with
+        Return: number of bytes written
+        """
+        view = self.__get_buffer(chunksz)
+        total = 0
+        try:
+            while True:
+                size = chunksz
+                if self.__limiter:
+                    size = min(chunksz, self.__limiter.chunk_limit() or chunksz)
+                start = time.perf_counter()
+                n = readinto(view[:size])
+                elapsed = time.perf_counter() - start
+
+                if not n:
+                    break
+                if self.__limiter:
+                    self.__limiter.consume(n)
+                fd.write(view[:n])
+                if hasher:
+                    hasher.update(view[:n])
+                total += n
+                if callback:
+                    callback(n)
+
+                # Adjust chunk size towards TARGET_READ_TIME
+                if n == chunksz and elapsed < TARGET_READ_TIME / 4 and chunksz < self.__max_chunksz:
+                    chunksz = min(chunksz * 2, self.__max_chunksz)
+                    view = self.__get_buffer(chunksz)
+                elif elapsed > TARGET_READ_TIME * 2 and chunksz > MIN_CHUNKSZ:
+                    chunksz = max(chunksz // 2, MIN_CHUNKSZ)
+        finally:
+            self.__local.chunksz = chunksz
+        return total
+
+    def __get_buffer(self, size:int) -> memoryview:
+        """
+        Returns the calling thread's buffer, growing it if it is smaller than size
+
+        Param:
+            size: minimum buffer size in bytes
+        Return: memoryview of the thread's buffer
+        """
+        buffer = getattr(self.__local, "buffer", None)
+        if buffer is None or len(buffer) < size:
+            buffer = memoryview(bytearray(size))
+            self.__local.buffer = buffer
+        return buffer
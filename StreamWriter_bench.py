@@ -0,0 +1,93 @@
+import hashlib
+import http.server
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+
+from StreamWriter import StreamWriter
+"""
+Benchmarks download write loops against a local HTTP server. Compares the old
+iter_content() + flush() loop with 64MiB chunks against StreamWriter, with and without
+inline sha256 verification, reporting throughput and peak RSS. Each mode runs in its 
+own process so peak RSS is not shared. Raw sha256 throughput is reported for reference.
+
+Usage: python StreamWriter_bench.py [size in MB, default 1024]
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+BLOCK = os.urandom(1024 * 1024)     # Served repeatedly as the file body
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves size MB of data for any GET request
+    """
+    size:int = 0
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(BLOCK) * self.size))
+        self.end_headers()
+        for _ in range(0, self.size):
+            self.wfile.write(BLOCK)
+
+    def log_message(self, *args) -> None:
+        pass
+
+def old_loop(data:requests.Response, fd) -> int:
+    """
+    Write loop used before StreamWriter
+    """
+    downloaded = 0
+    for chunk in data.iter_content(chunk_size=1024 * 1024 * 64):
+        sz = fd.write(chunk)
+        fd.flush()
+        downloaded += sz
+    return downloaded
+
+def run(mode:str, url:str) -> None:
+    """
+    Downloads url with the given mode and prints throughput and peak RSS
+    """
+    writer = StreamWriter(1024 * 1024 * 64)
+    session = requests.Session()
+    with tempfile.TemporaryFile(dir=".") as fd:
+        start = time.perf_counter()
+        data = session.get(url, stream=True)
+        if mode == "old":
+            downloaded = old_loop(data, fd)
+        else:
+            downloaded = writer.write(data, fd, hasher=hashlib.sha256() if mode == "sha256" else None)
+        elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print("{mode}: {mb:.1f} MB/s, peak RSS {rss:.1f} MB".format(mode=mode, mb=downloaded / elapsed / (1024 ** 2), rss=peak))
+
+def main():
+    if len(sys.argv) > 2:
+        run(sys.argv[1], sys.argv[2])
+        return
+
+    Handler.size = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:{}/data/file.bin".format(server.server_address[1])
+
+    for mode in ("old", "new", "sha256"):
+        subprocess.run([sys.executable, __file__, mode, url], check=True)
+    server.shutdown()
+
+    hasher = hashlib.sha256()
+    start = time.perf_counter()
+    for _ in range(0, Handler.size):
+        hasher.update(BLOCK)
+    print("sha256 alone: {mb:.1f} MB/s".format(mb=Handler.size / (time.perf_counter() - start)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import hashlib
+import http.server
+import io
+import threading
+import unittest
+from unittest import mock
+import requests
+from requests.exceptions import ChunkedEncodingError
+import StreamWriter as Writer
+from StreamWriter import StreamWriter
+
+BODY = bytes(range(256)) * 4096
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves BODY, /short claims BODY's length but closes the connection halfway
+    """
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(BODY[:len(BODY) // 2] if self.path == "/short" else BODY)
+
+    def log_message(self, *args) -> None:
+        pass
+
+class StreamWriterTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self.writer = StreamWriter(1024 * 256)
+
+    def test_write(self) -> None:
+        """
+        Tests the whole body is written and hashed
+        """
+        fd = io.BytesIO()
+        hasher = hashlib.sha256()
+        with requests.get(self.url + "/full", stream=True, timeout=10) as r:
+            self.assertEqual(self.writer.write(r, fd, hasher=hasher), len(BODY))
+        self.assertEqual(fd.getvalue(), BODY)
+        self.assertEqual(hasher.hexdigest(), hashlib.sha256(BODY).hexdigest())
+
+    def test_truncated(self) -> None:
+        """
+        Tests a body shorter than its Content-Length is raised, reading directly or through urllib3
+        """
+        for direct in (Writer.DIRECT_READS, False):
+            with mock.patch.object(Writer, "DIRECT_READS", direct):
+                with requests.get(self.url + "/short", stream=True, timeout=10) as r:
+                    with self.assertRaises(ChunkedEncodingError):
+                        self.writer.write(r, io.BytesIO())
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
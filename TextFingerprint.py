@@ -0,0 +1,103 @@
+import logging
+import os
+import mmh3
+"""
+Stable fingerprint of a text file written by KMP (post__content.txt, post__comments.txt),
+used by the duplicate file register in place of hash(contents), which is salted per process
+and requires every text file to be read during prescan.
+
+A fingerprint is the file's size in bytes plus a 128 bit murmur3 digest of its bytes. Sizes
+are compared first and the digest is only computed, reading the file if needed, when two
+sizes are equal. Text is measured as jutils.write_utf8() writes it, utf-8 with newlines
+translated to os.linesep, so it compares equal to the file it would produce.
+
+Usage:
+    existing = from_file(entry.path, entry.stat().st_size)
+    new = from_text(post_contents)
+    if new == existing:
+        ...
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+def from_file(path:str, size:int) -> 'TextFingerprint':
+    """
+    Fingerprints a file without reading it, it is read the first time its digest is needed
+
+    Param:
+        path: path of the file
+        size: size of the file in bytes, from os.stat() or DirEntry.stat()
+    Return: fingerprint
+    """
+    return TextFingerprint(size, path=path)
+
+def from_text(text:str) -> 'TextFingerprint':
+    """
+    Fingerprints text about to be written with jutils.write_utf8()
+
+    Param:
+        text: text to write
+    Return: fingerprint
+    """
+    data = (text.replace('\n', os.linesep) if os.linesep != '\n' else text).encode('utf-8')
+    return TextFingerprint(len(data), data=data)
+
+class TextFingerprint():
+    """
+    Size and lazily computed digest of a text file. Equality with anything that is not a
+    TextFingerprint, such as the file sizes and paths stored next to it in the register, is False.
+    """
+    __slots__ = ("size", "__path", "__data", "__digest")
+    size:int                    # Size in bytes
+    __path:str|None             # File read to compute the digest, None if data is given
+    __data:bytes|None           # Bytes to compute the digest from, freed once it is computed
+    __digest:int|None           # murmur3 128 bit digest, None until computed
+
+    def __init__(self, size:int, path:str|None = None, data:bytes|None = None) -> None:
+        """
+        Param:
+            size: size in bytes
+            path: (Optional) file to read the digest from
+            data: (Optional) bytes to compute the digest from
+        Pre: path or data is given
+        """
+        self.size = size
+        self.__path = path
+        self.__data = data
+        self.__digest = None
+
+    def digest(self) -> int|None:
+        """
+        Returns the digest, computing it on first use
+
+        Return: 128 bit digest, None if the file can no longer be read
+        """
+        if self.__digest is None:
+            data = self.__data
+            if data is None:
+                try:
+                    with open(self.__path, 'rb') as fd:
+                        data = fd.read()
+                except OSError as e:
+                    logging.debug("Cannot fingerprint {}: {}".format(self.__path, e.__class__.__name__))
+                    return None
+            self.__digest = mmh3.hash128(data)
+            self.__data = None
+        return self.__digest
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TextFingerprint):
+            return NotImplemented
+        if self is other:
+            return True
+        if self.size != other.size:
+            return False
+        digest = self.digest()
+        return digest is not None and digest == other.digest()
+
+    def __hash__(self) -> int:
+        return hash(self.size)
+
+    def __repr__(self) -> str:
+        return "TextFingerprint(size={}, digest={})".format(self.size, self.__digest)
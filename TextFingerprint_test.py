@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import jutils
+import TextFingerprint
+
+class TextFingerprintTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.text = "Post title\nSome content ✓\n\nEmbedded Container: <a>\n"
+        self.path = os.path.join(self.dir.name, "post__content.txt")
+        jutils.write_utf8(self.text, self.path, 'w')
+
+    def test_written_file(self) -> None:
+        """
+        Tests text equals the file it is written to and differs from other text
+        """
+        existing = TextFingerprint.from_file(self.path, os.stat(self.path).st_size)
+        self.assertEqual(TextFingerprint.from_text(self.text), existing)
+        self.assertNotEqual(TextFingerprint.from_text(self.text + "more"), existing)
+        # Same size, different bytes
+        self.assertNotEqual(TextFingerprint.from_text(self.text[:-2] + "x\n"), existing)
+
+    def test_lazy(self) -> None:
+        """
+        Tests files are only read when sizes are equal
+        """
+        missing = os.path.join(self.dir.name, "missing.txt")
+        text = TextFingerprint.from_text(self.text)
+        # Would raise if read, sizes differ so it is not
+        self.assertNotEqual(text, TextFingerprint.from_file(missing, text.size + 1))
+        # Same size but unreadable is not a match
+        self.assertNotEqual(text, TextFingerprint.from_file(missing, text.size))
+
+    def test_register_values(self) -> None:
+        """
+        Tests fingerprints mixed with sizes and paths in a register list
+        """
+        text = TextFingerprint.from_text(self.text)
+        existing = TextFingerprint.from_file(self.path, os.stat(self.path).st_size)
+        values = [text.size, "a.jpg", existing, self.path]
+        self.assertEqual(values.index(TextFingerprint.from_text(self.text)), 2)
+        self.assertFalse(text == text.size)
+        self.assertNotIn(self.path + "x", values)
+        self.assertEqual(values[0::2].count(text), 1)
+
+    def test_stable(self) -> None:
+        """
+        Tests digests are the same across processes
+        """
+        code = "import TextFingerprint; print(TextFingerprint.from_text({!r}).digest())".format(self.text)
+        env = dict(os.environ, PYTHONHASHSEED="123")
+        digest = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        self.assertEqual(int(digest), TextFingerprint.from_text(self.text).digest())
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+"""
+Verifies downloaded files against their expected sha256 using a process pool
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+READ_SZ = 1024 * 1024 * 4      # Sequential read size used while hashing
+
+def hash_file(path:str) -> str|None:
+    """
+    Hashes a file with sha256 using large sequential reads into a reused buffer
+
+    Param:
+        path: file to hash
+    Return: sha256 hex digest, None if the file does not exist or cannot be read
+    """
+    hasher = hashlib.sha256()
+    buffer = bytearray(READ_SZ)
+    view = memoryview(buffer)
+    try:
+        with open(path, 'rb', buffering=0) as fd:
+            while True:
+                n = fd.readinto(buffer)
+                if not n:
+                    break
+                hasher.update(view[:n])
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+class Verifier():
+    """
+    Hashes files in parallel and compares them to their expected sha256. Hashing is done
+    in a process pool so it is not limited to a single core.
+    """
+    __processes:int     # Number of worker processes
+
+    def __init__(self, processes:int|None = None) -> None:
+        """
+        Initializes the verifier
+
+        Param:
+            processes: number of worker processes, default is the cpu count
+        """
+        self.__processes = processes if processes and processes > 0 else (os.cpu_count() or 1)
+
+    def verify(self, files:list[tuple[str, str]]) -> tuple[list[str], list[str]]:
+        """
+        Verifies files
+
+        Param:
+            files: list of (path, expected sha256) tuples
+        Return: (corrupt, missing) where corrupt is a list of paths whose hash does not match and
+            missing is a list of paths that do not exist
+        """
+        corrupt = []
+        missing = []
+
+        # Missing files are filtered out beforehand so they do not cost a worker round trip
+        present = []
+        for path, expected in files:
+            if os.path.isfile(path):
+                present.append((path, expected))
+            else:
+                missing.append(path)
+
+        if len(present) == 0:
+            return (corrupt, missing)
+
+        with ProcessPoolExecutor(max_workers=self.__processes) as pool:
+            digests = pool.map(hash_file, [path for path, _ in present], chunksize=max(1, len(present) // (self.__processes * 4)))
+            for (path, expected), digest in zip(present, digests):
+                if digest is None:
+                    missing.append(path)
+                elif digest != expected:
+                    corrupt.append(path)
+        return (corrupt, missing)
@@ -0,0 +1,48 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from Verifier import Verifier, hash_file
+
+class VerifierTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        """
+        Creates a temp directory with a good, a corrupt and a missing file
+        """
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.data = os.urandom(1024 * 1024 * 5 + 7)     # Spans multiple reads
+        self.sha = hashlib.sha256(self.data).hexdigest()
+        self.good = os.path.join(self.tempdir.name, "good.jpg")
+        self.bad = os.path.join(self.tempdir.name, "bad.jpg")
+        self.missing = os.path.join(self.tempdir.name, "missing.jpg")
+        with open(self.good, 'wb') as fd:
+            fd.write(self.data)
+        with open(self.bad, 'wb') as fd:
+            fd.write(self.data[:-1] + b'\0')
+
+    def test_hash_file(self) -> None:
+        """
+        Tests hashing a file and a nonexistant file
+        """
+        self.assertEqual(hash_file(self.good), self.sha)
+        self.assertIsNone(hash_file(self.missing))
+
+    def test_verify(self) -> None:
+        """
+        Tests sorting files into corrupt and missing
+        """
+        corrupt, missing = Verifier(2).verify([(self.good, self.sha), (self.bad, self.sha), (self.missing, self.sha)])
+        self.assertEqual(corrupt, [self.bad])
+        self.assertEqual(missing, [self.missing])
+
+        # Nothing to do
+        self.assertEqual(Verifier(2).verify([]), ([], []))
+
+    def tearDown(self) -> None:
+        """
+        Removes temp directory
+        """
+        self.tempdir.cleanup()
+
+if __name__ == '__main__':
+    unittest.main()
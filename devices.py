@@ -0,0 +1,87 @@
+import functools
+import os
+
+"""
+Storage type detection used to size directory walks. Spinning disks are walked by a few
+threads as each concurrent walk moves the heads, solid state drives by many as they serve
+requests in parallel. Types are read from sysfs and /proc on Linux, other platforms get
+UNKNOWN_WALKERS.
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+ROTATIONAL_WALKERS = 4                                      # Walkers for spinning disks
+NETWORK_WALKERS = 16                                        # Walkers for network shares, requests are latency bound
+SOLID_STATE_WALKERS = min(256, 32 * (os.cpu_count() or 4))  # Walkers for SSDs, NVMe and memory file systems
+UNKNOWN_WALKERS = 100                                       # Walkers when the storage type cannot be detected
+NETWORK_FS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p", "fuse.sshfs", "fuse.rclone", "davfs"}
+MEMORY_FS = {"tmpfs", "ramfs"}
+
+def storage_type(path:str) -> str:
+    """
+    Returns the type of storage path is on
+
+    Param:
+        path: existing file or directory
+    Return: "rotational", "solid", "network" or "unknown"
+    """
+    return _device_type(os.stat(path).st_dev, _mount_point(path))
+
+def walker_count(path:str) -> int:
+    """
+    Returns the number of threads that should walk directories on path's device at once
+
+    Param:
+        path: existing file or directory
+    Return: thread count
+    """
+    return {"rotational": ROTATIONAL_WALKERS, "network": NETWORK_WALKERS,
+            "solid": SOLID_STATE_WALKERS}.get(storage_type(path), UNKNOWN_WALKERS)
+
+def _mount_point(path:str) -> str:
+    """
+    Returns the mount point of the file system path is on
+    """
+    path = os.path.abspath(path)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    return path
+
+@functools.lru_cache(maxsize=64)
+def _device_type(device:int, mount:str) -> str:
+    """
+    Detects a device's storage type, memoized as devices do not change within a run
+
+    Param:
+        device: st_dev of a file on the device
+        mount: mount point of the device's file system
+    Return: see storage_type()
+    """
+    fstype = _fs_type(mount)
+    if fstype in NETWORK_FS:
+        return "network"
+    if fstype in MEMORY_FS:
+        return "solid"
+    # Partitions do not have a queue of their own, their disk's is one directory up
+    block = "/sys/dev/block/{}:{}".format(os.major(device), os.minor(device)) if hasattr(os, "major") else None
+    for queue in ((os.path.join(block, "queue"), os.path.join(block, "..", "queue")) if block else ()):
+        try:
+            with open(os.path.join(queue, "rotational")) as fd:
+                return "rotational" if fd.read().strip() == "1" else "solid"
+        except OSError:
+            continue
+    return "unknown"
+
+def _fs_type(mount:str) -> str|None:
+    """
+    Returns the type of the file system mounted at mount, None if it cannot be read
+    """
+    try:
+        with open("/proc/self/mounts") as fd:
+            # Spaces in mount points are escaped as \040
+            types = [fields[2] for fields in (line.split() for line in fd) if len(fields) > 2 and fields[1].replace("\\040", " ") == mount]
+    except OSError:
+        return None
+    # Mounts listed later hide earlier ones
+    return types[-1] if types else None
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import unittest
+import devices
+
+class DevicesTestCase(unittest.TestCase):
+    def test_walker_count(self) -> None:
+        """
+        Tests every path gets the walker count of its storage type
+        """
+        counts = {"rotational": devices.ROTATIONAL_WALKERS, "network": devices.NETWORK_WALKERS,
+                  "solid": devices.SOLID_STATE_WALKERS, "unknown": devices.UNKNOWN_WALKERS}
+        with tempfile.TemporaryDirectory() as dir:
+            self.assertIn(devices.storage_type(dir), counts)
+            self.assertEqual(devices.walker_count(dir), counts[devices.storage_type(dir)])
+            # Any path on the same file system has the same type
+            self.assertEqual(devices.storage_type(dir), devices.storage_type(os.path.dirname(dir)))
+        self.assertLess(devices.ROTATIONAL_WALKERS, devices.SOLID_STATE_WALKERS)
+
+    @unittest.skipUnless(sys.platform.startswith("linux") and os.path.ismount("/dev/shm"), "requires /dev/shm")
+    def test_memory(self) -> None:
+        """
+        Tests memory file systems are treated as solid state
+        """
+        if devices._fs_type("/dev/shm") in devices.MEMORY_FS:
+            self.assertEqual(devices.storage_type("/dev/shm"), "solid")
+
+    def test_missing(self) -> None:
+        """
+        Tests a missing path raises as os.stat() does
+        """
+        with self.assertRaises(OSError):
+            devices.walker_count(os.path.join(tempfile.gettempdir(), "missing", "missing"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import functools
+import re
+
+"""
+File name normalization for scraped titles and download links. Patterns are compiled
+once and trimmed link names are memoized as the same src is trimmed several times.
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+UNSAFE = re.compile(r'[^\w\-_\. ]|[\.]$')   # Characters not allowed in names and a trailing '.'
+MAX_EXT = 6                                 # Longest extension accepted from a link's ?f= token
+
+def sanitize(name:str) -> str:
+    """
+    Removes characters not allowed in file or directory names and a trailing '.'
+
+    Param:
+        name: file or directory name, not a path
+    Return: sanitized name
+    """
+    return UNSAFE.sub('', name)
+
+@functools.lru_cache(maxsize=4096)
+def trim(fname:str) -> str:
+    """
+    Trims fname, returns result. Extensions are kept:
+    For example
+
+    When ext length of ?<filename>.ext token is <= 6:
+    "/data/2f/33/2f33425e67b99de681eb7638ef2c7ca133d7377641cff1c14ba4c4f133b9f4d6.txt?f=File.txt"
+    -> File.txt
+
+    Or
+
+    When ext length of ?<filename>.ext token is > 6:
+    "/data/2f/33/2f33425e67b99de681eb7638ef2c7ca133d7377641cff1c14ba4c4f133b9f4d6.jpg?f=File.jpe%3Ftoken-time%3D1570752000..."
+    ->2f33425e67b99de681eb7638ef2c7ca133d7377641cff1c14ba4c4f133b9f4d6.jpg
+
+    Or
+
+    When ' ' exists
+    'Download まとめDL用.zip'
+    -> まとめDL用.zip
+
+    Param:
+        fname: file name
+    Pre: fname follows above conventions
+    Return: trimmed filename with extension
+    """
+    # Case 3, space
+    case3 = fname.partition(' ')[2]
+    if case3 != fname and len(case3) > 0:
+        return UNSAFE.sub('', case3)
+
+    case1 = fname.rpartition('=')[2]
+    # Case 2, bad extension provided
+    if len(case1.rpartition('.')[2]) > MAX_EXT:
+        return UNSAFE.sub('', fname.rpartition('?')[0].rpartition('/')[2])
+
+    # Case 1, good extension
+    return UNSAFE.sub('', case1)
+
+def extension(fname:str) -> str:
+    """
+    Returns the extension of a trimmed link name, see trim()
+
+    Param:
+        fname: file name
+    Return: extension without '.', the whole trimmed name if it has no '.'
+    """
+    return trim(fname).rpartition('.')[2]
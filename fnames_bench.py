@@ -0,0 +1,50 @@
+import sys
+import time
+
+import fnames
+from fnames_test import make_corpus, reference_trim
+"""
+Benchmarks trimming link names the way __queue_download_files does, where every src is
+trimmed twice. Compares the previous uncompiled re.sub implementation against fnames.trim()
+with a cold and a warm memo.
+
+Usage: python fnames_bench.py [number of links, default 200000]
+
+@author Jeff Chen
+@version 9/10/2023
+"""
+
+def run(trim, corpus:list[str]) -> float:
+    """
+    Trims every link twice
+
+    Param:
+        trim: trimming function
+        corpus: links
+    Return: seconds taken
+    """
+    start = time.perf_counter()
+    for src in corpus:
+        trim(src)
+        trim(src)
+    return time.perf_counter() - start
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    corpus = make_corpus(count)
+
+    old = run(reference_trim, corpus)
+    fnames.trim.cache_clear()
+    cold = run(fnames.trim, corpus)
+    # Posts revisited by --UPDATE or --WATCH, only the last 4096 links stay memoized
+    warm = run(fnames.trim, corpus[-4096:] * (count // 4096))
+    unmemoized = run(fnames.trim.__wrapped__, corpus)
+
+    print("links: {}, trimmed twice each".format(count))
+    print("{:<24} {:>8.3f}s".format("re.sub (previous)", old))
+    print("{:<24} {:>8.3f}s {:>6.2f}x".format("compiled, no memo", unmemoized, old / unmemoized))
+    print("{:<24} {:>8.3f}s {:>6.2f}x".format("compiled, cold memo", cold, old / cold))
+    print("{:<24} {:>8.3f}s {:>6.2f}x".format("compiled, warm memo", warm, old / warm))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import random
+import re
+import unittest
+import urllib.parse
+import fnames
+
+def reference_trim(fname:str) -> str:
+    """
+    KMP.__trim_fname before fnames, used to check fnames.trim() is unchanged
+    """
+    case3 = fname.partition(' ')[2]
+    if case3 != fname and len(case3) > 0:
+        return re.sub(r'[^\w\-_\. ]|[\.]$', '', case3)
+    case1 = fname.rpartition('=')[2]
+    if len(case1.rpartition('.')[2]) > 6:
+        first = fname.rpartition('?')[0]
+        return re.sub(r'[^\w\-_\. ]|[\.]$', '', first.rpartition('/')[2])
+    return re.sub(r'[^\w\-_\. ]|[\.]$', '', case1)
+
+NAMES = ["まとめDL用", "BBS-Snoggler-Update", "1_2 2016 aged whiskey", "b9ffc2f9-2c11-42c8-b5a2-7995a233ca41", "Patreon Reward (Sept.)",
+    "[HD] Comic #12: Part 3", "ファイル 名", "rough!!", "final...", "v1.2.3", "файл", "名前?", "a/b\\c", "..."]
+EXTS = ["jpg", "png", "gif", "zip", "rar", "7z", "psd", "mp4", "clip", "jpeg", "txt", ""]
+
+def make_corpus(count:int, seed:int = 0) -> list[str]:
+    """
+    Generates link hrefs and attachment texts shaped like the ones found on Kemono posts
+
+    Param:
+        count: number of entries
+        seed: random seed
+    Return: corpus
+    """
+    generator = random.Random(seed)
+    corpus = []
+    for _ in range(0, count):
+        digest = "%064x" % generator.getrandbits(256)
+        ext = generator.choice(EXTS)
+        name = generator.choice(NAMES) + ("." + ext if ext else "")
+        kind = generator.randint(0, 3)
+        if kind == 0:
+            corpus.append("/data/{}/{}/{}.{}?f={}".format(digest[:2], digest[2:4], digest, ext or "bin", urllib.parse.quote(name)))
+        elif kind == 1:
+            corpus.append("/data/{}/{}/{}.{}?f={}".format(digest[:2], digest[2:4], digest, ext or "bin", name))
+        elif kind == 2:
+            # Patreon media links with a token in the name
+            corpus.append("/data/{}/{}/{}.jpg?f=https%3A//c10.patreonusercontent.com/3/e30%253D/patreon-media/p/post/{}/{}/1.jpe%3Ftoken-time%3D{}"
+                .format(digest[:2], digest[2:4], digest, generator.randint(1, 10 ** 8), digest[:32], generator.randint(1, 10 ** 10)))
+        else:
+            corpus.append("Download " + name)
+    return corpus
+
+class fnamesTestCase(unittest.TestCase):
+    def test_trim(self) -> None:
+        """
+        Tests each trimming case
+        """
+        self.assertEqual(fnames.trim("Download まとめDL用.zip"), "まとめDL用.zip")
+        self.assertEqual(fnames.trim("Download 1_2 2016 aged whiskey.zip"), "1_2 2016 aged whiskey.zip")
+        self.assertEqual(fnames.trim("/data/3d/68/3d68def31822e95ad249ceb2237fcdae29b644e6702366ddae761572be900955.jpg?f=https%3A//c10.patreonusercontent.\
+com/3/e30%253D/patreon-media/p/post/30194248/7cffbc9604664ccab13f3b57fdc78e6f/1.jpe%3Ftoken-time%3D1570752000%26token\
+-hash%3DLadY-wBiRPi84Qb5X-KI7NEgEP6HE6lljOLiHBm7qY8%253D"), "3d68def31822e95ad249ceb2237fcdae29b644e6702366ddae761572be900955.jpg")
+        self.assertEqual(fnames.trim("/data/8b/e7/8be7e3fc0b0304c97b0bd5d9f7a66b2ad97c2d798808b52824642480e8dfe0d7.gif?f=BBS-Snoggler-Update.gif"), "BBS-Snoggler-Update.gif")
+        self.assertEqual(fnames.extension("/data/8b/e7/8be7e3fc0b0304c97b0bd5d9f7a66b2ad97c2d798808b52824642480e8dfe0d7.gif?f=BBS-Snoggler-Update.gif"), "gif")
+
+    def test_sanitize(self) -> None:
+        """
+        Tests unsafe characters and a trailing '.' are removed
+        """
+        self.assertEqual(fnames.sanitize('a<b>:c"d/e\\f|g?h*i.'), "abcdefghi")
+        self.assertEqual(fnames.sanitize("Part 1.. "), "Part 1.. ")
+        self.assertEqual(fnames.sanitize("final.."), "final.")
+        self.assertEqual(fnames.sanitize("ファイル-名_1"), "ファイル-名_1")
+
+    def test_corpus(self) -> None:
+        """
+        Tests trim() matches the previous implementation on a generated corpus of Kemono links
+        """
+        corpus = make_corpus(20000)
+        for fname in corpus:
+            self.assertEqual(fnames.trim(fname), reference_trim(fname), fname)
+        # Repeated links are served from the memo
+        before = fnames.trim.cache_info().hits
+        fnames.trim(corpus[-1])
+        self.assertEqual(fnames.trim.cache_info().hits, before + 1)
+
+    def test_fuzz(self) -> None:
+        """
+        Tests trim() and sanitize() match the previous implementation on random strings
+        """
+        generator = random.Random(1)
+        alphabet = "ab. /?=%-_\\:*\"<>|\nま名​\x00"
+        for _ in range(0, 20000):
+            fname = "".join(generator.choices(alphabet, k=generator.randint(0, 24)))
+            self.assertEqual(fnames.trim(fname), reference_trim(fname), repr(fname))
+            self.assertEqual(fnames.sanitize(fname), re.sub(r'[^\w\-_\. ]|[\.]$', '', fname), repr(fname))
+
+if __name__ == '__main__':
+    unittest.main()
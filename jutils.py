@@ -1,3 +1,4 @@
+import hashlib
 import io
 import os
 
@@ -58,4 +59,43 @@ def getDirSz(dir: str) -> int:
             # skip if it is symbolic link
             if not os.path.islink(fp):
                 size += os.path.getsize(fp)
-    return size
\ No newline at end of file
+    return size
+
+def getDirFingerprint(dir: str, samples:int = 0) -> tuple:
+    """
+    Returns a cheap fingerprint of a directory and its content. Uses os.scandir so each
+    file costs a single stat call (none on Windows where stat is cached in DirEntry).
+
+    Param:
+        dir: directory to fingerprint
+        samples: number of files to hash the first 64KiB of, spaced evenly over the sorted 
+            file list. 0 to skip hashing
+    Return (file count, total size, sample digest) where sample digest is None if samples is 0
+    """
+    count = 0
+    size = 0
+    files = []
+    stack = [dir]
+    while stack:
+        with os.scandir(stack.pop()) as contents:
+            for entry in contents:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                # skip if it is symbolic link
+                elif entry.is_file(follow_symlinks=False):
+                    count += 1
+                    size += entry.stat(follow_symlinks=False).st_size
+                    if samples > 0:
+                        files.append(entry.path)
+
+    digest = None
+    if samples > 0:
+        hasher = hashlib.blake2b(digest_size=16)
+        files.sort()
+        step = max(1, len(files) // samples)
+        for fp in files[::step][:samples]:
+            hasher.update(os.path.relpath(fp, dir).encode('utf-8', 'surrogateescape'))
+            with open(fp, 'rb') as fd:
+                hasher.update(fd.read(65536))
+        digest = hasher.hexdigest()
+    return (count, size, digest)
\ No newline at end of file
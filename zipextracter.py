@@ -1,14 +1,32 @@
+import errno
 import logging
 import os
 import shutil
 import tempfile
+import threading
+import zipfile
 import patoolib
 from patoolib import util
 import sys
 
 import jutils
+
+# Optional in process readers for 7z and rar, patoolib is used when they are not installed
+try:
+    import py7zr
+except ImportError:
+    py7zr = None
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+FINGERPRINT_SAMPLES = 4             # Files hashed when 2 directories have the same file count and size
+_fingerprints:dict = {}             # Memoized directory fingerprints for this run, (path, samples) -> fingerprint, see clear_fingerprints()
+_fingerprints_lock = threading.Lock()
 """
-Extracts files using patoolib
+Extracts files in process using zipfile (and py7zr/rarfile if installed), falls back
+to patoolib for everything else
 
 @author Jeff chen
 @version 6/15/2022
@@ -26,7 +44,32 @@ def supported_zip_type(fname:str) -> bool:
         extension = file.rpartition('.')[2]
         return 'zip' == extension or 'rar' == extension or '7z' == extension
         
-def extract_zip(zippath: str, destpath: str, temp:bool) -> bool:
+def uncompressed_size(zippath:str) -> int:
+        """
+        Returns the bytes an archive extracts to, read from its index without extracting it.
+        Archives that cannot be read in process are estimated at their own size.
+
+        Param:
+            zippath: full path to the archive
+        Pre: Is a zip file, can be checked using supported_zip_type()
+        Return: total size of the archive's members in bytes
+        """
+        extension = zippath.rpartition('.')[2].lower()
+        try:
+            if extension == 'zip' and zipfile.is_zipfile(zippath):
+                with zipfile.ZipFile(zippath) as archive:
+                    return sum(member.file_size for member in archive.infolist())
+            if extension == '7z' and py7zr:
+                with py7zr.SevenZipFile(zippath) as archive:
+                    return archive.archiveinfo().uncompressed
+            if extension == 'rar' and rarfile:
+                with rarfile.RarFile(zippath) as archive:
+                    return sum(member.file_size for member in archive.infolist())
+        except Exception as e:
+            logging.debug("Could not read archive index ({}) -> {}".format(e.__class__.__name__, zippath))
+        return os.path.getsize(zippath)
+
+def extract_zip(zippath: str, destpath: str, temp:bool, progress = None) -> bool:
         """
         Extracts a zip file to a destination. Does nothing if file
         is password protected. Zipfile is deleted if extraction is 
@@ -50,59 +93,43 @@ def extract_zip(zippath: str, destpath: str, temp:bool) -> bool:
         destpath: full path to destination
         temp: True to extract to a temp dir then moving the files to destpath, false to extract
             directly to destpath. TODO implement.
+        progress: (Optional) called with the size of each member as it is extracted, see _extract_archive()
         Pre: Is a zip file, can be checked using supported_zip_type(). destpath exists
         Return: True on success, false on failure
         """
-        destpath += '\\'
-        backup_destpath = destpath
+        destpath = os.path.join(destpath, '')
         
-        # A tempdir is used to bypass Window's 255 char limit when unzipping files
-        with tempfile.TemporaryDirectory(prefix="temp") as dirpath:
-            dirpath += '\\'
+        # A tempdir is used to bypass Window's 255 char limit when unzipping files. It is placed on the 
+        # same filesystem as destpath so extracted files can be renamed into place instead of copied
+        with _same_fs_tempdir(destpath) as dirpath:
+            dirpath = os.path.join(dirpath, '')
             try:
-                patoolib.extract_archive(zippath, outdir=dirpath + '\\', verbosity=-1, interactive=False)
+                _extract_archive(zippath, dirpath, progress)
 
                 for f in os.listdir(dirpath):
                     if os.path.isdir(os.path.abspath(dirpath + f)):
-                        # Duplicate file name handler
-                        downloaded = False
-                        while not downloaded:
-                            try:
-                                shutil.copytree(os.path.abspath(dirpath + f), os.path.abspath(destpath + f), dirs_exist_ok=False)
-                                downloaded = True
-                            except FileExistsError as e:
-                                # If duplicate dir is found, it will be stashed in the same dir but with (n) prepended 
-                                counter = 1
-                                nextName = e.filename
-                                currSz = jutils.getDirSz(os.path.abspath(dirpath + f.replace("\\", "")))
-                                # Check directory size of dirpath vs destpath, if same size, we are done
-                                done = False
-                                while(not done):
-                                    # If the next directory does not exists, change destpath to that directory
-                                    if not os.path.exists(nextName):
-                                        destpath = nextName
-                                        done = True
-                                    else:
-                                        # If directory with same size is found, we are done
-                                        dirsize = jutils.getDirSz(nextName)
-                                        if dirsize == currSz:
-                                            done = True
-                                            downloaded = True
-                                    
-                                    # Adjust path for next iteration
-                                    if not done:
-                                        nextName = destpath + '(' + str(counter) + ')'
-                                        counter += 1
-
-                                # Move files from dupe directory to new directory
-                        shutil.rmtree(os.path.abspath(dirpath + f), ignore_errors=True)
+                        # Duplicate dir name handler, candidates are f, (1)f, (2)f, ...
+                        extracted = os.path.abspath(dirpath + f)
+                        extracted_fingerprints = {0: jutils.getDirFingerprint(extracted)}
+                        nextName = os.path.abspath(destpath + f)
+                        counter = 1
+                        while os.path.exists(nextName):
+                            # If directory with same content is found, it is a duplicate and is skipped
+                            if _same_dir(extracted, extracted_fingerprints, nextName):
+                                nextName = None
+                                break
+                            nextName = os.path.abspath(destpath + '(' + str(counter) + ')' + f)
+                            counter += 1
                         
+                        if nextName:
+                            _move(extracted, nextName)
+                            # The new directory's content is known, record it so it is never walked 
+                            _fingerprints_lock.acquire()
+                            _fingerprints[(nextName, 0)] = extracted_fingerprints[0]
+                            _fingerprints.pop((nextName, FINGERPRINT_SAMPLES), None)
+                            _fingerprints_lock.release()
                     else:
-                        shutil.copy(os.path.abspath(dirpath + f), os.path.abspath(destpath + f))
-                        os.remove(os.path.abspath(dirpath + f))
-                    
-                    # Reset destpath as it may have been modified due to dupe files
-                    destpath = backup_destpath
+                        _move(os.path.abspath(dirpath + f), os.path.abspath(destpath + f))
 
                 os.remove(zippath)
                 return True
@@ -116,10 +143,163 @@ def extract_zip(zippath: str, destpath: str, temp:bool) -> bool:
             except RuntimeError:
                 logging.debug("File name: " + zippath + "\n" +
                             "File size: " + str(os.stat(zippath).st_size))
+            except OSError as e:
+                # Such as running out of space or a file vanishing while files are moved into place
+                logging.critical("Extraction of {} failed: {}".format(zippath, e))
+            return False
+
+def clear_fingerprints() -> None:
+        """
+        Forgets memoized directory fingerprints. Must be called at the end of each run, 
+        directories may change before the next one.
+        """
+        _fingerprints_lock.acquire()
+        _fingerprints.clear()
+        _fingerprints_lock.release()
+
+def _fingerprint(dir:str, samples:int) -> tuple:
+        """
+        Memoized jutils.getDirFingerprint(), each directory is walked at most once per run.
+
+        Param:
+            dir: directory to fingerprint
+            samples: see jutils.getDirFingerprint()
+        Return: fingerprint of dir
+        """
+        _fingerprints_lock.acquire()
+        fingerprint = _fingerprints.get((dir, samples))
+        _fingerprints_lock.release()
+        
+        if not fingerprint:
+            fingerprint = jutils.getDirFingerprint(dir, samples)
+            _fingerprints_lock.acquire()
+            _fingerprints[(dir, samples)] = fingerprint
+            _fingerprints_lock.release()
+        return fingerprint
+
+def _same_dir(extracted:str, extracted_fingerprints:dict, existing:str) -> bool:
+        """
+        Checks if an extracted directory has the same content as an existing directory.
+        File count and size are compared first, sampled file hashes are only computed
+        when those match.
+
+        Param:
+            extracted: newly extracted directory
+            extracted_fingerprints: fingerprints of extracted keyed by samples, must contain 0.
+                Sampled fingerprint is added on first use so it is computed once per directory
+            existing: existing directory in the destination
+        Return: True if both directories are considered the same, false if not
+        """
+        if extracted_fingerprints[0] != _fingerprint(existing, 0):
             return False
+        if FINGERPRINT_SAMPLES not in extracted_fingerprints:
+            extracted_fingerprints[FINGERPRINT_SAMPLES] = jutils.getDirFingerprint(extracted, FINGERPRINT_SAMPLES)
+        return extracted_fingerprints[FINGERPRINT_SAMPLES] == _fingerprint(existing, FINGERPRINT_SAMPLES)
+
+def _extract_archive(zippath:str, outdir:str, progress = None) -> None:
+        """
+        Extracts an archive into outdir. Zip archives are streamed member by member with 
+        zipfile, avoiding the 7z subprocess. 7z and rar archives are read the same way if 
+        py7zr or rarfile is installed. Anything else, or a zip that zipfile cannot read 
+        (such as deflate64 compression), is extracted by 7z through patoolib.
+
+        Param:
+            zippath: full path to the archive
+            outdir: directory to extract to, must be empty
+            progress: (Optional) called with the size of each member as it is extracted. Only zip 
+                and rar archives extracted in process report progress
+        Raise: util.PatoolError if the archive is password protected or cannot be extracted
+        """
+        extension = zippath.rpartition('.')[2].lower()
+        try:
+            if extension == 'zip' and zipfile.is_zipfile(zippath):
+                with zipfile.ZipFile(zippath) as archive:
+                    # Encrypted members are flagged by bit 0
+                    if any(member.flag_bits & 0x1 for member in archive.infolist()):
+                        raise util.PatoolError("password protected archive: " + zippath)
+                    _extract_members(archive, outdir, progress)
+                return
+            if extension == '7z' and py7zr:
+                with py7zr.SevenZipFile(zippath) as archive:
+                    if archive.needs_password():
+                        raise util.PatoolError("password protected archive: " + zippath)
+                    archive.extractall(outdir)
+                return
+            if extension == 'rar' and rarfile:
+                with rarfile.RarFile(zippath) as archive:
+                    if archive.needs_password():
+                        raise util.PatoolError("password protected archive: " + zippath)
+                    _extract_members(archive, outdir, progress)
+                return
+        except util.PatoolError:
+            raise
+        except Exception as e:
+            # Clear anything partially extracted before handing the archive to 7z
+            logging.debug("In process extraction failed ({}), retrying with patoolib -> {}".format(e.__class__.__name__, zippath))
+            for f in os.listdir(outdir):
+                if os.path.isdir(os.path.join(outdir, f)):
+                    shutil.rmtree(os.path.join(outdir, f), ignore_errors=True)
+                else:
+                    os.remove(os.path.join(outdir, f))
+        
+        patoolib.extract_archive(zippath, outdir=outdir, verbosity=-1, interactive=False)
+
+def _extract_members(archive, outdir:str, progress) -> None:
+        """
+        Extracts every member of a zipfile or rarfile archive one at a time, as extractall() does
+
+        Param:
+            archive: open zipfile.ZipFile or rarfile.RarFile
+            outdir: directory to extract to
+            progress: (Optional) called with the size of each member once it is extracted
+        """
+        for member in archive.infolist():
+            archive.extract(member, outdir)
+            if progress:
+                progress(member.file_size)
+
+def _same_fs_tempdir(destpath:str) -> tempfile.TemporaryDirectory:
+        """
+        Creates a hidden temporary directory next to destpath, so it is on the same 
+        filesystem and stays within the download folder. destpath itself is used if its 
+        parent cannot be written to.
+
+        Param:
+            destpath: directory the temporary directory must share a filesystem with
+        Pre: destpath exists
+        Return: TemporaryDirectory to be used as a context manager
+        """
+        destpath = os.path.abspath(destpath)
+        try:
+            return tempfile.TemporaryDirectory(prefix=".kmp-", dir=os.path.dirname(destpath))
+        except OSError:
+            return tempfile.TemporaryDirectory(prefix=".kmp-", dir=destpath)
+
+def _move(src:str, dst:str) -> None:
+        """
+        Moves a file or directory by renaming it. Falls back to copying then deleting 
+        src when src and dst are on different filesystems. An existing file at dst is
+        replaced.
+
+        Param:
+            src: file or directory to move
+            dst: full destination path, if src is a directory, dst must not exist
+        """
+        try:
+            os.replace(src, dst)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            if os.path.isdir(src):
+                shutil.copytree(src, dst, dirs_exist_ok=False)
+                shutil.rmtree(src, ignore_errors=True)
+            else:
+                shutil.copy(src, dst)
+                os.remove(src)
+
 def main():
     if supported_zip_type(sys.argv[1]):
-        extract_zip(os.path.abspath(sys.argv[1]), os.path.abspath("./testing") + '\\', True)
+        extract_zip(os.path.abspath(sys.argv[1]), os.path.join(os.path.abspath("./testing"), ''), True)
     else:
         print("Is not ZIP -> " + sys.argv[1])
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import zipextracter
+"""
+Benchmarks how extracted files are placed into their destination by zipextracter.
+Compares the old copy then delete placement against rename based placement and
+reports bytes written per extracted GB. Byte counts are read from /proc/self/io so
+this benchmark is only meaningful on Linux.
+
+Usage: python zipextracter_bench.py [size in MB, default 512]
+
+@author Jeff chen
+@version 6/15/2022
+"""
+
+FILE_SZ = 1024 * 1024 * 8       # Size of each synthetic extracted file
+
+def io_counters() -> tuple:
+    """
+    Reads this process's I/O counters
+
+    Return: (wchar, write_bytes) tuple, (0, 0) if counters are unavailable
+    """
+    try:
+        with open("/proc/self/io") as fd:
+            counters = dict(line.split(": ") for line in fd.read().splitlines())
+        return (int(counters["wchar"]), int(counters["write_bytes"]))
+    except OSError:
+        return (0, 0)
+
+def build_tree(root:str, total:int) -> None:
+    """
+    Builds a fake extracted archive at root containing a directory and loose files
+
+    Param:
+        root: directory to populate
+        total: total number of bytes to write
+    """
+    os.makedirs(os.path.join(root, "animals"))
+    written = 0
+    i = 0
+    while written < total:
+        target = os.path.join(root, "animals") if i % 2 else root
+        with open(os.path.join(target, str(i) + ".bin"), "wb") as fd:
+            fd.write(os.urandom(FILE_SZ))
+        written += FILE_SZ
+        i += 1
+    os.sync()
+
+def copy_place(src:str, dest:str) -> None:
+    """
+    Old placement, copies each entry then deletes the original
+    """
+    for f in os.listdir(src):
+        if os.path.isdir(os.path.join(src, f)):
+            shutil.copytree(os.path.join(src, f), os.path.join(dest, f))
+            shutil.rmtree(os.path.join(src, f))
+        else:
+            shutil.copy(os.path.join(src, f), os.path.join(dest, f))
+            os.remove(os.path.join(src, f))
+
+def move_place(src:str, dest:str) -> None:
+    """
+    New placement, renames each entry into place
+    """
+    for f in os.listdir(src):
+        zipextracter._move(os.path.join(src, f), os.path.join(dest, f))
+
+def run(name:str, placer, total:int) -> None:
+    """
+    Times a placement function and reports bytes written per extracted GB
+    """
+    with tempfile.TemporaryDirectory(dir=".") as workdir:
+        src = os.path.join(workdir, "extracted")
+        dest = os.path.join(workdir, "dest")
+        os.makedirs(src)
+        os.makedirs(dest)
+        build_tree(src, total)
+
+        before = io_counters()
+        start = time.perf_counter()
+        placer(src, dest)
+        os.sync()
+        elapsed = time.perf_counter() - start
+        after = io_counters()
+
+        gb = total / (1024 ** 3)
+        print("{name}: {t:.3f}s, wchar/GB: {w:.0f} MB, write_bytes/GB: {b:.0f} MB".format(name=name, t=elapsed,
+            w=(after[0] - before[0]) / gb / (1024 ** 2), b=(after[1] - before[1]) / gb / (1024 ** 2)))
+
+def main():
+    total = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 512 * 1024 * 1024
+    run("copy", copy_place, total)
+    run("move", move_place, total)
+
+if __name__ == "__main__":
+    main()